@@ -0,0 +1,84 @@
+# investshare/asyncapi.py
+"""
+Async DRF views.
+
+DRF's APIView.dispatch is synchronous. AsyncAPIView keeps its request
+handling – authentication, permissions, throttling, content negotiation,
+exception handling, renderers – but awaits `async def get(...)` handlers,
+so Django serves the view natively under ASGI and a request waiting on
+Yahoo costs a coroutine, not a worker thread.
+
+Authentication and permission checks may hit the database, so initial()
+runs through sync_to_async. Handlers use the async ORM (afirst, aget, ...)
+and blocking() for upstream calls, which can then be awaited together with
+asyncio.gather.
+"""
+from __future__ import annotations
+
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from rest_framework import views
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _blocking_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "ASYNC_BLOCKING_WORKERS", 64),
+            thread_name_prefix="async-blocking",
+        )
+    return _executor
+
+
+def blocking(fn: Callable[..., T], *args, **kwargs) -> Awaitable[T]:
+    """
+    Run a blocking call (yfinance, a hedged quote fetch) on a dedicated pool
+    of ASYNC_BLOCKING_WORKERS threads, outside the single thread
+    sync_to_async uses for the ORM, so many of them can run at once.
+    Context variables – upstream priority, replica routing – go with it.
+    """
+    return sync_to_async(_closing, thread_sensitive=False, executor=_blocking_executor())(fn, *args, **kwargs)
+
+
+def _closing(fn: Callable[..., T], *args, **kwargs) -> T:
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        connections.close_all()  # pool threads open their own DB connections
+
+
+class AsyncAPIView(views.APIView):
+    """APIView whose handlers are coroutines (`async def get(self, request, ...)`)."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            method = request.method.lower()
+            handler = (
+                getattr(self, method, self.http_method_not_allowed)
+                if method in self.http_method_names
+                else self.http_method_not_allowed
+            )
+            response: Any = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):  # options()/405 stay synchronous
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
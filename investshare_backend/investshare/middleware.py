@@ -0,0 +1,58 @@
+# investshare/middleware.py
+from __future__ import annotations
+
+import re
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+_accepts_br = re.compile(r"\bbr\b")
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware with a configurable size threshold (COMPRESSION_MIN_SIZE)
+    that prefers brotli for buffered responses when the client sends
+    `Accept-Encoding: br` and the brotli package is installed. Streaming
+    responses (CSV/NDJSON exports) keep Django's chunked gzip.
+
+    BREACH: compressing a secret next to attacker-chosen text leaks the
+    secret through response sizes, but only if the attacker can make the
+    victim's browser send the request with its credentials. API requests
+    authenticate with a JWT in the Authorization header, which a browser never
+    attaches on its own, so their responses are compressed. Requests carrying
+    the session cookie (admin, browsable API) do send ambient credentials and
+    are left uncompressed.
+    """
+
+    def process_response(self, request, response):
+        if settings.SESSION_COOKIE_NAME in request.COOKIES:
+            return response
+        min_size = getattr(settings, "COMPRESSION_MIN_SIZE", 1024)
+        if not response.streaming and len(response.content) < min_size:
+            return response
+        if response.has_header("Content-Encoding"):
+            return response
+
+        ae = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        if brotli is None or response.streaming or not _accepts_br.search(ae):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        quality = getattr(settings, "COMPRESSION_BROTLI_QUALITY", 5)
+        compressed = brotli.compress(response.content, quality=quality)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers["Content-Length"] = str(len(compressed))
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+        return response
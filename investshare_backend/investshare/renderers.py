@@ -0,0 +1,73 @@
+# investshare/renderers.py
+from __future__ import annotations
+
+import datetime
+import decimal
+import ipaddress
+import uuid
+
+from django.utils.functional import Promise
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # optional; plain DRF JSON is used without it
+    orjson = None
+
+
+_IP_TYPES = (
+    ipaddress.IPv4Address, ipaddress.IPv6Address,
+    ipaddress.IPv4Network, ipaddress.IPv6Network,
+    ipaddress.IPv4Interface, ipaddress.IPv6Interface,
+)
+
+
+def _default(obj):
+    """Types orjson doesn't serialize natively – same output as DRF's JSONEncoder."""
+    if isinstance(obj, Promise):
+        return str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, (uuid.UUID, *_IP_TYPES)):
+        return str(obj)
+    if isinstance(obj, bytes):
+        return obj.decode()
+    if hasattr(obj, "tolist"):  # NumPy scalars / arrays orjson's numpy mode rejects
+        return obj.tolist()
+    if hasattr(obj, "__iter__"):  # QuerySets, generators, sets
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Drop-in JSONRenderer on orjson: Decimal, datetime/date, UUID and NumPy
+    arrays/scalars are handled natively or by _default(). Falls back to the
+    stock renderer when orjson isn't installed, the client asks for indent, or
+    orjson can't encode the data (e.g. integers beyond 64 bits).
+
+    Output parses to the same values as DRF's (datetimes as ISO 8601 with
+    microseconds and "Z" for UTC, compact, UTF-8, U+2028/U+2029 escaped), with
+    two differences: NaN/±Infinity become null where DRF's STRICT_JSON raises,
+    and floats may be spelled differently (1e16 for 1e+16).
+    """
+    _options = (
+        orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        if orjson is not None else 0
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_default, option=self._options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # as DRF: the two line terminators JavaScript doesn't allow in string literals
+        if b"\xe2\x80" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
@@ -0,0 +1,103 @@
+# investshare/routers.py
+"""
+Read-replica routing.
+
+Writes always go to "default". Reads go to one of DATABASE_REPLICAS only
+inside a replica_reads() block – which ReplicaReadMixin opens for safe-method
+API requests – and never inside a transaction on the primary (locks and
+read-modify-write sequences must see the primary).
+
+Read-your-writes: a successful unsafe request (or a committed trade) pins
+its user to the primary for REPLICA_PIN_SECONDS, so the page they load
+right after trading doesn't come from a lagging replica. Pins live in the
+default cache, so configure a shared cache when running several workers.
+"""
+from __future__ import annotations
+
+import contextvars
+import random
+from contextlib import contextmanager
+from typing import List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+_reads = contextvars.ContextVar("replica_reads", default=False)
+
+
+def replica_aliases() -> List[str]:
+    return list(getattr(settings, "DATABASE_REPLICAS", ()))
+
+
+def _pin_key(user_id) -> str:
+    return f"db:pinned:{user_id}"
+
+
+def pin_to_primary(user_id) -> None:
+    """Serve *user_id*'s reads from the primary for REPLICA_PIN_SECONDS."""
+    if user_id is not None and replica_aliases():
+        cache.set(_pin_key(user_id), 1, getattr(settings, "REPLICA_PIN_SECONDS", 15))
+
+
+def is_pinned(user_id) -> bool:
+    return user_id is not None and cache.get(_pin_key(user_id)) is not None
+
+
+@contextmanager
+def replica_reads(enabled: bool = True):
+    """Route ORM reads in the block to a replica (no-op without replicas)."""
+    token = _reads.set(enabled)
+    try:
+        yield
+    finally:
+        _reads.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints) -> str:
+        replicas = replica_aliases()
+        if not replicas or not _reads.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints) -> str:
+        # explicit: Django would otherwise write a replica-read instance back to its replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> Optional[bool]:
+        pool = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints) -> Optional[bool]:
+        # replicas get the schema through replication, not migrate
+        return False if db in replica_aliases() else None
+
+
+class ReplicaReadMixin:
+    """
+    DRF view mixin: safe-method requests read from a replica unless the user
+    was pinned by a recent write; successful unsafe requests pin the user.
+    Runs after authentication so JWT users are known.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        user_id = getattr(request.user, "pk", None)
+        if request.method in SAFE_METHODS and not is_pinned(user_id):
+            # restore the old value rather than reset a token: async views run
+            # initial() in a worker thread, whose context is a different one
+            self._replica_prev = _reads.get()
+            _reads.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if hasattr(self, "_replica_prev"):
+            _reads.set(self._replica_prev)
+            del self._replica_prev
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(getattr(request.user, "pk", None))
+        return response
@@ -1,4 +1,5 @@
 # investshare/settings.py
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -18,6 +19,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
+    "investshare.middleware.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -61,6 +63,20 @@ DATABASES = {
     }
 }
 
+# Read replicas (investshare/routers.py): safe-method API reads and background
+# scans go to these aliases; writes and transactions stay on "default". For a
+# local stand-in, copy db.sqlite3 and set REPLICA_DB_NAME to the copy's path.
+DATABASE_REPLICAS: list = []
+if os.environ.get("REPLICA_DB_NAME"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "NAME": os.environ["REPLICA_DB_NAME"],
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append("replica")
+DATABASE_ROUTERS = ["investshare.routers.ReplicaRouter"]
+REPLICA_PIN_SECONDS = 15  # read-your-writes: a user's reads stay on the primary this long after a write
+
 AUTH_PASSWORD_VALIDATORS = []
 LANGUAGE_CODE = "en-us"; TIME_ZONE = "UTC"; USE_I18N = True; USE_TZ = True
 STATIC_URL = "static/"
@@ -74,6 +90,10 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
     "EXCEPTION_HANDLER": "investshare.utils.custom_exception_handler",
+    "DEFAULT_RENDERER_CLASSES": (
+        "investshare.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
     "DEFAULT_THROTTLE_CLASSES": [
         "rest_framework.throttling.UserRateThrottle",
         "rest_framework.throttling.AnonRateThrottle",
@@ -99,3 +119,81 @@ SIMPLE_JWT = {
 }
 
 AUTH_USER_MODEL = "accounts.User"
+
+# Portfolio analytics (/api/portfolios/<id>/analytics/)
+ANALYTICS_BENCHMARK = "SPY"
+ANALYTICS_RISK_FREE_RATE = 0.0  # annual, e.g. 0.04 for 4%
+
+# Background fundamentals refresher (manage.py refresh_fundamentals --loop)
+FUNDAMENTALS_REFRESH_PER_MINUTE = 30
+
+# Max symbols per GET /api/tickers/?symbols=...
+TICKER_BATCH_MAX = 50
+
+# Response compression (gzip; brotli too when the package is installed)
+COMPRESSION_MIN_SIZE = 1024  # bytes; smaller bodies go out as-is
+COMPRESSION_BROTLI_QUALITY = 5
+
+# Quote caching by market session (market/calendar.py): these TTLs apply while
+# prices move; closed-market quotes are kept until the next session starts.
+QUOTE_TTL_REGULAR = 15   # seconds, 09:30–16:00 ET
+QUOTE_TTL_EXTENDED = 60  # seconds, pre/post market
+MARKET_EXTRA_HOLIDAYS: list = []  # ad-hoc NYSE closures, ISO dates ("2025-01-09")
+
+# Shared Yahoo rate limiter (market/upstream.py). Point UPSTREAM_CACHE at a
+# cache all workers share (Redis/Memcached) to make the budget global.
+UPSTREAM_CALLS_PER_MINUTE = 60  # bucket refill rate
+UPSTREAM_BURST = 10             # bucket capacity
+UPSTREAM_CACHE = "default"
+
+# Live-quote latency budget per portfolio render; holdings not quoted in time
+# are valued at the last known price and flagged "stale".
+QUOTE_BUDGET_SECONDS = 2.0
+
+# Async views (investshare/asyncapi.py) run blocking upstream calls on this many
+# threads, so one ASGI worker can keep that many Yahoo requests in flight.
+ASYNC_BLOCKING_WORKERS = 64
+
+# Price history resolution (market/rollups.py). Long chart ranges use weekly or
+# monthly rollups when those still give CHART_MIN_POINTS points; compact_prices
+# drops daily closes / weekly rollups older than these windows (None = keep).
+CHART_MIN_POINTS = 120
+PRICE_DAILY_RETENTION_DAYS = 365 * 5
+PRICE_WEEKLY_RETENTION_DAYS = 365 * 10
+
+# Module behind market.provider.yf. The load-test harness (python -m loadtest)
+# points it at loadtest.fake_market.
+MARKET_DATA_MODULE = "yfinance"
+
+# manage.py import_budget: max import time (ms) for django.setup() + the URLconf.
+# pandas/yfinance must stay out of it entirely (market/provider.py).
+IMPORT_BUDGET_MS = 1000
+
+# Post-trade side effects go through the outbox (portfolios/outbox.py) and are
+# run by `manage.py run_outbox --loop` next to the web workers, which also
+# retries failed events and deletes processed ones after OUTBOX_RETENTION (see
+# README). True runs them right after the commit in the request thread instead:
+# a development/test opt-in for running without a worker, never production.
+OUTBOX_RUN_INLINE = False
+OUTBOX_RETENTION = timedelta(days=7)
+
+# Caches. "payloads" holds computed chart/allocation payloads
+# (portfolios/payloads.py): superseded entries are never deleted, only evicted,
+# so MAX_ENTRIES × PAYLOAD_CACHE_MAX_BYTES bounds its memory (~64 MB here).
+# "default" also holds the price generations and payload epochs that
+# invalidate them. With more than one process (several web workers, the
+# run_outbox worker, cron'd ingest_prices/compact_prices) it must be a shared
+# cache (Redis/Memcached): with local memory a bump made in one process is
+# never seen by the others, and their payloads are only refreshed when they
+# expire (PAYLOAD_CACHE_TTL at most).
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "payloads": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "payloads",
+        "OPTIONS": {"MAX_ENTRIES": 500},
+    },
+}
+PAYLOAD_CACHE = "payloads"
+PAYLOAD_CACHE_TTL = 60 * 60          # seconds; shorter while any holding's quotes are live
+PAYLOAD_CACHE_MAX_BYTES = 128 * 1024  # larger payloads are computed per request
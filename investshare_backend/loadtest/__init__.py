@@ -0,0 +1,16 @@
+"""
+Load-test harness: scripted frontend users against the Django app with a
+fake market-data backend.
+
+    cd investshare_backend
+    python -m loadtest --users 200 --workers 2 --duration 300 \
+        --mix dashboard=6,browser=3,trader=1 --latency-ms 300
+
+Runs on its own settings module (loadtest.settings) and a scratch SQLite
+file, never db.sqlite3. Reports p50/p95/p99, throughput, error statuses,
+"database is locked" failures and upstream calls per request
+(amplification) for every endpoint; --json writes the same as JSON.
+
+The pieces: fake_market (the yfinance stand-in), scenarios (virtual
+users), runner (seeding, worker processes), stats (aggregation, report).
+"""
@@ -0,0 +1,78 @@
+# loadtest/__main__.py
+import argparse
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+
+def _mix(value: str) -> dict:
+    out = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ("dashboard", "browser", "trader"):
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}")
+        out[name.strip()] = int(weight or 1)
+    return out
+
+
+def _range(value: str) -> tuple:
+    lo, _, hi = value.partition(",")
+    return float(lo), float(hi or lo)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m loadtest", description=__import__("loadtest").__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--users", type=int, default=50, help="virtual users (default 50)")
+    ap.add_argument("--mix", type=_mix, default="dashboard=6,browser=3,trader=1",
+                    help="scenario weights (default dashboard=6,browser=3,trader=1)")
+    ap.add_argument("--workers", type=int, default=1, help="app worker processes (default 1)")
+    ap.add_argument("--duration", type=float, default=120, help="seconds, ramp included (default 120)")
+    ap.add_argument("--ramp", type=float, default=10, help="seconds over which users start (default 10)")
+    ap.add_argument("--poll", type=float, default=30, help="dashboard refetch interval (default 30, as the frontend)")
+    ap.add_argument("--trade-every", type=float, default=60, help="mean seconds between a trader's orders (default 60)")
+    ap.add_argument("--think", type=_range, default="5,20", help="browser think time range, s (default 5,20)")
+    ap.add_argument("--latency-ms", type=float, default=300, help="fake upstream mean latency (default 300)")
+    ap.add_argument("--jitter-ms", type=float, default=100, help="fake upstream latency stddev (default 100)")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="share of upstream calls that fail (default 0)")
+    ap.add_argument("--upstream-rpm", type=int, help="upstream limiter rate (default: the app's setting)")
+    ap.add_argument("--accounts", type=int, help="seeded users/portfolios (default max(users, 50))")
+    ap.add_argument("--public-share", type=float, default=0.7, help="share of public portfolios (default 0.7)")
+    ap.add_argument("--history-days", type=int, default=730, help="seeded price history (default 730)")
+    ap.add_argument("--no-outbox", dest="outbox", action="store_false", help="don't run the outbox worker")
+    ap.add_argument("--seed", type=int, default=1, help="random seed for data and user plan")
+    ap.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "investshare-loadtest.sqlite3"),
+                    help="scratch SQLite file, recreated (default in the temp dir)")
+    ap.add_argument("--json", dest="json_path", help="also write the summary here")
+    args = ap.parse_args(argv)
+
+    db = Path(args.db).resolve()
+    if db == (Path(__file__).resolve().parent.parent / "db.sqlite3"):
+        ap.error("--db must not be the application database")
+    for suffix in ("", "-journal", "-wal", "-shm"):
+        Path(f"{db}{suffix}").unlink(missing_ok=True)
+
+    os.environ["DJANGO_SETTINGS_MODULE"] = "loadtest.settings"
+    os.environ["LOADTEST_DB"] = str(db)
+    os.environ["LOADTEST_UPSTREAM_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["LOADTEST_UPSTREAM_JITTER_MS"] = str(args.jitter_ms)
+    os.environ["LOADTEST_UPSTREAM_ERROR_RATE"] = str(args.error_rate)
+    if args.upstream_rpm:
+        os.environ["LOADTEST_UPSTREAM_RPM"] = str(args.upstream_rpm)
+
+    from loadtest import runner
+
+    opts = {k: v for k, v in vars(args).items() if k not in ("db", "json_path", "upstream_rpm")}
+    opts["accounts"] = args.accounts or max(args.users, 50)
+    opts["workers"] = max(1, args.workers)
+    summary = runner.run(opts)
+    print(runner.render(summary))
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(summary, indent=2, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+# loadtest/fake_market.py
+"""
+A local stand-in for the part of yfinance the backend uses: download(),
+Ticker.history(), Ticker.fast_info and Ticker.info.
+
+Prices are a deterministic function of (ticker, time) – a yearly and a
+monthly swing around a per-ticker base plus an hourly wiggle – so every
+call agrees with every other and quotes move while a test runs. Each call
+sleeps for the configured upstream latency and may fail at the configured
+rate, then is counted under the endpoint in `endpoint` (set by the load
+runner around each request; contextvars follow the call into worker threads).
+
+Configured from the environment, so a server started with
+DJANGO_SETTINGS_MODULE=loadtest.settings picks the same values up:
+
+    LOADTEST_UPSTREAM_LATENCY_MS   mean latency per call (default 300)
+    LOADTEST_UPSTREAM_JITTER_MS    standard deviation (default 100)
+    LOADTEST_UPSTREAM_ERROR_RATE   share of calls that raise (default 0)
+"""
+from __future__ import annotations
+
+import contextvars
+import math
+import os
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from datetime import date, datetime, timezone
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+endpoint: contextvars.ContextVar[str] = contextvars.ContextVar("loadtest_endpoint", default="-")
+
+LATENCY = float(os.environ.get("LOADTEST_UPSTREAM_LATENCY_MS", 300)) / 1000
+JITTER = float(os.environ.get("LOADTEST_UPSTREAM_JITTER_MS", 100)) / 1000
+ERROR_RATE = float(os.environ.get("LOADTEST_UPSTREAM_ERROR_RATE", 0))
+
+_lock = threading.Lock()
+_calls: Counter = Counter()
+
+
+class FakeUpstreamError(Exception):
+    """An injected upstream failure."""
+
+
+def configure(latency_ms: Optional[float] = None, jitter_ms: Optional[float] = None,
+              error_rate: Optional[float] = None) -> None:
+    global LATENCY, JITTER, ERROR_RATE
+    if latency_ms is not None:
+        LATENCY = latency_ms / 1000
+    if jitter_ms is not None:
+        JITTER = jitter_ms / 1000
+    if error_rate is not None:
+        ERROR_RATE = error_rate
+
+
+def calls() -> Dict[Tuple[str, str], int]:
+    """{(endpoint, call kind): count} since start/reset()."""
+    with _lock:
+        return dict(_calls)
+
+
+def reset() -> None:
+    with _lock:
+        _calls.clear()
+
+
+def _call(kind: str) -> None:
+    with _lock:
+        _calls[(endpoint.get(), kind)] += 1
+    delay = random.gauss(LATENCY, JITTER) if JITTER else LATENCY
+    if delay > 0:
+        time.sleep(delay)
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        raise FakeUpstreamError(f"injected {kind} failure")
+
+
+# ───────────────────────────── price model ─────────────────────────────
+def _seed(ticker: str) -> int:
+    return zlib.crc32(ticker.upper().encode())
+
+
+def _prices(ticker: str, epoch_s: np.ndarray) -> np.ndarray:
+    s = _seed(ticker)
+    base = 20.0 + s % 480
+    phase = (s % 1000) / 1000 * 2 * math.pi
+    days = epoch_s / 86400.0
+    return base * (
+        1.0
+        + 0.25 * np.sin(2 * math.pi * days / 365.0 + phase)
+        + 0.05 * np.sin(2 * math.pi * days / 23.0 + 2 * phase)
+        + 0.01 * np.sin(2 * math.pi * epoch_s / 3600.0 + phase)
+    )
+
+
+def price_at(ticker: str, when: datetime) -> float:
+    """The model price of *ticker* at *when* (what a call made then would have seen)."""
+    return float(_prices(ticker, np.array([when.timestamp()]))[0])
+
+
+def _price_now(ticker: str) -> float:
+    return float(_prices(ticker, np.array([time.time()]))[0])
+
+
+def _prev_close(ticker: str) -> float:
+    d = pd.Timestamp(date.today()) - pd.offsets.BDay(1)
+    return float(_prices(ticker, np.array([(d + pd.Timedelta(hours=20)).timestamp()]))[0])
+
+
+def _days(period: Optional[str]) -> int:
+    period = (period or "1mo").lower()
+    for suffix, mult in (("mo", 30), ("y", 365), ("d", 1)):
+        if period.endswith(suffix) and period[: -len(suffix)].isdigit():
+            return int(period[: -len(suffix)]) * mult
+    return 3650  # "max"
+
+
+def _utc(x) -> pd.Timestamp:
+    ts = pd.Timestamp(x)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+def _index(start, end, period, interval: str) -> pd.DatetimeIndex:
+    if interval == "1d":
+        last = pd.Timestamp(end).normalize() - pd.Timedelta(days=1) if end is not None else pd.Timestamp(date.today())
+        first = pd.Timestamp(start).normalize() if start is not None else last - pd.Timedelta(days=_days(period))
+        return pd.bdate_range(first, last)
+    # minute bars, pre/post included: weekdays 08:00–24:00 UTC (04:00–20:00 ET)
+    last = _utc(end) if end is not None else pd.Timestamp(datetime.now(timezone.utc))
+    first = _utc(start) if start is not None else last - pd.Timedelta(days=_days(period))
+    idx = pd.date_range(first.ceil("min"), last.floor("min") - pd.Timedelta(minutes=1), freq="min")
+    return idx[(idx.dayofweek < 5) & (idx.hour >= 8)]
+
+
+def _frame(ticker: str, idx: pd.DatetimeIndex, actions: bool, daily: bool) -> pd.DataFrame:
+    if daily:
+        at = (idx + pd.Timedelta(hours=20)).tz_localize("UTC")
+    else:
+        at = idx
+    epoch = (at - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+    close = _prices(ticker, np.asarray(epoch, dtype=float))
+    df = pd.DataFrame(
+        {
+            "Open": close * 0.998,
+            "High": close * 1.004,
+            "Low": close * 0.995,
+            "Close": close,
+            "Adj Close": close,
+            "Volume": np.full(len(idx), 1_000_000),
+        },
+        index=idx,
+    )
+    if actions:
+        df["Dividends"] = 0.0
+        df["Stock Splits"] = 0.0
+    return df
+
+
+# ───────────────────────────── yfinance surface ─────────────────────────────
+def download(tickers, start=None, end=None, period=None, interval="1d", actions=False,
+             group_by="column", **_) -> pd.DataFrame:
+    _call(f"download:{interval}")
+    syms = [tickers] if isinstance(tickers, str) else list(tickers)
+    idx = _index(start, end, period, interval)
+    frames = {t: _frame(t, idx, actions, interval == "1d") for t in syms}
+    if isinstance(tickers, str):
+        return frames[tickers]
+    df = pd.concat(frames, axis=1)  # (ticker, field)
+    return df if group_by == "ticker" else df.swaplevel(0, 1, axis=1)
+
+
+class Ticker:
+    def __init__(self, ticker: str):
+        self.ticker = ticker
+
+    def history(self, period="1mo", interval="1d", start=None, end=None, actions=True, **_) -> pd.DataFrame:
+        _call(f"history:{interval}")
+        return _frame(self.ticker, _index(start, end, period, interval), actions, interval == "1d")
+
+    @property
+    def fast_info(self) -> dict:
+        _call("fast_info")
+        px = _price_now(self.ticker)
+        prev = _prev_close(self.ticker)
+        return {
+            "last_price": px, "regularMarketPrice": px,
+            "previous_close": prev, "regularMarketPreviousClose": prev,
+            "marketCap": px * 1e8,
+        }
+
+    @property
+    def info(self) -> dict:
+        _call("info")
+        px = _price_now(self.ticker)
+        return {"marketCap": px * 1e8, "trailingPE": 18.5, "trailingEps": px / 18.5}
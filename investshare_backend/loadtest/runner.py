@@ -0,0 +1,252 @@
+# loadtest/runner.py
+"""
+Seed a scratch database, run the virtual users in worker processes and
+collect the numbers.
+
+Each worker process is one app worker: its own event loop driving the
+ASGI application in-process (AsyncClient), its own local-memory caches and
+upstream limiter, and the shared SQLite file – so lock contention between
+workers is real. The parent seeds, then runs the outbox worker
+(run_outbox_batch) next to them, as `manage.py run_outbox --loop` would.
+"""
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import queue as queue_mod
+import random
+import sys
+import time
+import traceback
+from collections import Counter
+from typing import Dict, List
+
+from . import stats as st
+
+UNIVERSE = [
+    "AAPL", "MSFT", "NVDA", "AMZN", "GOOGL", "META", "TSLA", "BRK.B", "JPM", "V",
+    "UNH", "XOM", "JNJ", "PG", "MA", "HD", "COST", "ABBV", "MRK", "AVGO",
+    "PEP", "KO", "ADBE", "CRM", "NFLX", "AMD", "INTC", "DIS", "NKE", "BA",
+    "SPY", "QQQ", "VTI", "IWM", "TLT", "GLD", "ARKK", "SOFI", "PLTR", "UBER",
+]
+
+
+def setup() -> None:
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "loadtest.settings")
+    import django
+    django.setup()
+
+
+# ───────────────────────────── seeding ─────────────────────────────
+def seed(accounts: int, public_share: float, history_days: int, rnd: random.Random) -> dict:
+    """
+    Users lt0..ltN (one password), a portfolio each with 3–8 holdings bought
+    through import_trades, and daily history for UNIVERSE via ingest_history
+    (fake upstream latency off while seeding).
+    """
+    from datetime import date, datetime, time as dtime, timedelta, timezone
+    from decimal import Decimal
+
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from django.core.management import call_command
+
+    from market.prices import ingest_history
+    from portfolios.imports import CENT, import_trades
+    from portfolios.models import Portfolio, Trade
+    from . import fake_market
+    from .scenarios import PASSWORD
+
+    call_command("migrate", verbosity=0)
+    User = get_user_model()
+    pw = make_password(PASSWORD)
+    users = User.objects.bulk_create([
+        User(username=f"lt{i}", email=f"lt{i}@loadtest.invalid", password=pw) for i in range(accounts)
+    ])
+    portfolios = Portfolio.objects.bulk_create([
+        Portfolio(owner=u, name=f"Load test {u.username}",
+                  visibility="public" if rnd.random() < public_share else "private")
+        for u in users
+    ])
+
+    latency = (fake_market.LATENCY * 1000, fake_market.JITTER * 1000, fake_market.ERROR_RATE)
+    fake_market.configure(0, 0, 0)
+    try:
+        start = date.today() - timedelta(days=history_days)
+        ingest_history(UNIVERSE, start)
+        when = datetime.combine(start, dtime(15, 0), tzinfo=timezone.utc)
+        for p in portfolios:
+            fills = [Trade(type="CASH_IN", cash_delta=Decimal("1000000"), executed_at=when)]
+            for t in rnd.sample(UNIVERSE, rnd.randint(3, 8)):
+                qty = Decimal(rnd.randint(1, 50))
+                px = Decimal(str(round(fake_market.price_at(t, when), 4)))
+                fills.append(Trade(type="BUY", ticker=t, quantity=qty, price=px,
+                                   cash_delta=-(qty * px).quantize(CENT), executed_at=when))
+            import_trades(p, fills)
+    finally:
+        fake_market.configure(*latency)
+        fake_market.reset()
+
+    return {
+        "usernames": [u.username for u in users],
+        "public_ids": [p.pk for p in portfolios if p.visibility == "public"],
+    }
+
+
+def plan_users(n: int, mix: Dict[str, int], seeded: dict, rnd: random.Random) -> List[dict]:
+    """Scenario and account per virtual user; owners get distinct accounts while they last."""
+    names = list(mix)
+    weights = [mix[k] for k in names]
+    accounts = seeded["usernames"]
+    return [
+        {"scenario": rnd.choices(names, weights)[0], "username": accounts[i % len(accounts)]}
+        for i in range(n)
+    ]
+
+
+# ───────────────────────────── worker process ─────────────────────────────
+def worker_main(index: int, users: List[dict], opts: dict, out) -> None:
+    setup()
+    from market.upstream import metrics
+    from . import fake_market
+
+    stats = st.Stats()
+    crashes = Counter()
+    try:
+        elapsed = asyncio.run(_drive(users, opts, stats, crashes))
+    except BaseException:
+        traceback.print_exc()
+        elapsed = 0.0
+        crashes["worker"] += 1
+    out.put({
+        "worker": index,
+        "elapsed": elapsed,
+        "stats": stats.dump(),
+        "crashes": dict(crashes),
+        "upstream": fake_market.calls(),
+        "limiter": metrics(),
+    })
+
+
+async def _drive(users: List[dict], opts: dict, stats: st.Stats, crashes: Counter) -> float:
+    from .scenarios import SCENARIOS, Session
+
+    start = time.monotonic()
+    deadline = start + opts["duration"]
+
+    async def one(u: dict, delay: float) -> None:
+        await asyncio.sleep(delay)
+        if time.monotonic() >= deadline:
+            return
+        try:
+            await SCENARIOS[u["scenario"]](Session(stats, deadline), {**opts, "username": u["username"]})
+        except Exception as e:
+            crashes[f"{u['scenario']}: {type(e).__name__}: {e}"[:200]] += 1
+
+    n = max(len(users), 1)
+    await asyncio.gather(*(one(u, opts["ramp"] * i / n) for i, u in enumerate(users)))
+    return time.monotonic() - start
+
+
+# ───────────────────────────── parent ─────────────────────────────
+def run(opts: dict) -> dict:
+    """Seed, run opts["workers"] worker processes for opts["duration"] seconds, return the summary."""
+    setup()
+    from django.db import connections
+
+    from market.upstream import METRICS
+    from portfolios.models import OutboxEvent
+    from portfolios.outbox import run_outbox_batch
+    from . import fake_market
+
+    rnd = random.Random(opts["seed"])
+    t0 = time.monotonic()
+    seeded = seed(opts["accounts"], opts["public_share"], opts["history_days"], rnd)
+    users = plan_users(opts["users"], opts["mix"], seeded, rnd)
+    seeded_in = time.monotonic() - t0
+    connections.close_all()
+
+    ctx_opts = {**opts, "public_ids": seeded["public_ids"], "universe": UNIVERSE}
+    mp = multiprocessing.get_context("spawn")
+    out = mp.Queue()
+    procs = [
+        mp.Process(target=worker_main, args=(i, users[i::opts["workers"]], ctx_opts, out), daemon=True)
+        for i in range(opts["workers"])
+    ]
+    for p in procs:
+        p.start()
+
+    # the outbox worker runs here, next to the app workers, as in production
+    results: List[dict] = []
+    outbox_done = 0
+    token = fake_market.endpoint.set("outbox")
+    try:
+        while len(results) < len(procs):
+            try:
+                results.append(out.get(timeout=1.0))
+                continue
+            except queue_mod.Empty:
+                pass
+            if opts["outbox"]:
+                try:
+                    outbox_done += run_outbox_batch()
+                except Exception as e:  # e.g. database is locked while claiming
+                    print(f"outbox batch failed: {e}", file=sys.stderr)
+            if not any(p.is_alive() for p in procs) and out.empty():
+                break
+    finally:
+        fake_market.endpoint.reset(token)
+    for p in procs:
+        p.join(timeout=10)
+
+    elapsed = max([r["elapsed"] for r in results] or [0.0])
+    merged = st.merge([r["stats"] for r in results])
+    upstream = st.merge_calls([r["upstream"] for r in results] + [fake_market.calls()])
+    limiter: Dict[str, Counter] = {}
+    for r in results:
+        for cls, row in r["limiter"].items():
+            limiter.setdefault(cls, Counter()).update({m: row.get(m, 0) for m in METRICS})
+    crashes: Counter = Counter()
+    for r in results:
+        crashes.update(r["crashes"])
+
+    pending = OutboxEvent.objects.filter(processed_at__isnull=True)
+    return {
+        "config": {k: opts[k] for k in ("users", "workers", "duration", "ramp", "mix", "poll", "trade_every",
+                                        "latency_ms", "jitter_ms", "error_rate", "accounts")},
+        "seeded_seconds": round(seeded_in, 1),
+        "elapsed_seconds": round(elapsed, 1),
+        "workers_reported": len(results),
+        "endpoints": st.summarize(merged, upstream, elapsed),
+        "limiter": {cls: dict(c) for cls, c in limiter.items()},
+        "outbox": {
+            "processed": outbox_done,
+            "backlog": pending.count(),
+            "failed_locked": pending.filter(last_error__icontains="locked").count(),
+        },
+        "crashes": dict(crashes),
+    }
+
+
+def render(summary: dict) -> str:
+    c = summary["config"]
+    lines = [
+        f"{c['users']} users ({', '.join(f'{k}={v}' for k, v in c['mix'].items())}) on {c['workers']} worker(s), "
+        f"{summary['elapsed_seconds']}s (ramp {c['ramp']}s); upstream {c['latency_ms']}±{c['jitter_ms']} ms, "
+        f"error rate {c['error_rate']}",
+        "",
+        st.render(summary["endpoints"]),
+        "",
+        "upstream limiter: " + ", ".join(
+            f"{cls} calls={row.get('calls', 0)} throttled={row.get('throttled', 0)}"
+            for cls, row in summary["limiter"].items()
+        ),
+        "outbox: " + ", ".join(f"{k}={v}" for k, v in summary["outbox"].items()),
+    ]
+    if summary["crashes"]:
+        lines.append("scenario crashes:")
+        lines += [f"  {n:>5}  {what}" for what, n in Counter(summary["crashes"]).most_common()]
+    if summary["workers_reported"] < c["workers"]:
+        lines.append(f"only {summary['workers_reported']} of {c['workers']} workers reported")
+    return "\n".join(lines)
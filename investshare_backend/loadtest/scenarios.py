@@ -0,0 +1,167 @@
+# loadtest/scenarios.py
+"""
+Virtual users that request what the frontend requests
+(investshare_frontend/src/hooks, screens):
+
+    dashboard  log in, open My Portfolio (me, mine, portfolio, allocations,
+               chart, trades), then refetch portfolio/allocations/chart every
+               `poll` seconds – the refetchInterval of usePortfolio,
+               useAllocations and useChart
+    browser    anonymous: a page of public portfolios, open one (portfolio,
+               allocations, chart, trades), look up one of its tickers,
+               think, repeat
+    trader     a dashboard user who also buys or sells about every
+               `trade_every` seconds, then refetches what the mutation
+               invalidates
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.test import AsyncClient
+
+from .fake_market import endpoint
+from .stats import Stats
+
+CHART_POINTS = 400   # usePortfolios.ts
+CHART_RANGE = "all"  # MyPortfolioPage/PortfolioPage default
+PASSWORD = "loadtest-pw"
+
+
+class Session:
+    """One browser: an AsyncClient (in-process ASGI) plus the bearer token once logged in."""
+
+    def __init__(self, stats: Stats, deadline: float):
+        self.client = AsyncClient(raise_request_exception=False)
+        self.stats = stats
+        self.deadline = deadline
+        self.headers: Dict[str, str] = {}
+
+    @property
+    def running(self) -> bool:
+        return time.monotonic() < self.deadline
+
+    async def sleep(self, seconds: float) -> None:
+        await asyncio.sleep(max(0.0, min(seconds, self.deadline - time.monotonic())))
+
+    async def call(self, method: str, name: str, path: str, data: Optional[dict] = None):
+        """Request *path*, recorded under *name*; the JSON body, or None on an error status."""
+        token = endpoint.set(name)
+        start = time.perf_counter()
+        try:
+            if method == "GET":
+                r = await self.client.get(path, headers=self.headers)
+            else:
+                r = await self.client.post(path, data or {}, content_type="application/json", headers=self.headers)
+        finally:
+            endpoint.reset(token)
+        body = b"" if getattr(r, "streaming", False) else r.content
+        self.stats.record(name, time.perf_counter() - start, r.status_code, body)
+        if r.status_code >= 400 or not body:
+            return None
+        try:
+            return r.json()
+        except ValueError:
+            return None
+
+    async def login(self, username: str) -> bool:
+        tokens = await self.call("POST", "POST /auth/login/", "/auth/login/",
+                                 {"username": username, "password": PASSWORD})
+        if not tokens:
+            return False
+        self.headers = {"Authorization": f"Bearer {tokens['access']}"}
+        return True
+
+
+# ───────────────────────────── page loads ─────────────────────────────
+def _portfolio_requests(s: Session, pid: int) -> list:
+    """What usePortfolio/useAllocations/useChart fetch – in parallel, like React Query."""
+    return [
+        s.call("GET", "GET /api/portfolios/{id}/", f"/api/portfolios/{pid}/"),
+        s.call("GET", "GET /api/portfolios/{id}/allocations/", f"/api/portfolios/{pid}/allocations/"),
+        s.call("GET", "GET /api/portfolios/{id}/chart/",
+               f"/api/portfolios/{pid}/chart/?range={CHART_RANGE}&points={CHART_POINTS}"),
+    ]
+
+
+async def _refetch(s: Session, pid: int) -> None:
+    await asyncio.gather(*_portfolio_requests(s, pid))
+
+
+async def _open_portfolio(s: Session, pid: int) -> Optional[dict]:
+    pf, *_ = await asyncio.gather(
+        *_portfolio_requests(s, pid),
+        s.call("GET", "GET /api/portfolios/{id}/trades/", f"/api/portfolios/{pid}/trades/?page=1&page_size=10"),
+    )
+    return pf
+
+
+async def _open_dashboard(s: Session, username: str) -> Optional[int]:
+    if not await s.login(username):
+        return None
+    await s.call("GET", "GET /auth/me/", "/auth/me/")
+    mine = await s.call("GET", "GET /api/portfolios/mine/", "/api/portfolios/mine/")
+    if not mine:
+        return None
+    await _open_portfolio(s, mine["id"])
+    return mine["id"]
+
+
+async def _poll(s: Session, pid: int, every: float) -> None:
+    while s.running:
+        await s.sleep(every * random.uniform(0.95, 1.05))
+        if s.running:
+            await _refetch(s, pid)
+
+
+# ───────────────────────────── scenarios ─────────────────────────────
+async def dashboard(s: Session, ctx: dict) -> None:
+    pid = await _open_dashboard(s, ctx["username"])
+    if pid is not None:
+        await _poll(s, pid, ctx["poll"])
+
+
+async def browser(s: Session, ctx: dict) -> None:
+    public: List[int] = ctx["public_ids"]
+    pages = max(1, min(3, -(-len(public) // settings.REST_FRAMEWORK.get("PAGE_SIZE", 20))))
+    while s.running and public:
+        page = random.randint(1, pages)
+        listing = await s.call("GET", "GET /api/public-portfolios/", f"/api/public-portfolios/?page={page}&page_size=10")
+        rows = (listing or {}).get("results") or []
+        pid = random.choice(rows)["id"] if rows else random.choice(public)
+        pf = await _open_portfolio(s, pid)
+        holdings = (pf or {}).get("holdings") or []
+        if holdings:
+            sym = random.choice(holdings)["ticker"]
+            await s.call("GET", "GET /api/tickers/{symbol}/", f"/api/tickers/{sym}/")
+        await s.sleep(random.uniform(*ctx["think"]))
+
+
+async def trader(s: Session, ctx: dict) -> None:
+    pid = await _open_dashboard(s, ctx["username"])
+    if pid is None:
+        return
+
+    async def trade_loop():
+        while s.running:
+            await s.sleep(ctx["trade_every"] * random.uniform(0.5, 1.5))
+            if not s.running:
+                break
+            pf = await s.call("GET", "GET /api/portfolios/{id}/", f"/api/portfolios/{pid}/")
+            held = [h["ticker"] for h in (pf or {}).get("holdings") or [] if float(h["quantity"]) >= 1]
+            if held and random.random() < 0.5:
+                side, sym = "sell", random.choice(held)
+            else:
+                side, sym = "buy", random.choice(ctx["universe"])
+            await s.call("POST", f"POST /api/portfolios/{{id}}/trades/{side}/",
+                         f"/api/portfolios/{pid}/trades/{side}/", {"ticker": sym, "quantity": "1"})
+            await _refetch(s, pid)  # the mutation's onSuccess invalidations
+
+    await asyncio.gather(_poll(s, pid, ctx["poll"]), trade_loop())
+
+
+SCENARIOS: Dict[str, Callable] = {"dashboard": dashboard, "browser": browser, "trader": trader}
@@ -0,0 +1,33 @@
+# loadtest/settings.py
+"""
+investshare.settings for load tests: a scratch SQLite file (LOADTEST_DB,
+recreated by every run), the fake market provider, no request throttling
+and DEBUG off so query logging doesn't skew the numbers. The upstream
+limiter keeps its production rate unless LOADTEST_UPSTREAM_RPM is set.
+"""
+import os
+import tempfile
+
+from investshare.settings import *  # noqa: F401,F403
+from investshare.settings import DATABASES, REST_FRAMEWORK, UPSTREAM_CALLS_PER_MINUTE
+
+DEBUG = False
+SECRET_KEY = "loadtest-only-" + "k" * 40  # PyJWT warns on every token for HMAC keys under 32 bytes
+
+DATABASES = {
+    "default": {
+        **DATABASES["default"],
+        "NAME": os.environ.get("LOADTEST_DB") or os.path.join(tempfile.gettempdir(), "investshare-loadtest.sqlite3"),
+    }
+}
+DATABASE_REPLICAS: list = []
+OUTBOX_RUN_INLINE = False  # the runner drives run_outbox_batch itself
+
+MARKET_DATA_MODULE = "loadtest.fake_market"
+UPSTREAM_CALLS_PER_MINUTE = int(os.environ.get("LOADTEST_UPSTREAM_RPM") or UPSTREAM_CALLS_PER_MINUTE)
+
+# a None rate lets every request through (DRF SimpleRateThrottle)
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    "DEFAULT_THROTTLE_RATES": {scope: None for scope in REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]},
+}
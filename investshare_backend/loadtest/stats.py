@@ -0,0 +1,119 @@
+# loadtest/stats.py
+"""Per-endpoint request records, merged across worker processes, and the report."""
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+LOCKED = b"database is locked"
+
+
+class Stats:
+    """What one worker saw, keyed by endpoint name ("GET /api/portfolios/{id}/chart/")."""
+
+    def __init__(self):
+        self.latency: Dict[str, List[float]] = defaultdict(list)
+        self.status: Dict[str, Counter] = defaultdict(Counter)
+        self.locked: Counter = Counter()
+
+    def record(self, name: str, seconds: float, status: int, body: bytes = b"") -> None:
+        self.latency[name].append(seconds)
+        self.status[name][status] += 1
+        if LOCKED in body:
+            self.locked[name] += 1
+
+    def dump(self) -> dict:
+        return {
+            "latency": dict(self.latency),
+            "status": {k: dict(v) for k, v in self.status.items()},
+            "locked": dict(self.locked),
+        }
+
+
+def merge(dumps: List[dict]) -> Stats:
+    out = Stats()
+    for d in dumps:
+        for name, xs in d["latency"].items():
+            out.latency[name].extend(xs)
+        for name, st in d["status"].items():
+            out.status[name].update(st)
+        out.locked.update(d["locked"])
+    return out
+
+
+def merge_calls(dumps: List[Dict[Tuple[str, str], int]]) -> Dict[str, Counter]:
+    """{endpoint: Counter(call kind → n)} from fake_market.calls() of every process."""
+    out: Dict[str, Counter] = defaultdict(Counter)
+    for d in dumps:
+        for (name, kind), n in d.items():
+            out[name][kind] += n
+    return out
+
+
+def summarize(stats: Stats, upstream: Dict[str, Counter], elapsed: float) -> List[dict]:
+    """One row per endpoint (plus upstream-only callers such as the outbox worker), then "total"."""
+    rows = []
+    names = sorted(set(stats.latency) | set(upstream))
+    all_lat: List[float] = []
+    for name in names:
+        lat = np.array(stats.latency.get(name, []), dtype=float) * 1000
+        all_lat.extend(lat.tolist())
+        n = int(lat.size)
+        calls = sum(upstream.get(name, Counter()).values())
+        status = stats.status.get(name, Counter())
+        rows.append(_row(name, lat, status, stats.locked.get(name, 0), calls, elapsed))
+        rows[-1]["upstream_by_kind"] = dict(upstream.get(name, {}))
+        rows[-1]["amplification"] = round(calls / n, 3) if n else None
+    total_status: Counter = Counter()
+    for st in stats.status.values():
+        total_status.update(st)
+    calls = sum(sum(c.values()) for c in upstream.values())
+    total = _row("total", np.array(all_lat), total_status, sum(stats.locked.values()), calls, elapsed)
+    n = total["requests"]
+    total["amplification"] = round(calls / n, 3) if n else None
+    rows.append(total)
+    return rows
+
+
+def _row(name: str, lat_ms: np.ndarray, status: Counter, locked: int, calls: int, elapsed: float) -> dict:
+    n = int(lat_ms.size)
+    pct = np.percentile(lat_ms, [50, 95, 99]) if n else [None] * 3
+    return {
+        "endpoint": name,
+        "requests": n,
+        "rps": round(n / elapsed, 2) if elapsed > 0 else None,
+        "p50_ms": _r(pct[0]),
+        "p95_ms": _r(pct[1]),
+        "p99_ms": _r(pct[2]),
+        "max_ms": _r(lat_ms.max()) if n else None,
+        "errors": sum(c for s, c in status.items() if s >= 400),
+        "status": {str(s): c for s, c in sorted(status.items())},
+        "locked": locked,
+        "upstream": calls,
+    }
+
+
+def _r(x):
+    return None if x is None else round(float(x), 1)
+
+
+COLUMNS = (("endpoint", 44), ("requests", 8), ("rps", 8), ("p50_ms", 8), ("p95_ms", 8), ("p99_ms", 8),
+           ("errors", 7), ("locked", 7), ("upstream", 9), ("amplification", 14))
+
+
+def render(rows: List[dict]) -> str:
+    def line(values) -> str:
+        cells = []
+        for (name, width), v in zip(COLUMNS, values):
+            v = "-" if v is None else str(v)
+            cells.append(v[:width].ljust(width) if name == "endpoint" else v.rjust(width))
+        return " ".join(cells)
+
+    out = [line(name for name, _ in COLUMNS)]
+    for row in rows:
+        if row["endpoint"] == "total":
+            out.append("-" * len(out[0]))
+        out.append(line(row[name] for name, _ in COLUMNS))
+    return "\n".join(out)
@@ -0,0 +1,61 @@
+# market/actions.py
+"""
+Corporate-action adjustment factors on PriceSnapshot.
+
+Each row carries cumulative factors through its date:
+
+    split_factor   Π split ratios with ex-date ≤ date
+    return_factor  Π split × close_prev / (close_prev − dividend) with ex-date ≤ date
+
+so a close in today's share units is close × split_factor / latest
+split_factor, and close × return_factor is a total-return level. Factors
+only grow forward in time, so an action changes the rows from its ex-date
+on and nothing before it: recompute_factors() walks just that tail.
+"""
+from __future__ import annotations
+
+from datetime import date
+from typing import Iterable
+
+from .generation import bump_price_generation
+from .models import PriceSnapshot
+from .rollups import update_rollups
+
+
+def recompute_factors(ticker: str, since: date) -> int:
+    """Rebuild *ticker*'s factors from *since* on, seeded by the row before. Returns rows changed."""
+    prev = (
+        PriceSnapshot.objects.filter(ticker=ticker, date__lt=since)
+        .order_by("-date").values_list("close", "split_factor", "return_factor").first()
+    )
+    prev_close, split_f, ret_f = (float(prev[0]), prev[1], prev[2]) if prev else (None, 1.0, 1.0)
+
+    changed = []
+    for row in PriceSnapshot.objects.filter(ticker=ticker, date__gte=since).order_by("date").only(
+        "id", "close", "dividend", "split", "split_factor", "return_factor"
+    ):
+        split = float(row.split) or 1.0
+        dividend = float(row.dividend)
+        split_f *= split
+        ret_f *= split
+        if dividend > 0 and prev_close and prev_close > dividend:
+            ret_f *= prev_close / (prev_close - dividend)
+        if row.split_factor != split_f or row.return_factor != ret_f:
+            row.split_factor, row.return_factor = split_f, ret_f
+            changed.append(row)
+        prev_close = float(row.close)
+    PriceSnapshot.objects.bulk_update(changed, ["split_factor", "return_factor"], batch_size=1000)
+    return len(changed)
+
+
+def history_changed(tickers: Iterable[str], since: date) -> None:
+    """
+    Call after writing PriceSnapshot rows dated *since* or later: carries
+    the adjustment factors forward, rebuilds the rollups and bumps the
+    tickers' price generations.
+    """
+    tickers = sorted(set(tickers))
+    for t in tickers:
+        recompute_factors(t, since)
+    update_rollups(tickers, since)
+    bump_price_generation(tickers)
@@ -0,0 +1,211 @@
+# market/calendar.py
+"""
+US equity session calendar (NYSE/Nasdaq hours, US/Eastern).
+
+    pre      04:00–09:30
+    regular  09:30–16:00   (13:00 on early-close days)
+    post     16:00–20:00   (17:00 on early-close days)
+    closed   otherwise, weekends and exchange holidays
+
+Quote paths ask session_ttl()/quote_ttl() how long a fetched value may be
+served: seconds while prices move, and until the next session starts while
+they can't.
+"""
+from __future__ import annotations
+
+import re
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import FrozenSet, Optional, Tuple
+
+import pytz
+from django.conf import settings
+
+EASTERN = pytz.timezone("US/Eastern")
+
+PRE, REGULAR, POST, CLOSED = "pre", "regular", "post", "closed"
+
+PRE_OPEN = time(4, 0)
+REGULAR_OPEN = time(9, 30)
+REGULAR_CLOSE = time(16, 0)
+POST_CLOSE = time(20, 0)
+EARLY_CLOSE = time(13, 0)
+EARLY_POST_CLOSE = time(17, 0)
+
+# Yahoo's last extended-hours bars can land a few minutes after the bell;
+# keep live TTLs this long after a session ends before freezing quotes.
+SETTLE = timedelta(minutes=15)
+
+_US_CLASS_SUFFIX = re.compile(r"\.[A-C]$")  # BRK.B, BF.A – still US listings
+
+
+# ───────────────────────────── holiday rules ─────────────────────────────
+def _easter(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)."""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """n-th *weekday* (Mon=0) of the month; n=-1 for the last one."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(d: date) -> date:
+    """Saturday holidays move to Friday, Sunday ones to Monday."""
+    if d.weekday() == 5:
+        return d - timedelta(days=1)
+    if d.weekday() == 6:
+        return d + timedelta(days=1)
+    return d
+
+
+@lru_cache(maxsize=64)
+def holidays(year: int) -> FrozenSet[date]:
+    days = {
+        _nth_weekday(year, 1, 0, 3),         # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),         # Washington's Birthday
+        _easter(year) - timedelta(days=2),   # Good Friday
+        _nth_weekday(year, 5, 0, -1),        # Memorial Day
+        _observed(date(year, 7, 4)),         # Independence Day
+        _nth_weekday(year, 9, 0, 1),         # Labor Day
+        _nth_weekday(year, 11, 3, 4),        # Thanksgiving
+        _observed(date(year, 12, 25)),       # Christmas
+    }
+    # NYSE doesn't move a Saturday New Year's Day back into the old year
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        days.add(_observed(new_year))
+    if year >= 2022:
+        days.add(_observed(date(year, 6, 19)))  # Juneteenth
+    days.update(
+        d for d in map(date.fromisoformat, getattr(settings, "MARKET_EXTRA_HOLIDAYS", ()))
+        if d.year == year
+    )
+    return frozenset(days)
+
+
+@lru_cache(maxsize=64)
+def early_closes(year: int) -> FrozenSet[date]:
+    """13:00 closes: July 3, the day after Thanksgiving, Christmas Eve (weekdays only)."""
+    candidates = (
+        date(year, 7, 3),
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1),
+        date(year, 12, 24),
+    )
+    return frozenset(d for d in candidates if d.weekday() < 5 and d not in holidays(year))
+
+
+def is_trading_day(d: date) -> bool:
+    return d.weekday() < 5 and d not in holidays(d.year)
+
+
+# ───────────────────────────── sessions ─────────────────────────────
+def follows_us_session(ticker: str) -> bool:
+    """
+    False for symbols that trade on other clocks – crypto pairs (BTC-USD),
+    FX/futures (EURUSD=X, CL=F) and non-US listings (VOD.L, SHOP.TO).
+    """
+    t = (ticker or "").upper()
+    if "=" in t or re.search(r"-(USD|USDT|EUR|GBP|BTC)$", t):
+        return False
+    return "." not in t or bool(_US_CLASS_SUFFIX.search(t))
+
+
+def _now(now: Optional[datetime]) -> datetime:
+    return (now or datetime.now(pytz.UTC)).astimezone(EASTERN)
+
+
+def _at(d: date, t: time) -> datetime:
+    return EASTERN.localize(datetime.combine(d, t))
+
+
+def _hours(d: date) -> Tuple[datetime, datetime, datetime, datetime]:
+    """(pre open, regular open, regular close, post close) for a trading day."""
+    early = d in early_closes(d.year)
+    return (
+        _at(d, PRE_OPEN),
+        _at(d, REGULAR_OPEN),
+        _at(d, EARLY_CLOSE if early else REGULAR_CLOSE),
+        _at(d, EARLY_POST_CLOSE if early else POST_CLOSE),
+    )
+
+
+def session_at(now: Optional[datetime] = None, ticker: str = "") -> str:
+    """pre / regular / post / closed at *now* (default: current time)."""
+    if ticker and not follows_us_session(ticker):
+        return REGULAR  # unknown calendar: treat as always live
+    et = _now(now)
+    if not is_trading_day(et.date()):
+        return CLOSED
+    pre, open_, close, post = _hours(et.date())
+    if pre <= et < open_:
+        return PRE
+    if open_ <= et < close:
+        return REGULAR
+    if close <= et < post:
+        return POST
+    return CLOSED
+
+
+def is_open(now: Optional[datetime] = None, ticker: str = "") -> bool:
+    """True in any session where prices can move (pre, regular or post)."""
+    return session_at(now, ticker) != CLOSED
+
+
+def next_session_start(now: Optional[datetime] = None) -> datetime:
+    """Start of the next pre-market session strictly after *now*."""
+    et = _now(now)
+    d = et.date()
+    for _ in range(15):
+        if is_trading_day(d) and _hours(d)[0] > et:
+            return _hours(d)[0]
+        d += timedelta(days=1)
+    return _at(d, PRE_OPEN)
+
+
+def last_session_end(now: Optional[datetime] = None) -> datetime:
+    """End of the most recent post-market session at or before *now*."""
+    et = _now(now)
+    d = et.date()
+    for _ in range(15):
+        if is_trading_day(d) and _hours(d)[3] <= et:
+            return _hours(d)[3]
+        d -= timedelta(days=1)
+    return _at(d, POST_CLOSE)
+
+
+def session_ttl(live: int, ticker: str = "", now: Optional[datetime] = None) -> int:
+    """
+    Cache lifetime for market data: *live* seconds while a session is on (or
+    just ended and late bars may still arrive); otherwise the time left until
+    the next session starts, so closed-market values are fetched once.
+    """
+    if is_open(now, ticker):
+        return live
+    et = _now(now)
+    if et - last_session_end(et) < SETTLE:
+        return live
+    return max(live, int((next_session_start(et) - et).total_seconds()))
+
+
+def quote_ttl(ticker: str = "", now: Optional[datetime] = None) -> int:
+    """session_ttl() with QUOTE_TTL_REGULAR in regular hours, QUOTE_TTL_EXTENDED in pre/post."""
+    live = (
+        getattr(settings, "QUOTE_TTL_REGULAR", 15)
+        if session_at(now, ticker) == REGULAR
+        else getattr(settings, "QUOTE_TTL_EXTENDED", 60)
+    )
+    return session_ttl(live, ticker, now)
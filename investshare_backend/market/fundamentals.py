@@ -1,10 +1,22 @@
 # market/fundamentals.py
-import yfinance as yf
+import time
+from datetime import timedelta
+from typing import List
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.timezone import now
+
+from .models import TickerInfo
+from .upstream import BACKGROUND, acquire, priority
+from .provider import yf
 
 def fetch_fundamentals(symbol: str) -> dict:
     t = yf.Ticker(symbol)
     # fast_info is lightweight; .info is heavier but richer
+    acquire()
     fast = getattr(t, "fast_info", {}) or {}
+    acquire()
     info = getattr(t, "info", {}) or {}
 
     def pick(*keys, src=None):
@@ -24,3 +36,84 @@ def fetch_fundamentals(symbol: str) -> dict:
         "eps": float(eps) if eps is not None else None,
     }
 
+
+
+# ───────────────── stale-while-revalidate refresh queue ─────────────────
+FUNDAMENTALS_MAX_AGE = timedelta(hours=24)
+MISSING_RETRY_AFTER = timedelta(hours=1)   # tickers Yahoo has no market cap for (ETFs, ...)
+REFRESH_LEASE = timedelta(minutes=5)       # a crashed worker's claim expires after this
+
+
+def _stale_q(at):
+    return Q(updated_at__lt=at - FUNDAMENTALS_MAX_AGE) | Q(market_cap__isnull=True, updated_at__lt=at - MISSING_RETRY_AFTER)
+
+
+def is_stale(info: TickerInfo, created: bool = False) -> bool:
+    age = now() - info.updated_at
+    return created or age > FUNDAMENTALS_MAX_AGE or (not info.market_cap and age > MISSING_RETRY_AFTER)
+
+
+def request_refresh(*symbols: str) -> bool:
+    """Queue a background refresh of *symbols*; no-op for those already queued. Never blocks on Yahoo."""
+    return TickerInfo.objects.filter(ticker__in=symbols, refresh_requested_at__isnull=True) \
+        .update(refresh_requested_at=now()) > 0
+
+
+def _claim(symbol: str) -> bool:
+    """Take the per-ticker lease so at most one refresh is in flight."""
+    t = now()
+    return TickerInfo.objects.filter(ticker=symbol).filter(
+        Q(refresh_started_at__isnull=True) | Q(refresh_started_at__lt=t - REFRESH_LEASE)
+    ).update(refresh_started_at=t) > 0
+
+
+def refresh_ticker(symbol: str) -> bool:
+    if not _claim(symbol):
+        return False
+    try:
+        f = fetch_fundamentals(symbol)
+    except Exception:
+        # give up for now; the next stale read or bulk pass re-queues it
+        TickerInfo.objects.filter(ticker=symbol).update(refresh_started_at=None, refresh_requested_at=None)
+        return False
+
+    info = TickerInfo.objects.get(ticker=symbol)
+    info.market_cap = f.get("market_cap")
+    info.pe = f.get("pe")
+    info.eps = f.get("eps")
+    info.refresh_requested_at = None
+    info.refresh_started_at = None
+    info.save()
+    cache.delete(f"ticker_info_{symbol}")  # this process only; elsewhere it ages out in 5 min
+    return True
+
+
+def due_tickers(limit: int) -> List[str]:
+    """Explicitly requested tickers first, then stale ones oldest-first; skips live leases."""
+    t = now()
+    free = Q(refresh_started_at__isnull=True) | Q(refresh_started_at__lt=t - REFRESH_LEASE)
+    requested = list(
+        TickerInfo.objects.filter(free, refresh_requested_at__isnull=False)
+        .order_by("refresh_requested_at").values_list("ticker", flat=True)[:limit]
+    )
+    if len(requested) < limit:
+        requested += list(
+            TickerInfo.objects.filter(free, _stale_q(t), refresh_requested_at__isnull=True)
+            .order_by("updated_at").values_list("ticker", flat=True)[:limit - len(requested)]
+        )
+    return requested
+
+
+def run_refresh_batch(budget: int, per_minute: float) -> int:
+    """
+    Refresh up to *budget* due tickers, spaced to stay under *per_minute* Yahoo
+    calls, at background priority in the shared upstream limiter.
+    """
+    interval = 60.0 / per_minute if per_minute > 0 else 0.0
+    done = 0
+    with priority(BACKGROUND):
+        for i, symbol in enumerate(due_tickers(budget)):
+            if i and interval:
+                time.sleep(interval)
+            done += refresh_ticker(symbol)
+    return done
@@ -0,0 +1,58 @@
+# market/generation.py
+"""
+Per-ticker price generations.
+
+A counter per ticker in the default cache, bumped whenever something a
+valuation reads for that ticker may have changed: history_changed()
+(closes, adjustment factors, rollups) and every fresh quote fetch. Caches
+of computed payloads put the generations of the tickers they read into
+their key, so they miss exactly when one of those prices moved.
+
+A counter that is missing (never bumped, or evicted) starts again from the
+current time in milliseconds, so it can't fall back to a value an older
+key was built with.
+
+Bumps only reach processes sharing the default cache: ingest_prices,
+compact_prices or the outbox worker running elsewhere need a shared cache
+(Redis/Memcached) to invalidate what web workers hold.
+"""
+from __future__ import annotations
+
+import time
+from typing import Dict, Iterable
+
+from django.core.cache import cache
+
+
+def _key(ticker: str) -> str:
+    return f"price:gen:{ticker}"
+
+
+def _seed() -> int:
+    return int(time.time() * 1000)
+
+
+def price_generations(tickers: Iterable[str]) -> Dict[str, int]:
+    """{ticker: generation} for *tickers*, seeding the ones not set yet."""
+    keys = {t: _key(t) for t in dict.fromkeys(tickers) if t}
+    found = cache.get_many(list(keys.values()))
+    out = {}
+    for t, k in keys.items():
+        if k not in found:
+            cache.add(k, _seed(), None)
+            found[k] = cache.get(k, _seed())
+        out[t] = found[k]
+    return out
+
+
+def bump_price_generation(tickers: Iterable[str]) -> None:
+    """Mark *tickers*' prices as changed."""
+    for t in set(tickers):
+        if not t:
+            continue
+        k = _key(t)
+        cache.add(k, _seed(), None)
+        try:
+            cache.incr(k)
+        except ValueError:  # evicted between add and incr
+            cache.set(k, _seed(), None)
@@ -0,0 +1,108 @@
+# market/latency.py
+"""
+Latency budgets and hedged requests for upstream quote fetches.
+
+hedged() runs a call on a small worker pool and waits at most *timeout*.
+If the first attempt hasn't answered by the observed p95 latency of that
+call, an identical second attempt is started and whichever finishes first
+wins. The second attempt pays for its upstream calls again, so callers pass
+*hedge_if* (e.g. upstream.available) to hedge only while the rate limiter
+can cover it without waiting. Abandoned attempts keep running in the pool
+(their results still land in the quote caches), but the caller never waits
+past its budget.
+"""
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional, TypeVar
+
+import numpy as np
+from django.db import connections
+
+T = TypeVar("T")
+
+HEDGE_DEFAULT = 1.0   # seconds before the first hedge, until enough samples exist
+HEDGE_FLOOR = 0.2     # never hedge sooner than this
+MIN_SAMPLES = 20
+
+_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="quote-fetch")
+
+
+class QuoteTimeout(Exception):
+    """No attempt answered within the caller's latency budget."""
+
+
+class LatencyTracker:
+    """Rolling window of call latencies (per process) for the hedge trigger."""
+
+    def __init__(self, size: int = 200):
+        self._samples: deque = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float = 95.0) -> float:
+        with self._lock:
+            samples = list(self._samples)
+        if len(samples) < MIN_SAMPLES:
+            return HEDGE_DEFAULT
+        return max(HEDGE_FLOOR, float(np.percentile(samples, q)))
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def tracker(name: str) -> LatencyTracker:
+    with _trackers_lock:
+        return _trackers.setdefault(name, LatencyTracker())
+
+
+def _timed(t: LatencyTracker, fn: Callable[..., T], args: tuple) -> T:
+    start = time.monotonic()
+    try:
+        result = fn(*args)
+        t.record(time.monotonic() - start)
+        return result
+    finally:
+        connections.close_all()  # pool threads open their own DB connections
+
+
+def hedged(name: str, fn: Callable[..., T], *args, timeout: float,
+           hedge_if: Optional[Callable[[], bool]] = None) -> T:
+    """
+    fn(*args) within *timeout* seconds, hedged at the p95 of previous *name*
+    calls unless hedge_if() says no at that point. Raises QuoteTimeout when
+    no attempt succeeds in time.
+    """
+    t = tracker(name)
+    deadline = time.monotonic() + timeout
+
+    def submit():
+        # copy the context so the upstream priority class follows the call
+        return _pool.submit(contextvars.copy_context().run, _timed, t, fn, args)
+
+    pending = {submit()}
+    hedge_at = time.monotonic() + t.percentile(95.0)
+    hedged_once = False
+    while pending:
+        now = time.monotonic()
+        if now >= deadline:
+            break
+        wake = deadline if hedged_once else min(deadline, hedge_at)
+        done, pending = wait(pending, timeout=wake - now, return_when=FIRST_COMPLETED)
+        for f in done:
+            if f.exception() is None:
+                return f.result()
+        # hedge once: the first attempt is slower than p95, or it already failed
+        if not hedged_once and (not pending or time.monotonic() >= hedge_at):
+            if hedge_if is None or hedge_if():
+                pending.add(submit())
+            hedged_once = True
+    raise QuoteTimeout(f"{name}: no answer within {timeout:.2f}s")
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+
+from market.models import PriceSnapshot
+from market.rollups import compact_prices, update_rollups
+
+
+class Command(BaseCommand):
+    help = "Apply price retention: roll up and drop old daily closes and weekly rollups (run nightly)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rebuild", action="store_true",
+                            help="First rebuild every weekly/monthly rollup from the stored daily closes")
+
+    def handle(self, *args, **opts):
+        if opts["rebuild"]:
+            first = PriceSnapshot.objects.aggregate(d=Min("date"))["d"]
+            tickers = PriceSnapshot.objects.values_list("ticker", flat=True).distinct()
+            n = update_rollups(tickers, first) if first else 0
+            self.stdout.write(f"rebuilt {n} rollups")
+        out = compact_prices()
+        self.stdout.write(self.style.SUCCESS(
+            f"rolled up {out['rolled']} periods, deleted {out['daily_deleted']} daily closes "
+            f"and {out['weekly_deleted']} weekly rollups"
+        ))
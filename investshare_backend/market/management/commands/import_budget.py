@@ -0,0 +1,58 @@
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from market.provider import HEAVY_MODULES
+
+LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+class Command(BaseCommand):
+    help = ("Import-time regression check: boot Django and import the URLconf under "
+            "`python -X importtime`; fail if pandas/yfinance get loaded or the total exceeds the budget.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--budget", type=float, default=getattr(settings, "IMPORT_BUDGET_MS", 1000),
+                            help="Max total import time in ms")
+        parser.add_argument("--module", action="append", dest="modules",
+                            help="Module(s) to import after django.setup() (default: the ROOT_URLCONF)")
+        parser.add_argument("--top", type=int, default=10, help="Slowest top-level imports to list")
+
+    def handle(self, *args, **opts):
+        modules = opts["modules"] or [settings.ROOT_URLCONF]
+        code = "import django; django.setup()\n" + "".join(f"import {m}\n" for m in modules)
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "investshare.settings")}
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            capture_output=True, text=True, env=env, cwd=settings.BASE_DIR,
+        )
+        if proc.returncode != 0:
+            raise CommandError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+
+        total_us, top, seen = 0, [], set()
+        for line in proc.stderr.splitlines():
+            m = LINE_RE.match(line)
+            if not m:
+                continue
+            self_us, cumulative_us, indent, name = int(m[1]), int(m[2]), m[3], m[4]
+            total_us += self_us
+            seen.add(name.split(".")[0])
+            if len(indent) <= 1:
+                top.append((cumulative_us, name))
+
+        for cumulative_us, name in sorted(top, reverse=True)[: opts["top"]]:
+            self.stdout.write(f"{cumulative_us / 1000:9.1f} ms  {name}")
+        total_ms = total_us / 1000
+        self.stdout.write(f"{total_ms:9.1f} ms  total (budget {opts['budget']:.0f} ms)")
+
+        heavy = [m for m in HEAVY_MODULES if m in seen]
+        if heavy:
+            raise CommandError(f"{', '.join(heavy)} imported while loading {', '.join(modules)} "
+                               "(use market.provider instead of a module-level import)")
+        if total_ms > opts["budget"]:
+            raise CommandError(f"import time {total_ms:.0f} ms is over the {opts['budget']:.0f} ms budget")
+        self.stdout.write(self.style.SUCCESS("import budget ok"))
@@ -0,0 +1,32 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from market.prices import ingest_history
+from market.upstream import BACKGROUND, priority
+from portfolios.models import Holding
+
+
+class Command(BaseCommand):
+    help = "Bulk-load daily closes with dividends/splits (held tickers by default) and update adjustment factors."
+
+    def add_arguments(self, parser):
+        parser.add_argument("tickers", nargs="*", help="Tickers to load (default: every held ticker)")
+        parser.add_argument("--since", type=date.fromisoformat, default=None,
+                            help="First date, YYYY-MM-DD (default: 30 days ago)")
+        parser.add_argument("--chunk", type=int, default=50, help="Tickers per download")
+
+    def handle(self, *args, **opts):
+        tickers = sorted({t.upper() for t in opts["tickers"]}) or sorted(
+            set(Holding.objects.values_list("ticker", flat=True))
+        )
+        since = opts["since"] or date.today() - timedelta(days=30)
+        n = 0
+        with priority(BACKGROUND):
+            for i in range(0, len(tickers), opts["chunk"]):
+                chunk = tickers[i:i + opts["chunk"]]
+                try:
+                    n += ingest_history(chunk, since)
+                except Exception as e:
+                    self.stderr.write(f"{', '.join(chunk)}: {e}")
+        self.stdout.write(self.style.SUCCESS(f"stored {n} daily rows for {len(tickers)} tickers"))
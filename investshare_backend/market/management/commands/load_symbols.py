@@ -0,0 +1,62 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from market.models import Symbol
+from market.symbols import bump_generation
+
+# header aliases: plain CSV plus the NASDAQ Trader nasdaqlisted/otherlisted files
+_SYMBOL_COLS = ("symbol", "ticker", "act symbol")
+_NAME_COLS = ("name", "security name", "company name", "description")
+_EXCHANGE_COLS = ("exchange", "market", "listing exchange")
+
+
+def _pick(row: dict, names) -> str:
+    for n in names:
+        if row.get(n):
+            return row[n].strip()
+    return ""
+
+
+class Command(BaseCommand):
+    help = "Load the local symbol master (CSV or pipe-delimited listing file) used by ticker search."
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+")
+        parser.add_argument("--exchange", default="", help="Exchange to use when the file has no exchange column")
+        parser.add_argument("--replace", action="store_true", help="Delete symbols not present in the given files")
+
+    def handle(self, *args, **opts):
+        rows = {}
+        for path in opts["paths"]:
+            try:
+                with open(path, newline="", encoding="utf-8-sig") as fh:
+                    first = fh.readline()
+                    fh.seek(0)
+                    reader = csv.DictReader(fh, delimiter="|" if "|" in first else ",")
+                    for raw in reader:
+                        row = {(k or "").strip().lower(): (v or "") for k, v in raw.items()}
+                        sym = _pick(row, _SYMBOL_COLS).upper()
+                        # skip test issues and the "File Creation Time" footer line
+                        if not sym or len(sym) > 20 or sym.startswith("FILE CREATION TIME"):
+                            continue
+                        if row.get("test issue", "N").strip().upper() == "Y":
+                            continue
+                        rows[sym] = Symbol(
+                            symbol=sym,
+                            name=_pick(row, _NAME_COLS)[:200],
+                            exchange=(_pick(row, _EXCHANGE_COLS) or opts["exchange"])[:20],
+                        )
+            except OSError as e:
+                raise CommandError(str(e))
+
+        with transaction.atomic():
+            if opts["replace"]:
+                Symbol.objects.exclude(symbol__in=list(rows)).delete()
+            Symbol.objects.bulk_create(
+                rows.values(), batch_size=2000,
+                update_conflicts=True, unique_fields=["symbol"], update_fields=["name", "exchange"],
+            )
+        bump_generation()
+        self.stdout.write(self.style.SUCCESS(f"Loaded {len(rows)} symbols"))
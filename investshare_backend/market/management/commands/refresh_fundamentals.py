@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from market.fundamentals import run_refresh_batch
+
+
+class Command(BaseCommand):
+    help = "Background fundamentals refresher: queued tickers first, then stale ones oldest-first, under a rate budget."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--budget", type=int, default=50, help="Max tickers per pass")
+        parser.add_argument("--rate", type=float,
+                            default=getattr(settings, "FUNDAMENTALS_REFRESH_PER_MINUTE", 30),
+                            help="Max Yahoo fundamentals calls per minute")
+        parser.add_argument("--loop", action="store_true", help="Keep polling instead of a single pass")
+        parser.add_argument("--idle", type=float, default=5.0, help="Seconds to sleep when nothing is due")
+
+    def handle(self, *args, **opts):
+        while True:
+            n = run_refresh_batch(opts["budget"], opts["rate"])
+            if opts["verbosity"] > 1 or not opts["loop"]:
+                self.stdout.write(f"refreshed {n} tickers")
+            if not opts["loop"]:
+                return
+            if n == 0:
+                time.sleep(opts["idle"])
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from market.upstream import METRICS, metrics
+
+
+class Command(BaseCommand):
+    help = "Show upstream (Yahoo) limiter counters per priority class: calls, waited, waited_ms, throttled."
+
+    def handle(self, *args, **opts):
+        self.stdout.write(f"{'class':12}" + "".join(f"{m:>12}" for m in METRICS))
+        for cls, row in metrics().items():
+            self.stdout.write(f"{cls:12}" + "".join(f"{row[m]:>12}" for m in METRICS))
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Symbol',
+            fields=[
+                ('symbol', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('name', models.CharField(blank=True, max_length=200)),
+                ('exchange', models.CharField(blank=True, max_length=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
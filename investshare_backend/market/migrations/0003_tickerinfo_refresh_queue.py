@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0002_symbol'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tickerinfo',
+            name='refresh_requested_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tickerinfo',
+            name='refresh_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='tickerinfo',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0003_tickerinfo_refresh_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=15)),
+                ('resolution', models.CharField(choices=[('W', 'week'), ('M', 'month')], max_length=1)),
+                ('period_start', models.DateField()),
+                ('as_of', models.DateField()),
+                ('close', models.DecimalField(decimal_places=4, max_digits=18)),
+            ],
+            options={
+                'ordering': ['ticker', 'resolution', 'period_start'],
+                'unique_together': {('ticker', 'resolution', 'period_start')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0004_pricerollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricerollup',
+            name='split_factor',
+            field=models.FloatField(default=1.0),
+        ),
+        migrations.AddField(
+            model_name='pricesnapshot',
+            name='return_factor',
+            field=models.FloatField(default=1.0),
+        ),
+        migrations.AddField(
+            model_name='pricesnapshot',
+            name='split_factor',
+            field=models.FloatField(default=1.0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market', '0005_adjustment_factors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricerollup',
+            name='return_factor',
+            field=models.FloatField(default=1.0),
+        ),
+    ]
@@ -6,14 +6,44 @@ class PriceSnapshot(models.Model):
     close = models.DecimalField(max_digits=18, decimal_places=4)
     dividend = models.DecimalField(max_digits=18, decimal_places=4, default=0)
     split = models.DecimalField(max_digits=10, decimal_places=4, default=1)
+    # cumulative corporate-action factors through this date (market/actions.py)
+    split_factor = models.FloatField(default=1.0)
+    return_factor = models.FloatField(default=1.0)
 
     class Meta:
         unique_together = ("ticker","date")
         ordering = ["ticker","date"]
 
+class PriceRollup(models.Model):
+    """Last close of a week (period_start = Monday) or month (1st), built from PriceSnapshot."""
+    WEEK, MONTH = "W", "M"
+    RESOLUTIONS = [(WEEK, "week"), (MONTH, "month")]
+
+    ticker = models.CharField(max_length=15)
+    resolution = models.CharField(max_length=1, choices=RESOLUTIONS)
+    period_start = models.DateField()
+    as_of = models.DateField()  # date of the close
+    close = models.DecimalField(max_digits=18, decimal_places=4)
+    split_factor = models.FloatField(default=1.0)  # PriceSnapshot.split_factor on as_of
+    return_factor = models.FloatField(default=1.0)  # PriceSnapshot.return_factor on as_of
+
+    class Meta:
+        unique_together = ("ticker", "resolution", "period_start")
+        ordering = ["ticker", "resolution", "period_start"]
+
 class TickerInfo(models.Model):
     ticker = models.CharField(max_length=15, primary_key=True)
     market_cap = models.BigIntegerField(null=True, blank=True)
     pe = models.FloatField(null=True, blank=True)
     eps = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # background refresh queue (set with .update() so updated_at isn't touched)
+    refresh_requested_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    refresh_started_at = models.DateTimeField(null=True, blank=True)
+
+class Symbol(models.Model):
+    """Symbol master row loaded from a local listing file (see load_symbols)."""
+    symbol = models.CharField(max_length=20, primary_key=True)
+    name = models.CharField(max_length=200, blank=True)
+    exchange = models.CharField(max_length=20, blank=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -0,0 +1,110 @@
+# market/money.py
+"""
+Fixed-point money/quantity math in integer micro-units (1 unit = 10⁻⁶).
+
+Valuation loops used to build a Decimal via str() for every quantity, price
+and cash figure. Here amounts are plain ints (int64 arrays for the NumPy
+variants): conversion is a multiply-and-round, products are exact until the
+final rescale, and Decimal is only built at the persistence boundary
+(to_decimal). All stored quantities (6 dp), prices (4 dp) and cash (2 dp) are
+represented exactly; floats from quote feeds are rounded to the nearest micro.
+"""
+from __future__ import annotations
+
+import math
+from decimal import ROUND_HALF_EVEN, Decimal
+from typing import Optional
+
+import numpy as np
+
+SCALE = 1_000_000
+_DSCALE = Decimal(SCALE)
+_INT64_MAX = 2 ** 63 - 1
+
+
+# ───────────────────────────── scalars ─────────────────────────────
+def micros(x) -> Optional[int]:
+    """float / Decimal / int / numeric str → micro-units; None on None, NaN, ±Inf or bad input."""
+    if type(x) is float:  # quote feeds – the hot case
+        return round(x * SCALE) if math.isfinite(x) else None
+    if x is None:
+        return None
+    try:
+        if isinstance(x, Decimal):
+            return round(x * _DSCALE) if x.is_finite() else None  # round() on Decimal is half-even
+        if isinstance(x, int):
+            return x * SCALE
+        if isinstance(x, str):
+            return micros(Decimal(x))
+        f = float(x)
+    except Exception:
+        return None
+    return round(f * SCALE) if math.isfinite(f) else None
+
+
+def _rdiv(n: int, d: int) -> int:
+    """n / d rounded half-to-even (d > 0), in pure integer arithmetic."""
+    q, r = divmod(n, d)
+    if 2 * r > d or (2 * r == d and q & 1):
+        q += 1
+    return q
+
+
+def mul(a: int, b: int) -> int:
+    """Product of two micro-unit amounts (e.g. quantity × price), in micro-units."""
+    return _rdiv(a * b, SCALE)
+
+
+def ratio(a: int, b: int) -> float:
+    """a / b as a float (correctly rounded); caller guards b == 0."""
+    return a / b
+
+
+def to_float(m: Optional[int]) -> Optional[float]:
+    return None if m is None else m / SCALE
+
+
+def to_decimal(m: int, places: int = 6) -> Decimal:
+    """Micro-units → Decimal with *places* decimals (rounded half-to-even)."""
+    d = Decimal(m).scaleb(-6)
+    return d.quantize(Decimal(1).scaleb(-places), rounding=ROUND_HALF_EVEN) if places < 6 else d
+
+
+# ───────────────────────────── arrays ─────────────────────────────
+def micros_array(xs) -> np.ndarray:
+    """
+    Floats (or Decimals) → int64 micro-units; None/NaN/±Inf → 0. Goes through
+    float64, so it is exact up to ~9·10⁹ units – plenty for prices and share counts.
+    """
+    if not isinstance(xs, np.ndarray):
+        xs = [np.nan if x is None else float(x) for x in xs]
+    a = np.nan_to_num(np.asarray(xs, dtype=float) * SCALE, nan=0.0, posinf=0.0, neginf=0.0)
+    return np.rint(a).astype(np.int64)
+
+
+def mul_array(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Element-wise mul() for int64 micro-unit arrays. *b* is split into whole
+    units and the micro fraction so no intermediate needs 128 bits; sizes
+    beyond that bound fall back to exact Python ints (object array if the
+    result itself overflows int64).
+    """
+    a = np.asarray(a, dtype=np.int64)
+    b = np.asarray(b, dtype=np.int64)
+    if a.size == 0:
+        return np.zeros(np.broadcast(a, b).shape, dtype=np.int64)
+    amax = int(np.abs(a).max())
+    bmax = int(np.abs(b).max()) if b.size else 0
+    if amax * (bmax // SCALE + SCALE) > _INT64_MAX:
+        exact = [mul(int(x), int(y)) for x, y in np.broadcast(a, b)]
+        fits = all(abs(v) <= _INT64_MAX for v in exact)
+        return np.array(exact, dtype=np.int64 if fits else object).reshape(np.broadcast(a, b).shape)
+
+    whole, frac = np.divmod(b, SCALE)
+    q, r = np.divmod(a * frac, SCALE)
+    q += (2 * r > SCALE) | ((2 * r == SCALE) & ((q & 1) == 1))
+    return a * whole + q
+
+
+def to_float_array(m: np.ndarray) -> np.ndarray:
+    return (np.asarray(m) / SCALE).astype(float)
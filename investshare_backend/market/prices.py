@@ -3,30 +3,37 @@ from __future__ import annotations
 
 from datetime import datetime, date, timedelta
 from decimal import Decimal
-from typing import Dict, List, Tuple, Optional
+from typing import Any, Dict, List, NamedTuple, Tuple, Optional
 from functools import reduce
 
 import math
-import pandas as pd
+import numpy as np
 import pytz
-import yfinance as yf
+from django.core.cache import cache
 from django.db.models import QuerySet
 
-from market.models import PriceSnapshot
+from market.calendar import is_open, quote_ttl
+from market.actions import history_changed
+from market.generation import bump_price_generation
+from market.models import PriceRollup, PriceSnapshot
+from market.money import micros, micros_array, mul, mul_array, ratio, to_decimal, to_float
+from market.provider import pd, yf
+from market.rollups import DAY, choose_resolution, earliest_close, period_start, stored_closes
+from market.series import Series
+from market.upstream import TRADE, acquire, priority
 from portfolios.models import Portfolio
 
 # ────────────────────────────── constants ──────────────────────────────
 UTC = pytz.UTC
 EASTERN = pytz.timezone("US/Eastern")  # Yahoo intraday bar timezone
+QUOTE_MISS_TTL = 60 * 5  # failed/empty quote fetches are retried after this, even off-hours
+QUOTE_KNOWN_TTL = 60 * 60 * 24 * 7  # last good quote, served stale when a fetch misses its budget
 
 
 # ────────────────────────────── helpers ────────────────────────────────
-def _D(x) -> Decimal:
-    """Cheap, NaN-safe Decimal conversion (None ⇒ 0)."""
-    try:
-        return Decimal(str(x)) if x is not None else Decimal("0")
-    except Exception:
-        return Decimal("0")
+class _Stored(NamedTuple):
+    """A fetch result read from PriceSnapshot, not Yahoo: served, but cached like a miss."""
+    value: Any
 
 
 def _finite_float(x) -> Optional[float]:
@@ -78,18 +85,50 @@ def _clean_ticker(t: str) -> str:
     return t.strip()[:20]  # keep it short-ish; avoids accidental abuse
 
 
+def _session_cached(key: str, ticker: str, fetch, fresh: bool = False):
+    """
+    fetch() through the cache for quote_ttl(ticker): seconds in regular
+    hours, until the next session while the market is closed. Misses are
+    kept for at most QUOTE_MISS_TTL so a failed fetch isn't frozen overnight,
+    and so are stored-close fallbacks (fetch() returns _Stored(value)), e.g.
+    when the upstream budget ran out. *fresh* skips the read (the result is
+    still stored). A live fetch bumps the ticker's price generation.
+    """
+    if not fresh:
+        hit = cache.get(key)
+        if hit is not None:
+            return hit[0]
+    value = fetch()
+    live = not isinstance(value, _Stored)
+    if not live:
+        value = value.value
+    cache.set(key, (value,), _quote_ttl(ticker, live and bool(value)))
+    if live:
+        bump_price_generation([ticker])
+    return value
+
+
+def _quote_ttl(ticker: str, hit: bool) -> int:
+    ttl = quote_ttl(ticker)
+    return ttl if hit else min(ttl, QUOTE_MISS_TTL)
+
+
 # ─────────────────── real-time/extended-hours prices ───────────────────
-def _latest_trade(symbol: str) -> Optional[Tuple[datetime, float]]:
+def _latest_trade(symbol: str, fresh: bool = False) -> Optional[Tuple[datetime, float]]:
     """
     Return (timestamp, price) of the most recent trade including pre/post hours.
-    None if Yahoo serves no intraday bars.
+    None if Yahoo serves no intraday bars. Session-cached (see _session_cached).
     """
     sym = _clean_ticker(symbol)
     if not sym:
         return None
+    return _session_cached(f"quote:last:{sym}", sym, lambda: _fetch_latest_trade(sym), fresh)
+
 
+def _fetch_latest_trade(sym: str) -> Optional[Tuple[datetime, float]]:
     now_eastern = datetime.now(EASTERN)
     try:
+        acquire()
         bars = (
             yf.Ticker(sym)
             .history(period="5d", interval="1m", prepost=True, actions=False)
@@ -122,13 +161,18 @@ def get_latest_price(ticker: str) -> float:
     2) fall back to fast_info (post/last/regular)
     3) fall back to cached daily close in PriceSnapshot or recent 1d daily download
 
-    Always returns finite float or 0.0.
+    Always returns finite float or 0.0. Session-cached like _latest_trade.
     """
+    return _session_cached(f"quote:px:{_clean_ticker(ticker)}", ticker, lambda: _fetch_latest_price(ticker))
+
+
+def _fetch_latest_price(ticker: str) -> float:
     lt = _latest_trade(ticker)
     if lt:
         return lt[1]
 
     try:
+        acquire()
         fi = yf.Ticker(_clean_ticker(ticker)).fast_info or {}
         px = fi.get("postMarketPrice") or fi.get("last_price") or fi.get("regularMarketPrice")
         f = _finite_float(px)
@@ -141,10 +185,11 @@ def get_latest_price(ticker: str) -> float:
     if snap:
         f = _finite_float(snap.close)
         if f and f > 0:
-            return f
+            return _Stored(f)
 
     # last-resort: a tiny daily fetch to refresh snapshot
     try:
+        acquire()
         d = yf.download(
             _clean_ticker(ticker),
             period="2d",
@@ -161,6 +206,7 @@ def get_latest_price(ticker: str) -> float:
                     date=d.index[-1].date(),
                     defaults={"close": float(close)},
                 )
+                history_changed([ticker], d.index[-1].date())
                 return close
     except Exception:
         pass
@@ -170,25 +216,160 @@ def get_latest_price(ticker: str) -> float:
 
 def get_trade_price(ticker: str) -> float:
     """
-    Execution price for market orders – extended-hours aware.
+    Execution price for market orders – extended-hours aware. Always a fresh
+    fetch while a session is on; the frozen close otherwise.
     """
-    lt = _latest_trade(ticker)
-    if lt:
-        return lt[1]
-    return get_latest_price(ticker)
+    with priority(TRADE):
+        lt = _latest_trade(ticker, fresh=is_open(ticker=ticker))
+        if lt:
+            return lt[1]
+        return get_latest_price(ticker)
+
+
+def _column(df: pd.DataFrame, field: str, ticker: str) -> Optional[pd.Series]:
+    """Pick *field* for *ticker* from a yf.download frame (flat or ticker-grouped columns)."""
+    try:
+        if isinstance(df.columns, pd.MultiIndex):
+            for key in ((ticker, field), (field, ticker)):
+                if key in df.columns:
+                    return df[key].dropna()
+            return None
+        return df[field].dropna() if field in df.columns else None
+    except Exception:
+        return None
+
+
+def get_batch_sessions(
+    tickers: List[str],
+) -> Dict[str, Tuple[Optional[float], Optional[float], Optional[float]]]:
+    """
+    (latest_price, prev_close, session_open) for many tickers with two batched
+    Yahoo calls: one 1-minute extended-hours download for the last trade and
+    one daily download for the previous close and the latest session's open.
+    Tickers Yahoo skips fall back to the newest PriceSnapshot close (one
+    query) – never a per-ticker request. Each ticker's result is cached for
+    quote_ttl(), so only the misses reach Yahoo (none while markets are shut);
+    fallbacks only for QUOTE_MISS_TTL, and they don't move price generations.
+    """
+    syms = [t for t in dict.fromkeys(_clean_ticker(t) for t in tickers) if t]
+    keys = {t: f"quote:sess:{t}" for t in syms}
+    found = cache.get_many(list(keys.values()))
+    out = {t: found[k] for t, k in keys.items() if k in found}
+    misses = [t for t in syms if t not in out]
+    if misses:
+        fetched, stored = _fetch_batch_sessions(misses)
+        live = [t for t, q in fetched.items() if q[0] is not None and t not in stored]
+        by_ttl: Dict[int, dict] = {}
+        for t, q in fetched.items():
+            by_ttl.setdefault(_quote_ttl(t, t in live), {})[keys[t]] = q
+        for ttl, batch in by_ttl.items():
+            cache.set_many(batch, ttl)
+        cache.set_many({f"quote:known:{t}": fetched[t] for t in live}, QUOTE_KNOWN_TTL)
+        bump_price_generation(live)
+        out.update(fetched)
+    return {t: out[t] for t in syms}
+
+
+def last_known_sessions(
+    tickers: List[str],
+) -> Dict[str, Tuple[Optional[float], Optional[float], Optional[float]]]:
+    """
+    No-network fallback for get_batch_sessions(): the last quote it returned
+    (kept QUOTE_KNOWN_TTL), else the two newest PriceSnapshot closes as
+    (price, prev_close, None). Unknown tickers map to (None, None, None).
+    """
+    syms = [t for t in dict.fromkeys(_clean_ticker(t) for t in tickers) if t]
+    found = cache.get_many([f"quote:known:{t}" for t in syms])
+    out = {t: found.get(f"quote:known:{t}", (None, None, None)) for t in syms}
+    missing = [t for t, q in out.items() if q[0] is None]
+    if missing:
+        closes: Dict[str, List[float]] = {}
+        for tk, close in (
+            PriceSnapshot.objects
+            .filter(ticker__in=missing, date__gte=date.today() - timedelta(days=14))
+            .order_by("ticker", "-date").values_list("ticker", "close")
+        ):
+            closes.setdefault(tk, []).append(float(close))
+        for t, cl in closes.items():
+            out[t] = (cl[0], cl[1] if len(cl) > 1 else None, None)
+    return out
+
+
+def _fetch_batch_sessions(
+    syms: List[str],
+) -> Tuple[Dict[str, Tuple[Optional[float], Optional[float], Optional[float]]], set]:
+    """(sessions, tickers whose price is a stored close rather than a quote)."""
+    out: Dict[str, Tuple[Optional[float], Optional[float], Optional[float]]] = {
+        t: (None, None, None) for t in syms
+    }
+
+    now_eastern = datetime.now(EASTERN)
+    try:
+        acquire(n=len(syms))  # one HTTP call per ticker
+        bars = yf.download(syms, period="5d", interval="1m", prepost=True, progress=False,
+                           auto_adjust=False, group_by="ticker", threads=True)
+    except Exception:
+        bars = None
+    try:
+        acquire(n=len(syms))
+        daily = yf.download(syms, period="5d", interval="1d", progress=False,
+                            auto_adjust=False, group_by="ticker", threads=True)
+    except Exception:
+        daily = None
+
+    for t in syms:
+        price = prev = openp = None
+        if bars is not None and not bars.empty:
+            closes = _column(bars, "Close", t)
+            if closes is not None and not closes.empty:
+                closes = closes[_safe_tz_to_eastern(closes.index) <= now_eastern]
+                if not closes.empty:
+                    price = _finite_float(closes.iloc[-1])
+        if daily is not None and not daily.empty:
+            closes = _column(daily, "Close", t)
+            if closes is not None and len(closes) >= 2:
+                prev = _finite_float(closes.iloc[-2])
+            elif closes is not None and len(closes) == 1:
+                prev = _finite_float(closes.iloc[-1])
+                price = price or prev
+            opens = _column(daily, "Open", t)
+            if opens is not None and not opens.empty:
+                openp = _finite_float(opens.iloc[-1])
+        out[t] = (price if price and price > 0 else None, prev, openp)
+
+    missing = [t for t, (px, _, _) in out.items() if px is None]
+    latest: Dict[str, float] = {}
+    if missing:
+        for tk, close in (
+            PriceSnapshot.objects.filter(ticker__in=missing)
+            .order_by("ticker", "-date").values_list("ticker", "close")
+        ):
+            latest.setdefault(tk, float(close))
+        for t in missing:
+            out[t] = (latest.get(t), out[t][1], out[t][2])
+    return out, set(latest)
+
+
+def get_batch_quotes(tickers: List[str]) -> Dict[str, Tuple[Optional[float], Optional[float]]]:
+    """(latest_price, prev_close) per ticker – see get_batch_sessions()."""
+    return {t: (px, prev) for t, (px, prev, _) in get_batch_sessions(tickers).items()}
 
 
 # ─────────────────────────── 24h change for treemap ──────────────────────────
 def get_change_24h_pct(ticker: str) -> float:
     """
     % change over the last 24 hours using 1-minute extended-hours data.
-    Fallback: last two daily closes.
+    Fallback: last two daily closes. Session-cached.
     """
     sym = _clean_ticker(ticker)
     if not sym:
         return 0.0
+    return _session_cached(f"quote:chg24:{sym}", sym, lambda: _fetch_change_24h_pct(sym))
 
+
+def _fetch_change_24h_pct(sym: str) -> float:
     try:
+        acquire()
         bars = (
             yf.Ticker(sym)
             .history(period="5d", interval="1m", prepost=True, actions=False)
@@ -215,6 +396,7 @@ def get_change_24h_pct(ticker: str) -> float:
 
     # Fallback to daily closes
     try:
+        acquire()
         d = yf.download(
             sym,
             period="5d",
@@ -237,151 +419,399 @@ def get_change_24h_pct(ticker: str) -> float:
 
 
 # ──────────────── intraday (rolling 24h) equity series ─────────────────
-def _intraday_series(p: Portfolio) -> List[dict]:
+def _epoch_seconds(idx: pd.DatetimeIndex) -> np.ndarray:
+    """tz-aware/naive (assumed UTC) DatetimeIndex → int64 epoch seconds, any resolution."""
+    if idx.tz is None:
+        idx = idx.tz_localize(UTC)
+    return ((idx - pd.Timestamp(0, tz=UTC)) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+
+
+def intraday_window() -> Tuple[datetime, datetime]:
+    """(start, end) of the rolling 24h chart, UTC."""
     end_dt = datetime.utcnow().replace(tzinfo=UTC)
-    start_dt = end_dt - timedelta(hours=24)
-
-    tickers: List[str] = list(p.holdings.values_list("ticker", flat=True))
-    if not tickers:
-        cash = float(_D(p.cash))
-        return [
-            {"date": start_dt.isoformat(), "value": cash},
-            {"date": end_dt.isoformat(), "value": cash},
-        ]
-
-    frames: Dict[str, pd.DataFrame] = {}
-    for tkr in tickers:
-        try:
-            df = yf.download(
-                _clean_ticker(tkr),
-                start=start_dt,
-                end=end_dt + timedelta(minutes=1),
-                interval="1m",
-                progress=False,
-                prepost=True,
-                auto_adjust=False,
-            )
-            if df is not None and not df.empty:
-                frames[tkr] = df[["Close"]]
-        except Exception:
-            pass
+    return end_dt - timedelta(hours=24), end_dt
+
+
+def intraday_closes(ticker: str, start_dt: datetime, end_dt: datetime) -> Optional[pd.DataFrame]:
+    """1m Close bars (pre/post included) for *ticker* in the window, or None."""
+    try:
+        acquire()
+        df = yf.download(
+            _clean_ticker(ticker),
+            start=start_dt,
+            end=end_dt + timedelta(minutes=1),
+            interval="1m",
+            progress=False,
+            prepost=True,
+            auto_adjust=False,
+        )
+        if df is not None and not df.empty:
+            return df[["Close"]]
+    except Exception:
+        pass
+    return None
+
+
+def _intraday_series(
+    p: Portfolio,
+    window: Optional[Tuple[datetime, datetime]] = None,
+    frames: Optional[Dict[str, pd.DataFrame]] = None,
+) -> Series:
+    """
+    *frames* ({ticker: intraday_closes(...)}) may be fetched by the caller,
+    e.g. concurrently. A holding without bars (throttled, timed out) is
+    carried flat at its last known price (last_known_sessions) and listed in
+    the series' `stale`, rather than dropping out of the equity.
+    """
+    start_dt, end_dt = window or intraday_window()
+
+    holdings = list(p.holdings.all())
+    cash = to_float(micros(p.cash) or 0)
+    if not holdings:
+        return Series(
+            np.array([int(start_dt.timestamp()), int(end_dt.timestamp())], dtype=np.int64),
+            np.array([cash, cash]),
+            daily=False,
+        )
+
+    if frames is None:
+        frames = {h.ticker: intraday_closes(h.ticker, start_dt, end_dt) for h in holdings}
+    frames = {t: df for t, df in frames.items() if df is not None and not df.empty}
+
+    # holdings without bars: a flat line at the last known price
+    stale = tuple(dict.fromkeys(h.ticker for h in holdings if h.ticker not in frames))
+    known = last_known_sessions(list(stale)) if stale else {}
+    carried = micros(p.cash) or 0
+    for h in holdings:
+        if h.ticker in stale:
+            carried += mul(micros(h.quantity) or 0, micros(known.get(_clean_ticker(h.ticker), (None,))[0]) or 0)
+    base = to_float(carried)
 
     if not frames:
-        total = _D(p.cash)
-        for h in p.holdings.all():
-            total += _D(h.quantity) * _D(get_latest_price(h.ticker))
-        return [{"date": end_dt.isoformat(), "value": float(total)}]
+        return Series(
+            np.array([int(start_dt.timestamp()), int(end_dt.timestamp())], dtype=np.int64),
+            np.array([base, base]),
+            daily=False,
+            stale=stale,
+        )
 
     aligned = _align_ffill(frames)
-    series: List[dict] = []
+    ref_idx = aligned[next(iter(aligned))].index
+    ts = _epoch_seconds(ref_idx)
 
-    # Use the aligned index directly (UTC/naive acceptable for JSON)
-    ref_key = next(iter(aligned))
-    for ts in aligned[ref_key].index:
-        if ts < start_dt:
-            continue
-        total = _D(p.cash)
-        for h in p.holdings.all():
-            if h.ticker in aligned:
-                px = aligned[h.ticker].loc[ts, "Close"]
-                f = _finite_float(px)
-                if f is not None:
-                    total += _D(h.quantity) * _D(f)
-        f_total = _finite_float(total)
-        if f_total is not None:
-            # ts may be pandas Timestamp – ensure ISO string
-            series.append({"date": pd.Timestamp(ts).to_pydatetime().isoformat(), "value": f_total})
+    # equity = cash + carried + closes (T × N) @ qty (N); missing bars contribute nothing
+    held = [h for h in holdings if h.ticker in aligned]
+    closes = np.column_stack([aligned[h.ticker].to_numpy(dtype=float)[:, 0] for h in held])
+    qty = np.array([float(h.quantity) for h in held])
+    values = base + np.nansum(closes * qty, axis=1)
 
-    return series
+    keep = (ts >= int(start_dt.timestamp())) & np.isfinite(values)
+    return Series(ts[keep], values[keep], daily=False, stale=stale)
 
 
 # ────────────── historical snapshots & chart selection ───────────────
-def portfolio_value_on(p: Portfolio, d: date) -> Decimal:
+def portfolio_value_on(p: Portfolio, d: date, quantities: Optional[Dict[str, float]] = None) -> Decimal:
+    """Cash + holdings at *d*'s closes (live prices if none); *quantities* overrides the share counts."""
     snaps: QuerySet[PriceSnapshot] = PriceSnapshot.objects.filter(
         date=d, ticker__in=p.holdings.values_list("ticker", flat=True)
     )
-    price_map = {s.ticker: _D(s.close) for s in snaps}
+    price_map = {s.ticker: micros(s.close) for s in snaps}
     if not price_map:
-        price_map = {h.ticker: _D(get_latest_price(h.ticker)) for h in p.holdings.all()}
+        price_map = {h.ticker: micros(get_latest_price(h.ticker)) for h in p.holdings.all()}
 
-    total = _D(p.cash)
+    total = micros(p.cash) or 0
     for h in p.holdings.all():
-        total += _D(h.quantity) * price_map.get(h.ticker, Decimal("0"))
-    return total
+        q = h.quantity if quantities is None else quantities.get(h.ticker, h.quantity)
+        total += mul(micros(q) or 0, price_map.get(h.ticker) or 0)
+    return to_decimal(total)
 
 
-def _filter_dates(dates: List[date], rng: str) -> List[date]:
-    if not dates:
-        return []
-    today = date.today()
-    if rng == "1d":
-        return [dates[-1]]
-    if rng == "1w":
-        return dates[-5:]
-    if rng == "ytd":
-        return [d for d in dates if d.year == today.year]
-    if rng == "1y":
-        return [d for d in dates if d >= today - timedelta(days=365)]
-    return dates
+def ingest_history(tickers: List[str], start: date) -> int:
+    """
+    Daily closes with dividends and splits for *tickers* since *start* in one
+    download, upserted into PriceSnapshot. Adjustment factors and rollups are
+    then carried forward from each ticker's first new or changed row only.
+    Returns the number of rows written.
+    """
+    tickers = sorted(set(tickers))
+    syms = [_clean_ticker(t) for t in tickers]
+    acquire(n=len(syms))
+    df = yf.download(
+        syms if len(syms) > 1 else syms[0],
+        start=start,
+        interval="1d",
+        progress=False,
+        auto_adjust=False,
+        actions=True,
+    )
+    if df is None or df.empty:
+        return 0
 
+    written = 0
+    for ticker, sym in zip(tickers, syms):
+        closes = _column(df, "Close", sym)
+        if closes is None or closes.empty:
+            continue
+        divs = _column(df, "Dividends", sym)
+        splits = _column(df, "Stock Splits", sym)
+        stored = {
+            d: (float(c), float(dv), float(sp))
+            for d, c, dv, sp in PriceSnapshot.objects.filter(ticker=ticker, date__gte=start)
+            .values_list("date", "close", "dividend", "split")
+        }
+        snaps, first_changed = [], None
+        for ts, px in closes.items():
+            f = _finite_float(px)
+            if not f:
+                continue
+            d = ts.date()
+            dividend = (_finite_float(divs.get(ts)) if divs is not None else None) or 0.0
+            split = (_finite_float(splits.get(ts)) if splits is not None else None) or 1.0
+            snaps.append(PriceSnapshot(ticker=ticker, date=d, close=f, dividend=dividend, split=split))
+            if stored.get(d) != (round(f, 4), round(dividend, 4), round(split, 4)) and first_changed is None:
+                first_changed = d
+        PriceSnapshot.objects.bulk_create(
+            snaps,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["ticker", "date"],
+            update_fields=["close", "dividend", "split"],
+        )
+        if first_changed is not None:
+            history_changed([ticker], first_changed)
+        written += len(snaps)
+    return written
 
-def get_portfolio_timeseries(p: Portfolio, rng: str) -> List[dict]:
-    if rng == "1d":
-        return _intraday_series(p)
 
-    tickers = list(p.holdings.values_list("ticker", flat=True))
-    if not tickers:
-        return [{"date": date.today().isoformat(), "value": float(_D(p.cash))}]
+def get_daily_closes(ticker: str, start: date, adjusted: bool = False) -> Dict[date, float]:
+    """
+    Closes for *ticker* since *start* (stored_closes: daily, rollups where
+    compacted) – total-return levels (close × return_factor) with *adjusted*.
+    If nothing is stored yet (e.g. a benchmark index), download once and persist.
+    """
+    rows = stored_closes([ticker], start)
+    if not rows:
+        try:
+            ingest_history([ticker], start)
+            rows = stored_closes([ticker], start)
+        except Exception:
+            pass
+    return {d: float(px) * (rf if adjusted else 1.0) for d, _, px, _, rf in rows}
+
+
+def _range_start(rng: str, tickers: List[str], today: date) -> Optional[date]:
+    """First date of chart range *rng* ("1w" = the last five stored trading days)."""
+    if rng == "ytd":
+        return date(today.year, 1, 1)
+    if rng == "1y":
+        return today - timedelta(days=365)
+    if rng == "1w":
+        days = list(
+            PriceSnapshot.objects.filter(ticker__in=tickers)
+            .order_by("-date").values_list("date", flat=True).distinct()[:5]
+        )
+        return days[-1] if days else None
+    return earliest_close(tickers)
+
 
-    qs = PriceSnapshot.objects.filter(ticker__in=tickers)
-    dates = _filter_dates(sorted({d for (d,) in qs.values_list("date")}), rng)
+# ───────────────────────── chart downsampling (LTTB) ─────────────────────────
+def _lttb_indices(y: np.ndarray, n: int, x: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of *n* points that keep the visual
+    shape of y(x). First/last points are always kept; the points between fall
+    into n-2 buckets with the reference edges floor(i·every)+1, every =
+    (size-2)/(n-2) (integer arithmetic, so no edge is off by one from float
+    rounding). Bucket means come from cumulative sums and each bucket's
+    triangle areas are one NumPy expression, so the Python loop runs once per
+    *output* point, not per input point.
+    """
+    size = len(y)
+    if n >= size or n < 3:
+        return np.arange(size)
+    x = np.arange(size, dtype=float) if x is None else np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    edges = np.arange(n - 1, dtype=np.int64) * (size - 2) // (n - 2) + 1  # n-2 buckets over [1, size-1)
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+
+    out = np.empty(n, dtype=np.intp)
+    out[0], out[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (size - 1, size)
+        avg_x = (cx[nhi] - cx[nlo]) / (nhi - nlo)
+        avg_y = (cy[nhi] - cy[nlo]) / (nhi - nlo)
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def downsample_series(series: Series, points: Optional[int]) -> Series:
+    """LTTB-downsample a chart series to at most *points* points."""
+    if not points or series.values.size <= points:
+        return series
+    return series.take(_lttb_indices(series.values, points))
+
+
+def _split_quantities(p: Portfolio, holdings: List[Any]) -> Tuple[np.ndarray, Dict[str, float]]:
+    """
+    Holdings in the share units before any stored split (quantity ÷
+    split_factor), and today's share counts of the tickers that split (for
+    portfolio_value_on). A fill counts in the units of its trade date, so
+    fills from before a split grow with it; the part of a holding no fill
+    accounts for counts in today's units.
+    Two queries (split days, fills) when a held ticker has split, else one.
+    """
+    tickers = [h.ticker for h in holdings]
+    splits: Dict[str, List[Tuple[date, float]]] = {}
+    for t, d, f in (
+        PriceSnapshot.objects.filter(ticker__in=tickers).exclude(split=1)
+        .order_by("date").values_list("ticker", "date", "split_factor")
+    ):
+        splits.setdefault(t, []).append((d, f))
+
+    def factor(t: str, d: date) -> float:
+        f = 1.0
+        for ex, sf in splits.get(t, ()):
+            if ex > d:
+                break
+            f = sf
+        return f
+
+    now = {t: factor(t, date.max) for t in tickers}
+    base = {h.ticker: float(h.quantity) / now[h.ticker] for h in holdings}
+    if splits:
+        for t, kind, q, ts in p.trades.filter(ticker__in=list(splits), type__in=("BUY", "SELL", "SHORT_COVER")) \
+                .values_list("ticker", "type", "quantity", "executed_at"):
+            q = float(q) if kind != "SELL" else -float(q)
+            base[t] += q / factor(t, ts.date()) - q / now[t]
+    return np.array([base[t] for t in tickers]), {t: base[t] * now[t] for t in splits}
+
+
+def _daily_series(p: Portfolio, rng: str, points: Optional[int] = None) -> Series:
+    """
+    Equity (current holdings × closes + cash) over *rng*, plus today, with
+    quantities and closes in the same share units at every point, so a split
+    in range does not step the series (_split_quantities).
+    Long ranges read weekly/monthly rollups – the coarsest resolution that
+    still gives enough points (market.rollups.choose_resolution) – instead of
+    every daily snapshot. One price query, valued as one matrix product.
+    """
+    holdings = list(p.holdings.all())
+    today = date.today()
+    cash = to_float(micros(p.cash) or 0)
+    if not holdings:
+        return Series(np.array([today], dtype="datetime64[D]").astype("datetime64[s]").astype(np.int64),
+                      np.array([cash]))
+
+    tickers = [h.ticker for h in holdings]
+    start = _range_start(rng, tickers, today)
+    res = DAY if start is None or rng == "1w" else choose_resolution(start, today, points)
+    if res == DAY:
+        qs = PriceSnapshot.objects.filter(ticker__in=tickers)
+        if start is not None:
+            qs = qs.filter(date__gte=start)
+        rows = [(d, d, t, c, f) for d, t, c, f in qs.values_list("date", "ticker", "close", "split_factor")]
+    else:
+        rows = list(
+            PriceRollup.objects
+            .filter(ticker__in=tickers, resolution=res, period_start__gte=period_start(start, res))
+            .values_list("period_start", "as_of", "ticker", "close", "split_factor")
+        )
 
-    series: List[dict] = []
-    for d in dates:
-        v = portfolio_value_on(p, d)
-        f = _finite_float(v)
-        if f is not None:
-            series.append({"date": d.isoformat(), "value": f})
+    # a point sits at the newest close of its period; today is valued live below
+    at: Dict[date, date] = {}
+    for key, as_of, *_ in rows:
+        at[key] = max(as_of, at.get(key, as_of))
+    keys = sorted(k for k, d in at.items() if d < today)
+
+    # a held ticker without a close in a period counts as 0 there (same as portfolio_value_on)
+    k_idx = {k: i for i, k in enumerate(keys)}
+    t_idx = {t: j for j, t in enumerate(tickers)}
+    closes = np.zeros((len(keys), len(tickers)))
+    for key, _, t, c, f in rows:
+        i = k_idx.get(key)
+        if i is not None:
+            # per pre-split share: the close × the shares one became by then
+            closes[i, t_idx[t]] = float(c) * f
+    qty, today_qty = _split_quantities(p, holdings)
+    values = cash + closes @ qty
+    dates = [at[k] for k in keys]
 
     # Ensure “today” is present
-    today_val = _finite_float(portfolio_value_on(p, date.today()))
+    today_val = _finite_float(portfolio_value_on(p, today, today_qty))
     if today_val is not None:
-        series = [pt for pt in series if pt["date"] != date.today().isoformat()]
-        series.append({"date": date.today().isoformat(), "value": today_val})
+        dates.append(today)
+        values = np.append(values, today_val)
+
+    ts = np.array(dates, dtype="datetime64[D]").astype("datetime64[s]").astype(np.int64)
+    order = np.argsort(ts, kind="stable")
+    ts, values = ts[order], values[order]
+    keep = np.isfinite(values)
+    return Series(ts[keep], values[keep])
+
+
+def get_portfolio_series(
+    p: Portfolio,
+    rng: str,
+    points: Optional[int] = None,
+    intraday: Optional[Tuple[Tuple[datetime, datetime], Dict[str, pd.DataFrame]]] = None,
+) -> Series:
+    """
+    Equity series for the chart as arrays. *points* caps the number of points
+    (LTTB over the sample index – bars/trading days are close to evenly spaced).
+    *intraday* = (window, frames) already fetched for range "1d".
+    """
+    if rng == "1d":
+        series = _intraday_series(p, *intraday) if intraday else _intraday_series(p)
+    else:
+        series = _daily_series(p, rng, points)
+    return downsample_series(series, points)
+
 
-    return sorted(series, key=lambda x: x["date"])
+def get_portfolio_timeseries(p: Portfolio, rng: str, points: Optional[int] = None) -> List[dict]:
+    """Legacy [{"date", "value"}] form of get_portfolio_series()."""
+    return get_portfolio_series(p, rng, points).to_points()
 
 
 # ───────────────────────── allocation / treemap ───────────────────────
-def get_allocations_treemap(p: Portfolio) -> dict:
-    total = _D(p.cash)
-    latest: Dict[str, Decimal] = {h.ticker: _D(get_latest_price(h.ticker)) for h in p.holdings.all()}
-    total += sum(_D(h.quantity) * latest[h.ticker] for h in p.holdings.all())
+def get_allocations_treemap(p: Portfolio, quotes: Optional[Dict[str, Tuple[float, float]]] = None) -> dict:
+    """
+    Treemap of holdings + cash. *quotes* ({ticker: (price, change_24h_pct)})
+    lets a caller that fetched them concurrently skip the per-ticker lookups.
+    """
+    holdings = list(p.holdings.all())
+    if quotes is None:
+        quotes = {h.ticker: (get_latest_price(h.ticker), get_change_24h_pct(h.ticker)) for h in holdings}
+    cash = micros(p.cash) or 0
+    qty = micros_array([h.quantity for h in holdings])
+    values = mul_array(qty, micros_array([quotes[h.ticker][0] for h in holdings]))
+    total = cash + int(values.sum())
 
     data = []
-    for h in p.holdings.all():
-        q = _D(h.quantity)
-        value = q * latest[h.ticker]
-        weight = float((value / total) * 100) if total != 0 else 0.0
+    for h, q, value in zip(holdings, qty.tolist(), values.tolist()):
         data.append(
             {
                 "ticker": h.ticker,
-                "weight": weight,
-                "value": float(value),
-                "change_pct": get_change_24h_pct(h.ticker),  # ← 24h change for color/tooltip
+                "weight": ratio(value, total) * 100 if total != 0 else 0.0,
+                "value": to_float(value),
+                "change_pct": quotes[h.ticker][1],  # ← 24h change for color/tooltip
                 "position": "long" if q >= 0 else "short",
             }
         )
 
-    if _D(p.cash) > 0:
+    if cash > 0:
         data.append(
             {
                 "ticker": "CASH",
-                "weight": float((_D(p.cash) / total) * 100) if total != 0 else 0.0,
-                "value": float(_D(p.cash)),
+                "weight": ratio(cash, total) * 100 if total != 0 else 0.0,
+                "value": to_float(cash),
                 "change_pct": 0.0,
                 "position": "cash",
             }
         )
 
-    return {"total": float(total), "data": data}
+    return {"total": to_float(total), "data": data}
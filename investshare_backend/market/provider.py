@@ -0,0 +1,65 @@
+# market/provider.py
+"""
+Lazily loaded market-data stack.
+
+pandas and yfinance cost a few hundred milliseconds to import, and most
+processes – migrate, auth and trade-listing requests, worker boot – never
+touch them. Modules use the handles here instead of importing them:
+
+    from market.provider import pd, yf
+
+and the real module is imported on first attribute access (yf.download,
+pd.isna, ...). Keep `pd.`/`yf.` out of module-level code and signatures
+evaluated at import time (annotations are fine with
+`from __future__ import annotations`).
+
+`manage.py import_budget` checks that URL loading still stays clear of them.
+
+settings.MARKET_DATA_MODULE names the module `yf` stands for – yfinance,
+or a stand-in with the same surface such as loadtest.fake_market.
+"""
+from __future__ import annotations
+
+import importlib
+import sys
+from types import ModuleType
+from typing import Optional
+
+HEAVY_MODULES = ("pandas", "yfinance")
+
+
+class LazyModule:
+    """
+    Stand-in for a module that imports it on first attribute access. With
+    *setting*, that Django setting (when set) overrides the module name.
+    """
+
+    def __init__(self, name: str, setting: Optional[str] = None):
+        self._name = name
+        self._setting = setting
+        self._module: Optional[ModuleType] = None
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            name = self._name
+            if self._setting:
+                from django.conf import settings
+                name = getattr(settings, self._setting, None) or name
+            self._module = importlib.import_module(name)
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def loaded() -> list:
+    """The HEAVY_MODULES already imported in this process."""
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+pd = LazyModule("pandas")
+yf = LazyModule("yfinance", setting="MARKET_DATA_MODULE")
@@ -0,0 +1,186 @@
+# market/rollups.py
+"""
+Weekly and monthly close rollups of PriceSnapshot, and daily-data retention.
+
+PriceRollup keeps the last close of each week (Monday start) and month per
+ticker. Writers of PriceSnapshot call market.actions.history_changed() for
+the dates they touched, which rebuilds only the periods from there on. Long chart ranges
+read rollups instead of every daily row (choose_resolution), and
+compact_prices() drops daily rows – then weekly rollups – older than the
+retention windows once they are rolled up. Readers that need closes from
+before the daily window go through stored_closes(), which fills the
+compacted span from the rollups.
+"""
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min, Q
+
+from .models import PriceRollup, PriceSnapshot
+
+DAY, WEEK, MONTH = "D", PriceRollup.WEEK, PriceRollup.MONTH
+DAYS_PER = {DAY: 1.4, WEEK: 7.0, MONTH: 30.44}  # calendar days per point (1.4 ≈ 7/5 trading days)
+
+
+def period_start(d: date, res: str) -> date:
+    if res == WEEK:
+        return d - timedelta(days=d.weekday())
+    if res == MONTH:
+        return d.replace(day=1)
+    return d
+
+
+def _cutoff(setting: str, today: date) -> Optional[date]:
+    days = getattr(settings, setting, None)
+    return today - timedelta(days=days) if days else None
+
+
+def daily_cutoff(today: Optional[date] = None) -> Optional[date]:
+    """Daily closes before this date may have been compacted (None: kept forever)."""
+    cut = _cutoff("PRICE_DAILY_RETENTION_DAYS", today or date.today())
+    return period_start(cut, MONTH) if cut else None
+
+
+def weekly_cutoff(today: Optional[date] = None) -> Optional[date]:
+    """Weekly rollups before this date may have been dropped (None: kept forever)."""
+    cut = _cutoff("PRICE_WEEKLY_RETENTION_DAYS", today or date.today())
+    return period_start(cut, MONTH) if cut else None
+
+
+# ───────────────────────────── maintenance ─────────────────────────────
+def update_rollups(tickers: Iterable[str], since: date, until: Optional[date] = None) -> int:
+    """
+    Rebuild the weekly and monthly rollups of *tickers* for every period
+    that contains a date in [since, until]. One snapshot read, one upsert.
+    Returns the number of rollup rows written.
+    """
+    tickers = sorted(set(tickers))
+    if not tickers:
+        return 0
+    lo = min(period_start(since, WEEK), period_start(since, MONTH))
+    qs = PriceSnapshot.objects.filter(ticker__in=tickers, date__gte=lo)
+    if until is not None:
+        # finish the period *until* falls in
+        qs = qs.filter(date__lt=max(period_start(until, WEEK) + timedelta(days=7),
+                                    (period_start(until, MONTH) + timedelta(days=32)).replace(day=1)))
+
+    last: Dict[Tuple[str, str, date], Tuple[date, object, float, float]] = {}
+    for t, d, close, sf, rf in qs.order_by("date").values_list(
+        "ticker", "date", "close", "split_factor", "return_factor"
+    ):
+        for res in (WEEK, MONTH):
+            last[(t, res, period_start(d, res))] = (d, close, sf, rf)
+
+    rows = [
+        PriceRollup(ticker=t, resolution=res, period_start=start, as_of=d, close=close,
+                    split_factor=sf, return_factor=rf)
+        for (t, res, start), (d, close, sf, rf) in last.items()
+        if until is None or start <= until  # periods read only partly (past *until*) stay as they are
+    ]
+    PriceRollup.objects.bulk_create(
+        rows,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["ticker", "resolution", "period_start"],
+        update_fields=["as_of", "close", "split_factor", "return_factor"],
+    )
+    return len(rows)
+
+
+@transaction.atomic
+def compact_prices(today: Optional[date] = None) -> Dict[str, int]:
+    """
+    Apply the retention policy: roll up and delete daily closes before
+    daily_cutoff() (rows carrying a dividend or split are kept), then drop
+    weekly rollups before weekly_cutoff(). Monthly rollups are kept forever.
+    """
+    today = today or date.today()
+    out = {"rolled": 0, "daily_deleted": 0, "weekly_deleted": 0}
+
+    cut = daily_cutoff(today)
+    if cut:
+        old = PriceSnapshot.objects.filter(date__lt=cut).exclude(Q(dividend__gt=0) | ~Q(split=1))
+        first = old.aggregate(d=Min("date"))["d"]
+        if first is not None:
+            tickers = old.values_list("ticker", flat=True).distinct()
+            out["rolled"] = update_rollups(tickers, first, cut - timedelta(days=1))
+            out["daily_deleted"] = old.delete()[0]
+
+    cut = weekly_cutoff(today)
+    if cut:
+        out["weekly_deleted"] = PriceRollup.objects.filter(resolution=WEEK, period_start__lt=cut).delete()[0]
+    return out
+
+
+# ───────────────────────────── readers ─────────────────────────────
+Close = Tuple[date, str, object, float, float]  # (date, ticker, close, split_factor, return_factor)
+
+
+def stored_closes(tickers: Iterable[str], start: Optional[date] = None, end: Optional[date] = None) -> List[Close]:
+    """
+    Every stored close of *tickers* in [start, end], oldest first. Before
+    daily_cutoff() compact_prices has left only dividend/split days, so that
+    span is filled with the weekly (then monthly) rollup closes, each at the
+    date it was taken.
+    """
+    tickers = list(tickers)
+    fields = ("date", "ticker", "close", "split_factor", "return_factor")
+    qs = PriceSnapshot.objects.filter(ticker__in=tickers)
+    if start is not None:
+        qs = qs.filter(date__gte=start)
+    if end is not None:
+        qs = qs.filter(date__lte=end)
+    rows: List[Close] = list(qs.values_list(*fields))
+
+    cut = daily_cutoff()
+    if cut is None or (start is not None and start >= cut):
+        return sorted(rows, key=lambda r: r[0])
+    ru = PriceRollup.objects.filter(ticker__in=tickers, as_of__lt=cut)
+    if start is not None:
+        ru = ru.filter(as_of__gte=start)
+    if end is not None:
+        ru = ru.filter(as_of__lte=end)
+    seen = {(d, t) for d, t, *_ in rows}
+    for row in ru.order_by("-resolution").values_list("as_of", *fields[1:]):
+        # a week and a month often end on the same close; rows still stored win
+        if (row[0], row[1]) not in seen:
+            seen.add((row[0], row[1]))
+            rows.append(row)
+    return sorted(rows, key=lambda r: r[0])
+
+
+# ───────────────────────────── chart ranges ─────────────────────────────
+def earliest_close(tickers: Iterable[str]) -> Optional[date]:
+    """Oldest stored close of any of *tickers* (monthly rollups reach back furthest)."""
+    tickers = list(tickers)
+    found = [
+        PriceRollup.objects.filter(ticker__in=tickers, resolution=MONTH).aggregate(d=Min("period_start"))["d"],
+        PriceSnapshot.objects.filter(ticker__in=tickers).aggregate(d=Min("date"))["d"],
+    ]
+    found = [d for d in found if d is not None]
+    return min(found) if found else None
+
+
+def choose_resolution(start: date, end: date, target: Optional[int] = None) -> str:
+    """
+    Coarsest of month/week/day that still gives *target* points (default
+    CHART_MIN_POINTS) over [start, end]; never one whose data before *start*
+    has been compacted away.
+    """
+    target = target or getattr(settings, "CHART_MIN_POINTS", 120)
+    span = max((end - start).days, 1)
+    allowed = [MONTH]
+    wk = weekly_cutoff(end)
+    if wk is None or start >= wk:
+        allowed.append(WEEK)
+    dy = daily_cutoff(end)
+    if dy is None or start >= dy:
+        allowed.append(DAY)
+    for res in allowed:
+        if span / DAYS_PER[res] >= target:
+            return res
+    return allowed[-1]
@@ -0,0 +1,100 @@
+# market/series.py
+from __future__ import annotations
+
+import struct
+from datetime import datetime, timezone
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+from rest_framework.renderers import BaseRenderer
+
+from investshare.renderers import ORJSONRenderer
+
+
+class Series(NamedTuple):
+    """
+    A chart series as parallel arrays.
+
+    ts     – int64 epoch seconds (UTC; daily points sit at 00:00 UTC)
+    values – float64
+    daily  – True for one-point-per-day series (legacy JSON uses YYYY-MM-DD)
+    stale  – tickers valued at a carried-forward price instead of live bars
+    """
+    ts: np.ndarray
+    values: np.ndarray
+    daily: bool = True
+    stale: Tuple[str, ...] = ()
+
+    @classmethod
+    def empty(cls, daily: bool = True) -> "Series":
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=float), daily)
+
+    def take(self, idx: np.ndarray) -> "Series":
+        return Series(self.ts[idx], self.values[idx], self.daily, self.stale)
+
+    def to_points(self) -> List[dict]:
+        """Legacy [{"date": iso, "value": f}, ...] payload."""
+        if self.daily:
+            dates = self.ts.astype("datetime64[s]").astype("datetime64[D]").astype(str)
+            return [{"date": d, "value": v} for d, v in zip(dates.tolist(), self.values.tolist())]
+        return [
+            {"date": datetime.fromtimestamp(t, tz=timezone.utc).isoformat(), "value": v}
+            for t, v in zip(self.ts.tolist(), self.values.tolist())
+        ]
+
+
+# ───────────────────────────── wire formats ─────────────────────────────
+# Chosen with ?format=columnar|f32 or the matching Accept media type; views
+# hand these renderers a Series instead of a list of dicts.
+class ColumnarSeriesRenderer(ORJSONRenderer):
+    """
+    {"t": [...epoch s], "v": [...]} – or, with ?delta=1,
+    {"t0": first, "dt": [0, Δ1, Δ2, ...], "v": [...], "encoding": "delta"} –
+    plus "resolution" and "stale" (Series.stale).
+    """
+    media_type = "application/vnd.investshare.series+json"
+    format = "columnar"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, Series):
+            request = (renderer_context or {}).get("request")
+            delta = request is not None and request.query_params.get("delta") in ("1", "true")
+            if delta and data.ts.size:
+                body = {
+                    "t0": int(data.ts[0]),
+                    "dt": np.diff(data.ts, prepend=data.ts[0]).tolist(),
+                    "v": data.values.tolist(),
+                    "encoding": "delta",
+                }
+            else:
+                body = {"t": data.ts.tolist(), "v": data.values.tolist()}
+            body["resolution"] = "1d" if data.daily else "intraday"
+            body["stale"] = list(data.stale)
+            data = body
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class Float32SeriesRenderer(BaseRenderer):
+    """
+    Little-endian binary: uint32 N | uint32 t[N] (epoch s) | float32 v[N].
+    Decodes with one DataView/Float32Array on the client.
+    """
+    media_type = "application/vnd.investshare.series+f32"
+    format = "f32"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, Series):
+            # errors etc. – still answer with something readable
+            return ORJSONRenderer().render(data, accepted_media_type, renderer_context)
+        n = data.ts.size
+        return b"".join((
+            struct.pack("<I", n),
+            data.ts.astype("<u4").tobytes(),
+            data.values.astype("<f4").tobytes(),
+        ))
+
+
+SERIES_RENDERERS = [ColumnarSeriesRenderer, Float32SeriesRenderer]
+SERIES_FORMATS = {r.format for r in SERIES_RENDERERS}
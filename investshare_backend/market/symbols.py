@@ -0,0 +1,128 @@
+# market/symbols.py
+from __future__ import annotations
+
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Iterable, List, Optional, Tuple
+
+from django.core.cache import cache
+
+from .models import Symbol
+
+GENERATION_KEY = "symbol_master_gen"
+INDEX_MAX_AGE = 60 * 60   # rebuild at least hourly even if no generation bump is seen
+MAX_CANDIDATES = 256      # cap per prefix range so one-letter queries stay sub-ms
+
+_TOKEN_RE = re.compile(r"[A-Z0-9]+")
+_HI = "\uffff"
+
+Row = Tuple[str, str, str]  # (symbol, name, exchange)
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or "").upper())
+
+
+def _prefix_slice(keys: List[str], prefix: str) -> Tuple[int, int]:
+    return bisect_left(keys, prefix), bisect_left(keys, prefix + _HI)
+
+
+class SymbolIndex:
+    """
+    Immutable in-memory index over the symbol master.
+
+    • symbols: sorted array, prefix lookup with bisect
+    • names:   sorted (token, row) array, token-prefix lookup with bisect
+    """
+
+    def __init__(self, rows: Iterable[Row]):
+        self.rows: List[Row] = sorted(rows)
+        self.symbols = [r[0] for r in self.rows]
+        self.row_tokens = [_tokens(name) for _, name, _ in self.rows]
+        pairs = sorted(
+            (tok, i, pos)
+            for i, toks in enumerate(self.row_tokens)
+            for pos, tok in enumerate(toks)
+        )
+        self.tok_keys = [t for t, _, _ in pairs]
+        self.tok_rows = [(i, pos) for _, i, pos in pairs]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _name_matches(self, tokens: List[str]) -> dict:
+        """row → best token position, for rows where every query token prefixes some name token."""
+        # scan the most selective token's range, then verify the others per candidate
+        ranges = sorted((_prefix_slice(self.tok_keys, qt), qt) for qt in tokens)
+        ranges.sort(key=lambda r: r[0][1] - r[0][0])
+        (lo, hi), _ = ranges[0]
+        rest = [qt for _, qt in ranges[1:]]
+
+        hits: dict = {}
+        for i, pos in self.tok_rows[lo:min(hi, lo + MAX_CANDIDATES * 4)]:
+            if pos >= hits.get(i, 1 << 30):
+                continue
+            if rest:
+                name_toks = self.row_tokens[i]
+                if not all(any(t.startswith(qt) for t in name_toks) for qt in rest):
+                    continue
+            hits[i] = pos
+        return hits
+
+    def search(self, q: str, limit: int = 10) -> List[dict]:
+        """
+        Ranked matches: exact symbol, then symbol prefix (shorter first), then
+        company-name token prefix (earlier token first).
+        """
+        q = (q or "").upper().strip()
+        if not q:
+            return []
+
+        scored = {}
+        sym_q = q.replace(" ", "")
+        lo, hi = _prefix_slice(self.symbols, sym_q)
+        for i in range(lo, min(hi, lo + MAX_CANDIDATES)):
+            s = self.symbols[i]
+            scored[i] = (0 if s == sym_q else 1, len(s), s)
+
+        tokens = _tokens(q)
+        if tokens:
+            for i, pos in self._name_matches(tokens).items():
+                key = (2 + min(pos, 1), pos, self.rows[i][0])
+                if i not in scored or key < scored[i]:
+                    scored[i] = key
+
+        best = heapq.nsmallest(limit, scored.items(), key=lambda kv: kv[1])
+        return [
+            {"ticker": self.rows[i][0], "name": self.rows[i][1], "exchange": self.rows[i][2]}
+            for i, _ in best
+        ]
+
+
+# ───────────────────────────── process-wide instance ─────────────────────────────
+_lock = threading.Lock()
+_index: Optional[SymbolIndex] = None
+_index_gen = None
+_index_built = 0.0
+
+
+def get_symbol_index() -> SymbolIndex:
+    """Shared index, rebuilt from the Symbol table when load_symbols bumps the generation."""
+    global _index, _index_gen, _index_built
+    gen = cache.get(GENERATION_KEY)
+    fresh = _index is not None and gen == _index_gen and time.monotonic() - _index_built < INDEX_MAX_AGE
+    if fresh:
+        return _index
+    with _lock:
+        if _index is None or gen != _index_gen or time.monotonic() - _index_built >= INDEX_MAX_AGE:
+            _index = SymbolIndex(Symbol.objects.values_list("symbol", "name", "exchange").iterator(chunk_size=5000))
+            _index_gen = gen
+            _index_built = time.monotonic()
+    return _index
+
+
+def bump_generation() -> None:
+    cache.set(GENERATION_KEY, time.time(), None)
@@ -1,3 +1,727 @@
-from django.test import TestCase
+import gzip
+import ipaddress
+import json
+import math
+import random
+import struct
+import uuid
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import ROUND_HALF_EVEN, Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from django.utils.timezone import now
+
+from . import calendar, fundamentals, latency, money, prices, rollups, symbols, upstream
+from .actions import history_changed, recompute_factors
+from .models import PriceRollup, PriceSnapshot, Symbol, TickerInfo
+from .provider import HEAVY_MODULES, pd
+from .series import ColumnarSeriesRenderer, Float32SeriesRenderer, Series
+from investshare.middleware import CompressionMiddleware, brotli
+from investshare.renderers import ORJSONRenderer
+from portfolios.models import Holding, Portfolio, Trade
+
+MICRO = Decimal("0.000001")
+RUNS = 5000
+
+
+def _dec(rnd: random.Random, places: int, digits: int) -> Decimal:
+    """A random signed Decimal with *places* decimals and up to *digits* integer digits."""
+    n = rnd.randrange(10 ** (digits + places))
+    return Decimal(n if rnd.random() < 0.8 else -n).scaleb(-places)
+
+
+def _old_mul(q: Decimal, px: Decimal) -> Decimal:
+    """What valuation did before money.py: Decimal product, rounded to 6 dp."""
+    return (q * px).quantize(MICRO, rounding=ROUND_HALF_EVEN)
+
+
+class MoneyEquivalenceTests(SimpleTestCase):
+    """Randomized checks of market.money against the Decimal(str(x)) arithmetic it replaced."""
+
+    def setUp(self):
+        self.rnd = random.Random(20261019)
+
+    def test_micros_is_exact_for_stored_precisions(self):
+        for _ in range(RUNS):
+            for places, digits in ((6, 8), (4, 7), (2, 12)):  # quantity, price, cash
+                d = _dec(self.rnd, places, digits)
+                expected = int(d.scaleb(6))
+                self.assertEqual(money.micros(d), expected, d)
+                self.assertEqual(money.micros(str(d)), expected, d)
+                if abs(d) < 9 * 10 ** 9:  # where float64 still carries every micro
+                    self.assertEqual(money.micros(float(d)), expected, d)
+
+    def test_micros_of_floats_matches_decimal_str(self):
+        for _ in range(RUNS):
+            x = self.rnd.uniform(-1e6, 1e6)
+            old = Decimal(str(x)).quantize(MICRO, rounding=ROUND_HALF_EVEN)
+            self.assertEqual(money.micros(x), int(old.scaleb(6)), x)
+
+    def test_micros_rejects_non_finite_and_garbage(self):
+        for x in (None, float("nan"), float("inf"), -float("inf"), Decimal("NaN"), "abc", object()):
+            self.assertIsNone(money.micros(x))
+
+    def test_mul_matches_decimal_product(self):
+        for _ in range(RUNS):
+            q, px = _dec(self.rnd, 6, 8), _dec(self.rnd, 4, 7)
+            got = money.mul(money.micros(q), money.micros(px))
+            self.assertEqual(got, int(_old_mul(q, px).scaleb(6)), (q, px))
+
+    def test_mul_large_notionals(self):
+        # up to 10⁹ shares at 10⁶ a share: far past int64 in micros, still
+        # inside the 28 digits of Decimal's default context
+        for _ in range(RUNS // 10):
+            q, px = _dec(self.rnd, 6, 9), _dec(self.rnd, 4, 6)
+            got = money.mul(money.micros(q), money.micros(px))
+            self.assertEqual(got, int(_old_mul(q, px).scaleb(6)), (q, px))
+
+    def test_mul_rounds_ties_to_even(self):
+        for _ in range(RUNS):
+            # a × 0.5 micro-units lands exactly on a half micro when a is odd
+            a = self.rnd.randrange(-10 ** 9, 10 ** 9)
+            q = Decimal(a).scaleb(-6)
+            half = Decimal("0.5")
+            got = money.mul(a, money.micros(half))
+            self.assertEqual(got, int(_old_mul(q, half).scaleb(6)), a)
+        self.assertEqual(money.mul(1, 500_000), 0)
+        self.assertEqual(money.mul(3, 500_000), 2)
+        self.assertEqual(money.mul(-1, 500_000), 0)
+        self.assertEqual(money.mul(-3, 500_000), -2)
+
+    def test_mul_array_matches_mul(self):
+        for size, q_digits, px_digits in ((1, 8, 7), (50, 8, 7), (50, 9, 6)):
+            for _ in range(50):
+                qs = [_dec(self.rnd, 6, q_digits) for _ in range(size)]
+                pxs = [_dec(self.rnd, 4, px_digits) for _ in range(size)]
+                a = [money.micros(q) for q in qs]
+                b = [money.micros(px) for px in pxs]
+                got = money.mul_array(np.array(a, dtype=np.int64), np.array(b, dtype=np.int64))
+                expected = [int(_old_mul(q, px).scaleb(6)) for q, px in zip(qs, pxs)]
+                self.assertEqual([int(v) for v in got], expected)
+
+    def test_mul_array_ties_and_empty(self):
+        a = np.array([1, 3, -1, -3, 5, -5], dtype=np.int64)
+        self.assertEqual(money.mul_array(a, np.full(6, 500_000)).tolist(), [0, 2, 0, -2, 2, -2])
+        self.assertEqual(money.mul_array(np.array([], dtype=np.int64), np.array([], dtype=np.int64)).size, 0)
+
+    def test_micros_array_matches_micros(self):
+        xs = [self.rnd.uniform(-1e6, 1e6) for _ in range(RUNS)] + [None, float("nan"), float("inf")]
+        got = money.micros_array(xs).tolist()
+        self.assertEqual(got[:-3], [money.micros(x) for x in xs[:-3]])
+        self.assertEqual(got[-3:], [0, 0, 0])
+
+    def test_ratio_matches_decimal_division(self):
+        for _ in range(RUNS):
+            a, b = _dec(self.rnd, 6, 10), _dec(self.rnd, 6, 10)
+            if not b:
+                continue
+            old = float(a / b)
+            self.assertTrue(math.isclose(money.ratio(money.micros(a), money.micros(b)), old, rel_tol=1e-15), (a, b))
+
+    def test_to_decimal_matches_quantize(self):
+        for _ in range(RUNS):
+            d = _dec(self.rnd, 6, 12)
+            m = money.micros(d)
+            self.assertEqual(money.to_decimal(m), d)
+            for places in (2, 4):
+                exp = Decimal(1).scaleb(-places)
+                self.assertEqual(money.to_decimal(m, places), d.quantize(exp, rounding=ROUND_HALF_EVEN), d)
+        self.assertEqual(money.to_decimal(5_000), Decimal("0.005000"))
+        self.assertEqual(money.to_decimal(5_000, 2), Decimal("0.00"))
+        self.assertEqual(money.to_decimal(15_000, 2), Decimal("0.02"))
+        self.assertEqual(money.to_decimal(-15_000, 2), Decimal("-0.02"))
+
+
+class ImportBudgetTests(SimpleTestCase):
+    def test_urlconf_does_not_import_heavy_modules(self):
+        # the budget itself depends on the machine; this only pins pandas/yfinance out
+        out = StringIO()
+        call_command("import_budget", budget=60_000, top=0, stdout=out)
+        self.assertIn("import budget ok", out.getvalue())
+        self.assertTrue({"pandas", "yfinance"} <= set(HEAVY_MODULES))
+
+    def test_heavy_import_fails_the_check(self):
+        with self.assertRaisesMessage(CommandError, "pandas imported"):
+            call_command("import_budget", budget=60_000, top=0, modules=["pandas"], stdout=StringIO())
+
+
+def _portfolio(cash="0", **holdings) -> Portfolio:
+    """A portfolio holding {ticker: quantity}."""
+    user = get_user_model().objects.create_user(username="owner", email="owner@example.com", password="pw")
+    p = Portfolio.objects.create(owner=user, cash=Decimal(cash))
+    for ticker, qty in holdings.items():
+        Holding.objects.create(portfolio=p, ticker=ticker, quantity=Decimal(qty), avg_cost=Decimal("1"))
+    return Portfolio.objects.prefetch_related("holdings").get(pk=p.pk)
+
+
+class IntradaySeriesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.end = datetime(2026, 10, 19, 18, 0, tzinfo=dt_timezone.utc)
+        self.window = (self.end - timedelta(hours=24), self.end)
+        idx = pd.date_range(self.end - timedelta(minutes=2), periods=3, freq="1min", tz="UTC")
+        self.bars = pd.DataFrame({"Close": [10.0, 11.0, 12.0]}, index=idx)
+        PriceSnapshot.objects.create(ticker="MSFT", date=date(2026, 10, 16), close=Decimal("400"))
+
+    def test_holding_without_bars_is_carried_and_flagged(self):
+        p = _portfolio("100", AAPL="2", MSFT="1")
+        series = prices._intraday_series(p, self.window, {"AAPL": self.bars, "MSFT": None})
+        self.assertEqual(series.values.tolist(), [520.0, 522.0, 524.0])
+        self.assertEqual(series.stale, ("MSFT",))
+
+    def test_no_bars_at_all_is_a_flat_stale_line(self):
+        p = _portfolio("100", AAPL="2", MSFT="1")
+        series = prices._intraday_series(p, self.window, {"AAPL": None, "MSFT": self.bars.iloc[:0]})
+        self.assertEqual(series.values.tolist(), [500.0, 500.0])
+        self.assertEqual(series.stale, ("AAPL", "MSFT"))
+
+    def test_live_series_is_not_stale(self):
+        p = _portfolio("100", AAPL="2")
+        series = prices._intraday_series(p, self.window, {"AAPL": self.bars})
+        self.assertEqual(series.values.tolist(), [120.0, 122.0, 124.0])
+        self.assertEqual(series.stale, ())
+
+
+class SplitSeriesTests(TestCase):
+    """A 2:1 split three sessions ago: 200 before, 100 from the ex-date on."""
+
+    def setUp(self):
+        cache.clear()
+        self.today = date.today()
+        for back in range(5, 0, -1):
+            d = self.today - timedelta(days=back)
+            PriceSnapshot.objects.create(ticker="SPLT", date=d, close=Decimal("200" if back > 3 else "100"),
+                                         split=Decimal("2" if back == 3 else "1"))
+        history_changed(["SPLT"], self.today - timedelta(days=5))
+
+    def test_factors_grow_from_the_ex_date(self):
+        rows = PriceSnapshot.objects.filter(ticker="SPLT").order_by("date")
+        self.assertEqual([r.split_factor for r in rows], [1.0, 1.0, 2.0, 2.0, 2.0])
+        self.assertEqual([r.return_factor for r in rows], [1.0, 1.0, 2.0, 2.0, 2.0])
+
+    def test_dividend_compounds_the_return_factor_from_its_ex_date(self):
+        ex = self.today - timedelta(days=2)
+        PriceSnapshot.objects.filter(ticker="SPLT", date=ex).update(dividend=Decimal("2"))
+        self.assertEqual(recompute_factors("SPLT", ex), 2)
+        rows = PriceSnapshot.objects.filter(ticker="SPLT").order_by("date")
+        self.assertEqual([r.split_factor for r in rows], [1.0, 1.0, 2.0, 2.0, 2.0])
+        self.assertEqual([r.return_factor for r in rows][2:], [2.0, 2.0 * 100 / 98, 2.0 * 100 / 98])
+        self.assertEqual(recompute_factors("SPLT", ex), 0)
+
+    def test_fill_before_the_split_does_not_step_the_series(self):
+        p = _portfolio("0", SPLT="10")
+        Trade.objects.create(portfolio=p, type="BUY", ticker="SPLT", quantity=Decimal("10"), price=Decimal("200"),
+                             cash_delta=Decimal("-2000"), executed_at=now() - timedelta(days=10))
+        with mock.patch("market.prices.get_latest_price", return_value=100.0):
+            series = prices._daily_series(p, "1m")
+        self.assertEqual(series.values.tolist(), [2000.0] * 6)
+
+    def test_holding_without_fills_counts_in_todays_units(self):
+        p = _portfolio("0", SPLT="20")
+        with mock.patch("market.prices.get_latest_price", return_value=100.0):
+            series = prices._daily_series(p, "1m")
+        self.assertEqual(series.values.tolist(), [2000.0] * 6)
+
+
+class HedgedTests(SimpleTestCase):
+    def setUp(self):
+        self.name = f"test-{self.id()}"
+        for _ in range(latency.MIN_SAMPLES):  # p95 well under the floor: hedge at HEDGE_FLOOR
+            latency.tracker(self.name).record(0.01)
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def _slow_then_fast(self, x):
+        with self.lock:
+            self.calls += 1
+            first = self.calls == 1
+        time.sleep(1.0 if first else 0.0)
+        return (x, "first" if first else "hedge")
+
+    def test_fast_call_is_not_hedged(self):
+        self.assertEqual(latency.hedged(self.name, lambda x: x * 2, 21, timeout=1.0), 42)
+
+    def test_slow_first_attempt_is_hedged(self):
+        self.assertEqual(latency.hedged(self.name, self._slow_then_fast, 1, timeout=0.8), (1, "hedge"))
+        self.assertEqual(self.calls, 2)
+
+    def test_failed_first_attempt_is_retried(self):
+        def flaky():
+            with self.lock:
+                self.calls += 1
+                if self.calls == 1:
+                    raise RuntimeError("upstream")
+            return "ok"
+        self.assertEqual(latency.hedged(self.name, flaky, timeout=1.0), "ok")
+
+    def test_no_hedge_when_the_bucket_cannot_pay(self):
+        with self.assertRaises(latency.QuoteTimeout):
+            latency.hedged(self.name, self._slow_then_fast, 1, timeout=0.5, hedge_if=lambda: False)
+        self.assertEqual(self.calls, 1)
+
+    def test_timeout(self):
+        with self.assertRaises(latency.QuoteTimeout):
+            latency.hedged(self.name, time.sleep, 0.5, timeout=0.1, hedge_if=lambda: False)
+
+
+@override_settings(UPSTREAM_CALLS_PER_MINUTE=60, UPSTREAM_BURST=10)
+class UpstreamBucketTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_available_peeks_without_taking(self):
+        self.assertTrue(upstream.available(7, upstream.DISPLAY))
+        upstream.acquire(upstream.DISPLAY, n=5)
+        self.assertTrue(upstream.available(2, upstream.DISPLAY))
+        self.assertFalse(upstream.available(3, upstream.DISPLAY))  # display keeps 30% of 10 back
+        self.assertTrue(upstream.available(3, upstream.TRADE))
+
+    @override_settings(UPSTREAM_BURST=10, UPSTREAM_CALLS_PER_MINUTE=1)
+    def test_each_class_stops_at_its_reserve(self):
+        taken = {}
+        for cls in reversed(upstream.PRIORITIES):
+            taken[cls] = 0
+            while True:
+                try:
+                    upstream.acquire(cls, deadline=0)
+                except upstream.UpstreamThrottled:
+                    break
+                taken[cls] += 1
+        self.assertEqual(taken, {"background": 5, "display": 2, "detail": 2, "trade": 1})
+        m = upstream.metrics()
+        self.assertEqual((m["background"]["calls"], m["background"]["throttled"]), (5, 1))
+        self.assertEqual(m["trade"]["calls"], 1)
+
+    @override_settings(UPSTREAM_BURST=10, UPSTREAM_CALLS_PER_MINUTE=1)
+    def test_priority_context_and_refill(self):
+        cache.set(upstream.BUCKET_KEY, (0.0, time.time() - 300), None)  # five minutes of refill
+        with upstream.priority(upstream.BACKGROUND):
+            self.assertRaises(upstream.UpstreamThrottled, upstream.acquire, deadline=0)
+            self.assertEqual(upstream.metrics()["background"]["throttled"], 1)
+        upstream.acquire(n=2, deadline=0)  # display may go down to 3
+        self.assertRaises(upstream.UpstreamThrottled, upstream.acquire, deadline=0)
+        self.assertEqual(upstream.metrics()["display"]["calls"], 2)
+
+    @override_settings(UPSTREAM_BURST=10)
+    def test_oversized_request_is_capped_at_the_class_share(self):
+        upstream.acquire(upstream.DISPLAY, n=50, deadline=0)
+        self.assertEqual(upstream.metrics()["display"]["calls"], 50)
+        self.assertFalse(upstream.available(1, upstream.DISPLAY))
+
+
+def _reference_lttb(x, y, n):
+    """Straight transcription of Steinarsson's LTTB (the reference implementation)."""
+    size = len(y)
+    every = (size - 2) / (n - 2)
+    out, a = [0], 0
+    for i in range(n - 2):
+        avg_lo = int(math.floor((i + 1) * every)) + 1
+        avg_hi = min(int(math.floor((i + 2) * every)) + 1, size)
+        avg_x = sum(x[avg_lo:avg_hi]) / (avg_hi - avg_lo)
+        avg_y = sum(y[avg_lo:avg_hi]) / (avg_hi - avg_lo)
+        lo, hi = int(math.floor(i * every)) + 1, int(math.floor((i + 1) * every)) + 1
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        out.append(best)
+        a = best
+    return out + [size - 1]
+
+
+class LTTBTests(SimpleTestCase):
+    def setUp(self):
+        self.rnd = np.random.default_rng(20261019)
+
+    def test_keeps_ends_and_length(self):
+        for size, n in ((10, 3), (100, 7), (1000, 50), (5001, 5000), (2521, 300)):
+            y = np.cumsum(self.rnd.normal(size=size))
+            idx = prices._lttb_indices(y, n)
+            self.assertEqual(len(idx), n)
+            self.assertEqual((idx[0], idx[-1]), (0, size - 1))
+            self.assertTrue(np.all(np.diff(idx) > 0))
+
+    def test_matches_reference(self):
+        for size, n in ((50, 5), (997, 101), (3000, 250)):
+            y = np.cumsum(self.rnd.normal(size=size))
+            x = np.cumsum(self.rnd.uniform(0.5, 1.5, size=size))
+            self.assertEqual(prices._lttb_indices(y, n).tolist(), _reference_lttb(np.arange(size), y, n))
+            self.assertEqual(prices._lttb_indices(y, n, x).tolist(), _reference_lttb(x, y, n))
+
+    def test_short_series_untouched(self):
+        y = np.arange(5.0)
+        self.assertEqual(prices._lttb_indices(y, 5).tolist(), [0, 1, 2, 3, 4])
+        self.assertEqual(prices._lttb_indices(y, 2).tolist(), [0, 1, 2, 3, 4])
+
+    def test_downsample_series(self):
+        series = Series(np.arange(100, dtype=np.int64), np.sin(np.arange(100) / 5.0), daily=False)
+        small = prices.downsample_series(series, 10)
+        self.assertEqual(small.values.size, 10)
+        self.assertFalse(small.daily)
+        self.assertIs(prices.downsample_series(series, None), series)
+
+
+class TickerViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.fetch = mock.patch(
+            "market.views.get_batch_quotes",
+            side_effect=lambda syms: {s: (110.0, 100.0) for s in syms},
+        ).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_batch_cap(self):
+        symbols = ",".join(f"T{i}" for i in range(51))
+        r = self.client.get(f"/api/tickers/?symbols={symbols}")
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.json()["error"]["code"], "too_many_symbols")
+        r = self.client.get(f"/api/tickers/?symbols={symbols.rsplit(',', 1)[0]}")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(len(r.json()), 50)
+
+    def test_batch_dedupes_and_drops_bad_symbols(self):
+        r = self.client.get("/api/tickers/?symbols=aapl,AAPL,,bad sym,MSFT")
+        self.assertEqual([row["ticker"] for row in r.json()], ["AAPL", "MSFT"])
+        self.assertEqual(r.json()[0]["price"], 110.0)
+        self.assertEqual(r.json()[0]["change_pct"], 10.0)
+        self.assertEqual(self.client.get("/api/tickers/?symbols=").json(), [])
+
+    def test_batch_queues_new_and_stale_fundamentals(self):
+        TickerInfo.objects.create(ticker="FRESH", market_cap=10 ** 9)
+        TickerInfo.objects.create(ticker="OLD", market_cap=10 ** 9)
+        TickerInfo.objects.filter(ticker="OLD").update(updated_at=now() - timedelta(days=2))
+        self.client.get("/api/tickers/?symbols=FRESH,OLD,NEW")
+        queued = set(TickerInfo.objects.filter(refresh_requested_at__isnull=False).values_list("ticker", flat=True))
+        self.assertEqual(queued, {"OLD", "NEW"})
+
+    def test_batch_serves_cached_quotes_and_fundamentals(self):
+        self.client.get("/api/tickers/?symbols=AAPL,MSFT")
+        self.client.get("/api/tickers/?symbols=AAPL,MSFT,NVDA")
+        self.assertEqual([c.args[0] for c in self.fetch.call_args_list], [["AAPL", "MSFT"], ["NVDA"]])
+
+    def test_detail_shares_the_batch_caches(self):
+        self.client.get("/api/tickers/?symbols=AAPL")
+        with mock.patch("market.views.get_latest_price") as latest:
+            r = self.client.get("/api/tickers/AAPL/")
+        latest.assert_not_called()
+        self.assertEqual(r.json()["price"], 110.0)
+
+    def test_detail_fetches_a_miss_and_queues_the_refresh(self):
+        with mock.patch("market.views.get_latest_price", return_value=50.0), \
+                mock.patch("market.views.TickerDetailView.get_prev_close", return_value=40.0):
+            r = self.client.get("/api/tickers/ibm/")
+        self.assertEqual(r.json(), {"ticker": "IBM", "market_cap": None, "pe": None, "eps": None,
+                                    "price": 50.0, "change_abs": 10.0, "change_pct": 25.0})
+        self.assertIsNotNone(TickerInfo.objects.get(ticker="IBM").refresh_requested_at)
+
+
+class RendererParityTests(SimpleTestCase):
+    payloads = [
+        {"id": 1, "name": "Ünïcode ✓", "cash": Decimal("1234.56"), "ok": True, "none": None},
+        [{"date": date(2026, 10, 19), "value": 1.5}, {"date": date(2026, 10, 20), "value": -0.25}],
+        {
+            "utc": datetime(2026, 10, 19, 13, 30, 1, 123456, tzinfo=dt_timezone.utc),
+            "offset": datetime(2026, 10, 19, 9, 30, tzinfo=dt_timezone(timedelta(hours=-4))),
+            "naive": datetime(2026, 10, 19, 9, 30, 0, 5),
+            "time": datetime(2026, 10, 19, 9, 30).time(),
+            "span": timedelta(minutes=90),
+        },
+        {"uuid": uuid.UUID(int=42), "ip": ipaddress.ip_address("10.0.0.1"), "lazy": gettext_lazy("Portfolio")},
+        {"t": np.arange(3, dtype=np.int64), "v": np.array([1.5, 2.25]), "n": np.float64(0.1), "k": np.int32(7)},
+        {1: "int key", "big": 2 ** 70, "tiny": 1e-7, "huge": 1e16},
+        {"text": "line\u2028sep\u2029end"},
+    ]
+
+    def test_values_match_drf(self):
+        for data in self.payloads:
+            ours, drf = ORJSONRenderer().render(data), JSONRenderer().render(data)
+            self.assertEqual(json.loads(ours), json.loads(drf), data)
+
+    def test_line_separators_escaped_like_drf(self):
+        data = {"text": "a\u2028b\u2029c"}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_non_finite_floats_become_null(self):
+        data = {"nan": float("nan"), "inf": float("inf"), "arr": np.array([np.nan, 1.0])}
+        self.assertEqual(json.loads(ORJSONRenderer().render(data)), {"nan": None, "inf": None, "arr": [None, 1.0]})
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({"nan": float("nan")})
+
+
+class CompressionTests(SimpleTestCase):
+    body = json.dumps([{"ticker": f"T{i}", "value": i} for i in range(200)]).encode()
+
+    def _response(self, **headers):
+        request = RequestFactory().get("/api/portfolios/", **headers)
+        middleware = CompressionMiddleware(lambda r: HttpResponse(self.body, content_type="application/json"))
+        return middleware(request)
+
+    def test_brotli_when_accepted(self):
+        if brotli is None:
+            self.skipTest("brotli not installed")
+        r = self._response(HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(r["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(r.content), self.body)
+
+    def test_gzip_otherwise(self):
+        r = self._response(HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(r["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(r.content), self.body)
+
+    def test_small_bodies_are_left_alone(self):
+        self.body = b"[]"
+        self.assertFalse(self._response(HTTP_ACCEPT_ENCODING="gzip, br").has_header("Content-Encoding"))
+
+    def test_session_cookie_requests_are_not_compressed(self):
+        r = self._response(HTTP_ACCEPT_ENCODING="gzip, br", HTTP_COOKIE="sessionid=abc")
+        self.assertFalse(r.has_header("Content-Encoding"))
+        self.assertEqual(r.content, self.body)
+
+
+class SymbolSearchTests(TestCase):
+    ROWS = [
+        ("A", "Agilent Technologies", "NYSE"),
+        ("AAP", "Advance Auto Parts", "NYSE"),
+        ("AAPL", "Apple Inc.", "NASDAQ"),
+        ("APLE", "Apple Hospitality REIT", "NYSE"),
+        ("MSFT", "Microsoft Corp", "NASDAQ"),
+    ]
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(symbols, "_index", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _tickers(self, index, q, limit=10):
+        return [row["ticker"] for row in index.search(q, limit)]
+
+    def test_ranking(self):
+        index = symbols.SymbolIndex(self.ROWS)
+        self.assertEqual(self._tickers(index, "aap"), ["AAP", "AAPL"])
+        self.assertEqual(self._tickers(index, "apple"), ["AAPL", "APLE"])
+        self.assertEqual(self._tickers(index, "apple hosp"), ["APLE"])
+        self.assertEqual(self._tickers(index, "a", limit=2), ["A", "AAP"])
+        self.assertEqual(self._tickers(index, "  "), [])
+
+    def test_index_follows_the_generation(self):
+        Symbol.objects.create(symbol="AAPL", name="Apple Inc.", exchange="NASDAQ")
+        first = symbols.get_symbol_index()
+        self.assertIs(symbols.get_symbol_index(), first)
+        Symbol.objects.create(symbol="MSFT", name="Microsoft Corp", exchange="NASDAQ")
+        self.assertEqual(len(symbols.get_symbol_index()), 1)
+        symbols.bump_generation()
+        self.assertEqual(len(symbols.get_symbol_index()), 2)
+
+    def test_view_searches_the_master(self):
+        Symbol.objects.bulk_create(Symbol(symbol=s, name=n, exchange=e) for s, n, e in self.ROWS)
+        r = self.client.get("/api/tickers/search/?q=micro&limit=5")
+        self.assertEqual(r.json(), [{"ticker": "MSFT", "name": "Microsoft Corp", "exchange": "NASDAQ"}])
+
+    def test_view_without_a_master_echoes_valid_symbols(self):
+        self.assertEqual(self.client.get("/api/tickers/search/?q=brk.b").json(),
+                         [{"ticker": "BRK.B", "exchange": "", "name": ""}])
+        self.assertEqual(self.client.get("/api/tickers/search/?q=not a symbol").json(), [])
+        self.assertEqual(self.client.get("/api/tickers/search/").json(), [])
+
+
+class FundamentalsQueueTests(TestCase):
+    def _info(self, ticker, age=timedelta(0), market_cap=10 ** 9, **queue):
+        TickerInfo.objects.create(ticker=ticker, market_cap=market_cap)
+        TickerInfo.objects.filter(ticker=ticker).update(updated_at=now() - age, **queue)
+        return TickerInfo.objects.get(ticker=ticker)
+
+    def test_is_stale(self):
+        self.assertFalse(fundamentals.is_stale(self._info("FRESH")))
+        self.assertTrue(fundamentals.is_stale(self._info("OLD", age=timedelta(days=2))))
+        self.assertFalse(fundamentals.is_stale(self._info("ETF", age=timedelta(minutes=30), market_cap=None)))
+        self.assertTrue(fundamentals.is_stale(self._info("ETF2", age=timedelta(hours=2), market_cap=None)))
+        self.assertTrue(fundamentals.is_stale(self._info("NEW"), created=True))
+
+    def test_request_refresh_keeps_the_first_request(self):
+        self._info("AAPL")
+        self.assertTrue(fundamentals.request_refresh("AAPL", "UNKNOWN"))
+        first = TickerInfo.objects.get(ticker="AAPL").refresh_requested_at
+        self.assertFalse(fundamentals.request_refresh("AAPL"))
+        self.assertEqual(TickerInfo.objects.get(ticker="AAPL").refresh_requested_at, first)
+
+    def test_due_tickers_requested_first_then_oldest_stale(self):
+        t = now()
+        self._info("FRESH")
+        self._info("OLDER", age=timedelta(days=5))
+        self._info("OLD", age=timedelta(days=2))
+        self._info("ASKED", refresh_requested_at=t)
+        self._info("LEASED", age=timedelta(days=9), refresh_started_at=t)
+        self._info("LAPSED", age=timedelta(days=1, hours=1), refresh_started_at=t - timedelta(hours=1))
+        self.assertEqual(fundamentals.due_tickers(10), ["ASKED", "OLDER", "OLD", "LAPSED"])
+        self.assertEqual(fundamentals.due_tickers(2), ["ASKED", "OLDER"])
+
+    def test_refresh_writes_and_clears_the_queue(self):
+        self._info("AAPL", age=timedelta(days=2), market_cap=None, refresh_requested_at=now())
+        with mock.patch("market.fundamentals.fetch_fundamentals",
+                        return_value={"market_cap": 3 * 10 ** 12, "pe": 30.0, "eps": 6.0}):
+            self.assertTrue(fundamentals.refresh_ticker("AAPL"))
+        info = TickerInfo.objects.get(ticker="AAPL")
+        self.assertEqual((info.market_cap, info.pe, info.eps), (3 * 10 ** 12, 30.0, 6.0))
+        self.assertIsNone(info.refresh_requested_at)
+        self.assertFalse(fundamentals.is_stale(info))
+
+    def test_failed_or_leased_refresh(self):
+        self._info("AAPL", refresh_requested_at=now())
+        with mock.patch("market.fundamentals.fetch_fundamentals", side_effect=OSError) as fetch:
+            self.assertFalse(fundamentals.refresh_ticker("AAPL"))
+            info = TickerInfo.objects.get(ticker="AAPL")
+            self.assertIsNone(info.refresh_started_at)
+            self.assertIsNone(info.refresh_requested_at)
+            TickerInfo.objects.filter(ticker="AAPL").update(refresh_started_at=now())
+            self.assertFalse(fundamentals.refresh_ticker("AAPL"))
+        self.assertEqual(fetch.call_count, 1)
+
+
+class SeriesRendererTests(SimpleTestCase):
+    def setUp(self):
+        self.series = Series(np.array([86400, 172800, 345600], dtype=np.int64), np.array([1.5, 2.25, 1e6 / 3]))
+
+    def _context(self, query=""):
+        return {"request": Request(RequestFactory().get(f"/{query}"))}
+
+    def test_columnar(self):
+        body = json.loads(ColumnarSeriesRenderer().render(self.series, renderer_context=self._context()))
+        self.assertEqual(body, {"t": [86400, 172800, 345600], "v": self.series.values.tolist(),
+                                "resolution": "1d", "stale": []})
+
+    def test_columnar_delta(self):
+        stale = self.series._replace(daily=False, stale=("MSFT",))
+        body = json.loads(ColumnarSeriesRenderer().render(stale, renderer_context=self._context("?delta=1")))
+        self.assertEqual((body["t0"], body["dt"], body["encoding"]), (86400, [0, 86400, 172800], "delta"))
+        self.assertEqual(np.cumsum(body["dt"]).tolist(), [0, 86400, 259200])
+        self.assertEqual((body["resolution"], body["stale"]), ("intraday", ["MSFT"]))
+
+    def test_float32_round_trip(self):
+        raw = Float32SeriesRenderer().render(self.series)
+        n, = struct.unpack_from("<I", raw)
+        self.assertEqual(len(raw), 4 + 8 * n)
+        self.assertEqual(np.frombuffer(raw, "<u4", n, 4).tolist(), [86400, 172800, 345600])
+        self.assertEqual(np.frombuffer(raw, "<f4", n, 4 + 4 * n).tolist(),
+                         self.series.values.astype(np.float32).tolist())
+
+    def test_float32_renders_errors_as_json(self):
+        raw = Float32SeriesRenderer().render({"error": {"code": "bad_range", "message": "x"}})
+        self.assertEqual(json.loads(raw)["error"]["code"], "bad_range")
+
+    def test_points(self):
+        self.assertEqual(self.series.to_points()[0], {"date": "1970-01-02", "value": 1.5})
+        self.assertEqual(self.series._replace(daily=False).to_points()[0]["date"], "1970-01-02T00:00:00+00:00")
+
+
+class CalendarTests(SimpleTestCase):
+    @staticmethod
+    def _utc(*args):
+        return datetime(*args, tzinfo=dt_timezone.utc)
+
+    def test_holidays_2026(self):
+        self.assertEqual(sorted(calendar.holidays(2026)), [
+            date(2026, 1, 1), date(2026, 1, 19), date(2026, 2, 16), date(2026, 4, 3), date(2026, 5, 25),
+            date(2026, 6, 19), date(2026, 7, 3), date(2026, 9, 7), date(2026, 11, 26), date(2026, 12, 25),
+        ])
+        # July 4 on a Saturday: the 3rd is the holiday, so no half day that year
+        self.assertEqual(sorted(calendar.early_closes(2026)), [date(2026, 11, 27), date(2026, 12, 24)])
+        self.assertEqual(calendar._easter(2025), date(2025, 4, 20))
+
+    def test_saturday_new_year_is_not_observed(self):
+        self.assertNotIn(date(2021, 12, 31), calendar.holidays(2021))
+        self.assertNotIn(date(2021, 12, 31), calendar.holidays(2022))
+        self.assertTrue(calendar.is_trading_day(date(2021, 12, 31)))
+
+    def test_sessions(self):
+        day = (2026, 10, 19)  # a Monday, EDT
+        self.assertEqual(calendar.session_at(self._utc(*day, 12, 0)), calendar.PRE)
+        self.assertEqual(calendar.session_at(self._utc(*day, 14, 0)), calendar.REGULAR)
+        self.assertEqual(calendar.session_at(self._utc(*day, 21, 0)), calendar.POST)
+        self.assertEqual(calendar.session_at(self._utc(2026, 10, 20, 1, 0)), calendar.CLOSED)
+        self.assertEqual(calendar.session_at(self._utc(2026, 11, 26, 15, 0)), calendar.CLOSED)  # Thanksgiving
+        self.assertEqual(calendar.session_at(self._utc(2026, 10, 18, 3, 0), "BTC-USD"), calendar.REGULAR)
+
+    def test_half_day_closes_early(self):
+        self.assertEqual(calendar.session_at(self._utc(2026, 11, 27, 17, 30)), calendar.REGULAR)
+        self.assertEqual(calendar.session_at(self._utc(2026, 11, 27, 18, 30)), calendar.POST)
+        self.assertEqual(calendar.session_at(self._utc(2026, 11, 27, 22, 30)), calendar.CLOSED)
+
+    @override_settings(QUOTE_TTL_REGULAR=15, QUOTE_TTL_EXTENDED=60)
+    def test_quote_ttl(self):
+        self.assertEqual(calendar.quote_ttl("AAPL", self._utc(2026, 10, 19, 14, 0)), 15)
+        self.assertEqual(calendar.quote_ttl("AAPL", self._utc(2026, 10, 19, 21, 0)), 60)
+        # Friday just after the post-market bell: late bars may still land
+        self.assertEqual(calendar.quote_ttl("AAPL", self._utc(2026, 10, 24, 0, 5)), 60)
+        # then frozen until Monday's pre-market
+        self.assertEqual(calendar.quote_ttl("AAPL", self._utc(2026, 10, 24, 1, 0)), 55 * 3600)
+        self.assertEqual(calendar.next_session_start(self._utc(2026, 11, 26, 15, 0)),
+                         calendar.EASTERN.localize(datetime(2026, 11, 27, 4, 0)))
+        self.assertEqual(calendar.quote_ttl("BTC-USD", self._utc(2026, 10, 24, 1, 0)), 15)
+
+
+@override_settings(PRICE_DAILY_RETENTION_DAYS=60, PRICE_WEEKLY_RETENTION_DAYS=120, CHART_MIN_POINTS=120)
+class RollupTests(TestCase):
+    def setUp(self):
+        self.today = date.today()
+        self.days = [self.today - timedelta(days=back) for back in range(200, 0, -1)]
+        self.days = [d for d in self.days if d.weekday() < 5]
+        self.dividend_day = self.days[10]
+        PriceSnapshot.objects.bulk_create(
+            PriceSnapshot(ticker="X", date=d, close=Decimal(i + 1),
+                          dividend=Decimal("0.5") if d == self.dividend_day else Decimal("0"))
+            for i, d in enumerate(self.days)
+        )
+
+    def test_rollups_keep_each_period_last_close(self):
+        rollups.update_rollups(["X"], self.days[0])
+        for res in (rollups.WEEK, rollups.MONTH):
+            last = {}
+            for i, d in enumerate(self.days):
+                last[rollups.period_start(d, res)] = (d, i + 1)
+            stored = {r.period_start: (r.as_of, int(r.close))
+                      for r in PriceRollup.objects.filter(ticker="X", resolution=res)}
+            self.assertEqual(stored, last)
+
+    def test_compaction_keeps_actions_and_fills_reads_from_rollups(self):
+        out = StringIO()
+        call_command("compact_prices", "--rebuild", stdout=out)
+        self.assertIn("deleted", out.getvalue())
+        cut = rollups.daily_cutoff()
+        old = set(PriceSnapshot.objects.filter(date__lt=cut).values_list("date", flat=True))
+        self.assertEqual(old, {self.dividend_day})
+        self.assertFalse(PriceRollup.objects.filter(resolution=rollups.WEEK,
+                                                    period_start__lt=rollups.weekly_cutoff()).exists())
+        self.assertTrue(PriceRollup.objects.filter(resolution=rollups.MONTH, period_start__lte=self.days[0]).exists())
+
+        closes = rollups.stored_closes(["X"])
+        dates = [r[0] for r in closes]
+        self.assertEqual(dates, sorted(set(dates)))
+        self.assertEqual([d for d in dates if d >= cut], [d for d in self.days if d >= cut])
+        self.assertIn(self.dividend_day, dates)
+        # every compacted close is a real close from that date
+        close_on = {d: i + 1 for i, d in enumerate(self.days)}
+        self.assertTrue(all(int(c) == close_on[d] for d, _, c, _, _ in closes))
+
+    def test_choose_resolution(self):
+        end = self.today
+        self.assertEqual(rollups.choose_resolution(end - timedelta(days=40), end), rollups.DAY)
+        # too few weekly points, but the days before the cutoff are gone
+        self.assertEqual(rollups.choose_resolution(end - timedelta(days=100), end), rollups.WEEK)
+        self.assertEqual(rollups.choose_resolution(end - timedelta(days=365), end), rollups.MONTH)
+        self.assertEqual(rollups.choose_resolution(end - timedelta(days=3653), end), rollups.MONTH)
+        with override_settings(PRICE_DAILY_RETENTION_DAYS=None):
+            self.assertEqual(rollups.choose_resolution(end - timedelta(days=365), end), rollups.DAY)
@@ -0,0 +1,165 @@
+# market/upstream.py
+"""
+Shared rate limiter for market-data (Yahoo) calls.
+
+A token bucket (UPSTREAM_CALLS_PER_MINUTE refill, UPSTREAM_BURST capacity)
+kept in the Django cache under UPSTREAM_CACHE (default "default"), so every
+worker pointed at a shared cache (Redis/Memcached) draws from the same
+bucket. With the local-memory cache the limit is per process.
+
+Callers declare who they are with `priority(...)`. Each class may only draw
+the bucket down to its reserve, so the rest stays available to the classes
+above it:
+
+    trade      100%   execute_trade → get_trade_price
+    detail      90%   ticker detail / batch views
+    display     70%   portfolio valuation, charts (the default)
+    background  50%   fundamentals refresher
+
+A request that fans out (yf.download of several tickers makes one HTTP call
+per ticker) takes one token per ticker: acquire(n=len(tickers)). A call
+that finds no tokens for its class waits for the refill, up to its class
+deadline, then raises UpstreamThrottled (an Exception, so existing
+`except Exception` fallbacks – cached closes, PriceSnapshot – take over).
+"""
+from __future__ import annotations
+
+import contextvars
+import random
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+TRADE, DETAIL, DISPLAY, BACKGROUND = "trade", "detail", "display", "background"
+PRIORITIES = (TRADE, DETAIL, DISPLAY, BACKGROUND)
+
+SHARE = {TRADE: 1.0, DETAIL: 0.9, DISPLAY: 0.7, BACKGROUND: 0.5}  # of the bucket a class may use
+DEADLINE = {TRADE: 5.0, DETAIL: 2.0, DISPLAY: 1.0, BACKGROUND: 30.0}  # seconds a call may queue
+METRICS = ("calls", "waited", "waited_ms", "throttled")
+
+BUCKET_KEY = "upstream:bucket"
+LOCK_KEY = "upstream:lock"
+
+_current: contextvars.ContextVar[str] = contextvars.ContextVar("upstream_priority", default=DISPLAY)
+
+
+class UpstreamThrottled(Exception):
+    """No upstream token became free before the caller's deadline."""
+
+
+def _cache():
+    return caches[getattr(settings, "UPSTREAM_CACHE", "default")]
+
+
+def _rate() -> float:
+    """Tokens per second."""
+    return max(getattr(settings, "UPSTREAM_CALLS_PER_MINUTE", 60), 1) / 60.0
+
+
+def _capacity() -> float:
+    return float(max(getattr(settings, "UPSTREAM_BURST", 10), 1))
+
+
+@contextmanager
+def _locked(c):
+    """
+    Short cross-worker mutex on cache.add. If it can't be had within ~0.5 s
+    (a crashed holder; the key expires after 2 s) the caller proceeds
+    unlocked rather than wedging every worker.
+    """
+    held = False
+    for _ in range(100):
+        if c.add(LOCK_KEY, 1, 2):
+            held = True
+            break
+        time.sleep(0.005)
+    try:
+        yield
+    finally:
+        if held:
+            c.delete(LOCK_KEY)
+
+
+def _take(cls: str, now: float, n: float = 1.0) -> float:
+    """Take *n* tokens for *cls*: 0.0 on success, else seconds until they may be free."""
+    c = _cache()
+    cap, rate = _capacity(), _rate()
+    reserve = cap * (1.0 - SHARE[cls])
+    with _locked(c):
+        tokens, last = c.get(BUCKET_KEY) or (cap, now)
+        tokens = min(cap, tokens + max(0.0, now - last) * rate)
+        if tokens - n >= reserve - 1e-9:
+            c.set(BUCKET_KEY, (tokens - n, now), None)
+            return 0.0
+        c.set(BUCKET_KEY, (tokens, now), None)
+    return (reserve + n - tokens) / rate
+
+
+def _count(cls: str, name: str, n: int = 1) -> None:
+    c = _cache()
+    key = f"upstream:m:{cls}:{name}"
+    c.add(key, 0, None)
+    try:
+        c.incr(key, n)
+    except ValueError:  # evicted between add and incr
+        c.set(key, n, None)
+
+
+# ───────────────────────────── public API ─────────────────────────────
+@contextmanager
+def priority(cls: str):
+    """Run the block's upstream calls under priority class *cls*."""
+    token = _current.set(cls)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def acquire(cls: Optional[str] = None, deadline: Optional[float] = None, n: int = 1) -> float:
+    """
+    Take *n* tokens for *cls* (default: the current priority), waiting up to
+    *deadline* seconds (default: the class deadline). Returns seconds waited.
+    Call it right before each Yahoo request, with n = the HTTP calls it makes.
+    More than the class may ever hold is capped at its whole share.
+    """
+    cls = cls or _current.get()
+    need = min(float(max(n, 1)), _capacity() * SHARE[cls])
+    start = time.monotonic()
+    give_up = start + (DEADLINE[cls] if deadline is None else deadline)
+    while True:
+        wait = _take(cls, time.time(), need)
+        if wait == 0.0:
+            waited = time.monotonic() - start
+            _count(cls, "calls", max(n, 1))
+            if waited >= 0.001:
+                _count(cls, "waited")
+                _count(cls, "waited_ms", int(waited * 1000))
+            return waited
+        remaining = give_up - time.monotonic()
+        if remaining <= 0:
+            _count(cls, "throttled")
+            raise UpstreamThrottled(f"upstream budget exhausted for {cls!r}")
+        # sleep until the refill (jittered so waiters don't stampede)
+        time.sleep(min(remaining, wait * random.uniform(1.0, 1.2)))
+
+
+def available(n: int = 1, cls: Optional[str] = None) -> bool:
+    """Whether acquire(cls, n=*n*) would succeed right now without waiting. Takes nothing."""
+    cls = cls or _current.get()
+    cap, now = _capacity(), time.time()
+    need = min(float(max(n, 1)), cap * SHARE[cls])
+    tokens, last = _cache().get(BUCKET_KEY) or (cap, now)
+    tokens = min(cap, tokens + max(0.0, now - last) * _rate())
+    return tokens - need >= cap * (1.0 - SHARE[cls]) - 1e-9
+
+
+def metrics() -> Dict[str, Dict[str, int]]:
+    """Counters per priority class since the cache was last cleared."""
+    c = _cache()
+    keys = {(cls, m): f"upstream:m:{cls}:{m}" for cls in PRIORITIES for m in METRICS}
+    found = c.get_many(list(keys.values()))
+    return {cls: {m: int(found.get(keys[(cls, m)], 0)) for m in METRICS} for cls in PRIORITIES}
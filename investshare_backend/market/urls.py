@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import TickerSearchView, TickerDetailView
+from .views import TickerBatchView, TickerSearchView, TickerDetailView
 
 urlpatterns = [
+    path("tickers/", TickerBatchView.as_view()),
     path("tickers/search/", TickerSearchView.as_view()),
     path("tickers/<str:symbol>/", TickerDetailView.as_view()),
 ]
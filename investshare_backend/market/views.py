@@ -1,23 +1,36 @@
 # market/views.py
 from __future__ import annotations
 
+import asyncio
 import re
 from datetime import date, timedelta
-from typing import Optional
+from typing import Awaitable, Callable, Dict, List, Optional
 
-import pandas as pd
-import yfinance as yf
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.core.cache import cache
-from django.utils.timezone import now
-from rest_framework import permissions, views
+from rest_framework import permissions
 from rest_framework.response import Response
 
-from .fundamentals import fetch_fundamentals
+from .calendar import session_ttl
+from .fundamentals import is_stale, request_refresh
 from .models import PriceSnapshot, TickerInfo
-from .prices import get_latest_price
+from .prices import get_batch_quotes, get_latest_price
+from .provider import pd, yf
 from .serializers import TickerInfoSerializer
+from .symbols import get_symbol_index
+from .upstream import DETAIL, acquire, priority
+from investshare.asyncapi import AsyncAPIView, blocking
+from investshare.routers import ReplicaReadMixin
 
 CACHE_5M = 60 * 5
+
+# A ticker's quote fields are cached for session_ttl() – frozen while its market
+# is shut – and its fundamentals separately for CACHE_5M, so a refresh by the
+# fundamentals worker shows within minutes even where its cache.delete can't
+# reach (a per-process cache).
+QUOTE_KEY = "ticker_quote_{}"
+INFO_KEY = "ticker_info_{}"
 SYMBOL_RE = re.compile(r"^[A-Z0-9.\-]{1,20}$")
 
 
@@ -37,37 +50,120 @@ def _finite(x) -> Optional[float]:
         return None
 
 
-class TickerSearchView(views.APIView):
+def _quote(price: float, prev_close: Optional[float]) -> dict:
+    """Price/change fields (JSON-safe, rounded) of a ticker payload."""
+    change_abs = change_pct = None
+    if prev_close is not None and prev_close != 0:
+        change_abs = price - prev_close
+        change_pct = (change_abs / prev_close) * 100.0
+
+    return {
+        "price": round(price, 6),  # JSON-safe finite
+        "change_abs": round(change_abs, 6) if change_abs is not None else None,
+        "change_pct": round(change_pct, 6) if change_pct is not None else None,
+    }
+
+
+def _no_info(symbol: str) -> dict:
+    return {"ticker": symbol, "market_cap": None, "pe": None, "eps": None}
+
+
+class DetailPriorityMixin:
+    """Yahoo calls made while serving the view queue at ticker-detail priority."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self._adispatch(request, *args, **kwargs)
+        with priority(DETAIL):
+            return super().dispatch(request, *args, **kwargs)
+
+    async def _adispatch(self, request, *args, **kwargs):
+        with priority(DETAIL):
+            return await super().dispatch(request, *args, **kwargs)
+
+
+class TickerSearchView(AsyncAPIView):
+    """
+    Prefix/fuzzy search over the local symbol master (see load_symbols).
+    Never calls Yahoo – safe to hit on every keystroke.
+    """
     permission_classes = [permissions.AllowAny]
 
-    def get(self, request):
-        q = (request.query_params.get("q") or "").upper().strip()
-        if not q or not SYMBOL_RE.match(q):
+    async def get(self, request):
+        q = (request.query_params.get("q") or "").strip()[:50]
+        if not q:
             return Response([])
 
-        key = f"ticker_search_{q}"
-        cached = cache.get(key)
-        if cached:
-            return Response(cached)
-
-        data = []
         try:
-            t = yf.Ticker(q)
-            fi = getattr(t, "fast_info", {}) or {}
-            # fast_info typically won’t include company name; keep exchange if present.
-            data = [{
-                "ticker": q,
-                "exchange": fi.get("exchange", "") or fi.get("market", ""),
-                "name": "",  # avoid expensive .info lookup
-            }]
-        except Exception:
-            data = []
+            limit = max(1, min(int(request.query_params.get("limit", 10)), 50))
+        except ValueError:
+            limit = 10
 
-        cache.set(key, data, CACHE_5M)
-        return Response(data)
+        index = await sync_to_async(get_symbol_index)()  # (re)built from the Symbol table
+        if len(index):
+            return Response(index.search(q, limit))
 
+        # no symbol master loaded yet: echo a well-formed symbol, no network
+        sym = q.upper()
+        if not SYMBOL_RE.match(sym):
+            return Response([])
+        return Response([{"ticker": sym, "exchange": "", "name": ""}])
 
-class TickerDetailView(views.APIView):
+
+def _fundamentals(symbols: List[str]) -> Dict[str, dict]:
+    """
+    Stored fundamentals for *symbols* in one query. Unknown tickers get a row
+    and, like stale ones, are queued for the background refresher
+    (request_refresh); never calls Yahoo.
+    """
+    try:
+        rows = {i.ticker: i for i in TickerInfo.objects.filter(ticker__in=symbols)}
+        new = [TickerInfo(ticker=s) for s in symbols if s not in rows]
+        if new:
+            TickerInfo.objects.bulk_create(new, ignore_conflicts=True)
+        stale = [s for s in symbols if s not in rows or is_stale(rows[s])]
+        if stale:
+            request_refresh(*stale)
+        return {s: TickerInfoSerializer(rows[s]).data if s in rows else _no_info(s) for s in symbols}
+    except Exception:
+        # If fundamentals explode, still return price/change.
+        return {s: _no_info(s) for s in symbols}
+
+
+async def _ticker_details(
+    symbols: List[str],
+    fetch_quotes: Callable[[List[str]], Awaitable[Dict[str, dict]]],
+) -> List[dict]:
+    """
+    Fundamentals + quote per symbol through the QUOTE_KEY/INFO_KEY caches, for
+    the detail and batch views alike. Quote misses go to fetch_quotes(misses),
+    concurrently with the fundamentals of the info misses.
+    """
+    quote_keys = {s: QUOTE_KEY.format(s) for s in symbols}
+    info_keys = {s: INFO_KEY.format(s) for s in symbols}
+    found = await cache.aget_many([*quote_keys.values(), *info_keys.values()])
+    quotes = {s: found[k] for s, k in quote_keys.items() if k in found}
+    infos = {s: found[k] for s, k in info_keys.items() if k in found}
+
+    quote_misses = [s for s in symbols if s not in quotes]
+    info_misses = [s for s in symbols if s not in infos]
+    fetched_quotes, fetched_infos = await asyncio.gather(
+        fetch_quotes(quote_misses) if quote_misses else asyncio.sleep(0, {}),
+        sync_to_async(_fundamentals)(info_misses) if info_misses else asyncio.sleep(0, {}),
+    )
+    fresh: dict = {}  # ttl → {key: quote}; crypto/FX symbols don't freeze off-hours
+    for s, quote in fetched_quotes.items():
+        fresh.setdefault(session_ttl(CACHE_5M, s), {})[quote_keys[s]] = quote
+    for ttl, batch in fresh.items():
+        await cache.aset_many(batch, ttl)
+    if fetched_infos:
+        await cache.aset_many({info_keys[s]: info for s, info in fetched_infos.items()}, CACHE_5M)
+    quotes.update(fetched_quotes)
+    infos.update(fetched_infos)
+    return [{**infos[s], **quotes[s]} for s in symbols]
+
+
+class TickerDetailView(ReplicaReadMixin, DetailPriorityMixin, AsyncAPIView):
     permission_classes = [permissions.AllowAny]
 
     def get_prev_close(self, symbol: str) -> Optional[float]:
@@ -77,6 +173,7 @@ class TickerDetailView(views.APIView):
           2) 5d daily Close → use the previous row if available (handles weekends/holidays)
         """
         try:
+            acquire()
             fi = (yf.Ticker(symbol).fast_info) or {}
             prev = _finite(fi.get("previous_close") or fi.get("regularMarketPreviousClose"))
             if prev:
@@ -85,6 +182,7 @@ class TickerDetailView(views.APIView):
             pass
 
         try:
+            acquire()
             hist = yf.Ticker(symbol).history(period="5d", interval="1d", auto_adjust=False)
             if hist is not None and not hist.empty:
                 closes = hist["Close"].dropna()
@@ -96,45 +194,46 @@ class TickerDetailView(views.APIView):
             pass
         return None
 
-    def get(self, request, symbol: str):
+    async def _fresh_quotes(self, symbols: List[str]) -> Dict[str, dict]:
+        """Price (after-hours aware) and previous close at once."""
+        symbol, = symbols
+        price, prev_close = await asyncio.gather(
+            blocking(get_latest_price, symbol),
+            blocking(self.get_prev_close, symbol),
+        )
+        return {symbol: _quote(_finite(price) or 0.0, prev_close)}
+
+    async def get(self, request, symbol: str):
         symbol = (symbol or "").upper().strip()
         if not SYMBOL_RE.match(symbol):
             return Response({"detail": "Invalid symbol."}, status=400)
+        detail, = await _ticker_details([symbol], self._fresh_quotes)
+        return Response(detail)
 
-        cache_key = f"ticker_detail_{symbol}"
-        cached = cache.get(cache_key)
-        if cached:
-            return Response(cached)
-
-        # --- Price (always after-hours aware) ---
-        price = _finite(get_latest_price(symbol)) or 0.0
-
-        # --- Previous close (robust) ---
-        prev_close = self.get_prev_close(symbol)
 
-        change_abs = change_pct = None
-        if prev_close is not None and prev_close != 0:
-            change_abs = price - prev_close
-            change_pct = (change_abs / prev_close) * 100.0
-
-        # --- Fundamentals (refresh ≤ 24h) ---
-        try:
-            info, _ = TickerInfo.objects.get_or_create(ticker=symbol)
-            if (not info.market_cap) or (now() - info.updated_at) > timedelta(hours=24):
-                f = fetch_fundamentals(symbol)
-                # Guard expected keys
-                info.market_cap = f.get("market_cap")
-                info.pe = f.get("pe")
-                info.eps = f.get("eps")
-                info.save()
-            payload = TickerInfoSerializer(info).data
-        except Exception:
-            # If fundamentals explode, still return price/change.
-            payload = {"ticker": symbol, "market_cap": None, "pe": None, "eps": None}
-
-        payload["price"] = round(price, 6)  # JSON-safe finite
-        payload["change_abs"] = round(change_abs, 6) if change_abs is not None else None
-        payload["change_pct"] = round(change_pct, 6) if change_pct is not None else None
+class TickerBatchView(ReplicaReadMixin, DetailPriorityMixin, AsyncAPIView):
+    """
+    GET /api/tickers/?symbols=AAPL,MSFT,... – ticker details for a watchlist or
+    holdings table in one round trip: one cache get_many, one batched quote call
+    for the misses, one TickerInfo query (same caches and refresh queue as
+    TickerDetailView).
+    """
+    permission_classes = [permissions.AllowAny]
 
-        cache.set(cache_key, payload, CACHE_5M)
-        return Response(payload)
+    async def _batch_quotes(self, symbols: List[str]) -> Dict[str, dict]:
+        fetched = await blocking(get_batch_quotes, symbols)
+        quotes = {}
+        for s in symbols:
+            price, prev_close = fetched.get(s, (None, None))
+            quotes[s] = _quote(_finite(price) or 0.0, _finite(prev_close))
+        return quotes
+
+    async def get(self, request):
+        raw = (request.query_params.get("symbols") or "").upper().split(",")
+        symbols = [s for s in dict.fromkeys(x.strip() for x in raw) if s and SYMBOL_RE.match(s)]
+        cap = getattr(settings, "TICKER_BATCH_MAX", 50)
+        if len(symbols) > cap:
+            return Response({"error": {"code": "too_many_symbols", "message": f"At most {cap} symbols per request."}}, status=400)
+        if not symbols:
+            return Response([])
+        return Response(await _ticker_details(symbols, self._batch_quotes))
@@ -0,0 +1,290 @@
+# portfolios/analytics.py
+from __future__ import annotations
+
+import hashlib
+import warnings
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+
+from .models import Portfolio
+from .performance import _range_start
+from market.models import PriceSnapshot
+from market.prices import get_daily_closes, get_portfolio_series
+from market.rollups import stored_closes
+
+TRADING_DAYS = 252
+ANALYTICS_RANGES = ("1w", "ytd", "1y", "all")
+ANALYTICS_CACHE_TTL = 60 * 60 * 6  # keys already change with version / price date
+
+
+def _benchmark_default() -> str:
+    return getattr(settings, "ANALYTICS_BENCHMARK", "SPY")
+
+
+def _risk_free_daily() -> float:
+    return float(getattr(settings, "ANALYTICS_RISK_FREE_RATE", 0.0)) / TRADING_DAYS
+
+
+# ───────────────────────────── vectorized core ─────────────────────────────
+def _returns(levels: np.ndarray) -> np.ndarray:
+    """Simple returns along axis 0 of a (T × k) level matrix; non-positive levels → NaN."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lv = np.where(levels > 0, levels, np.nan)
+        return lv[1:] / lv[:-1] - 1.0
+
+
+def _stats(levels: np.ndarray, rf_daily: float) -> Dict[str, np.ndarray]:
+    """
+    Column-wise risk statistics for a (T × k) matrix of aligned daily levels.
+    Everything is whole-matrix NumPy; NaN results mean "not enough data".
+    """
+    r = _returns(levels)
+    n = np.sum(~np.isnan(r), axis=0)
+    # all-NaN columns (e.g. no benchmark data) are expected; they come back as None
+    with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mean = np.nanmean(r, axis=0)
+        std = np.nanstd(r, axis=0, ddof=1)
+        excess = mean - rf_daily
+        downside = np.sqrt(np.nanmean(np.minimum(r - rf_daily, 0.0) ** 2, axis=0))
+
+        peak = np.fmax.accumulate(levels, axis=0)
+        drawdown = np.nanmin(levels / peak - 1.0, axis=0)
+
+        ann = np.sqrt(TRADING_DAYS)
+        return {
+            "n": n,
+            "total_return": levels[-1] / levels[0] - 1.0,
+            "volatility": std * ann,
+            "sharpe": np.where(std > 0, excess / std * ann, np.nan),
+            "sortino": np.where(downside > 0, excess / downside * ann, np.nan),
+            "max_drawdown": drawdown,
+            "returns": r,
+        }
+
+
+def _beta(r: np.ndarray) -> Optional[float]:
+    """Beta of column 0 against column 1 on rows where both returns exist."""
+    both = r[~np.isnan(r).any(axis=1)]
+    if len(both) < 2:
+        return None
+    cov = np.cov(both, rowvar=False, ddof=1)
+    return float(cov[0, 1] / cov[1, 1]) if cov[1, 1] > 0 else None
+
+
+def _f(x) -> Optional[float]:
+    x = float(x)
+    return x if np.isfinite(x) else None
+
+
+# ───────────────────────────── public API ─────────────────────────────
+def _cache_key(p: Portfolio, rng: str, benchmark: str) -> str:
+    tickers = list(p.holdings.values_list("ticker", flat=True)) + [benchmark]
+    last = PriceSnapshot.objects.filter(ticker__in=tickers).aggregate(d=Max("date"))["d"]
+    return f"analytics:{p.pk}:v{p.version}:{rng}:{benchmark}:{last or '-'}:{date.today().isoformat()}"
+
+
+def compute_portfolio_analytics(p: Portfolio, rng: str = "1y", benchmark: Optional[str] = None) -> dict:
+    """
+    Annualized volatility, Sharpe/Sortino, max drawdown and beta for the
+    portfolio's daily equity series over *rng*, with the same stats for the
+    benchmark. Cached per (portfolio version, range, benchmark, last price date).
+    """
+    benchmark = (benchmark or _benchmark_default()).upper()
+    key = _cache_key(p, rng, benchmark)
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
+
+    series = get_portfolio_series(p, rng)
+    dates: List[date] = series.ts.astype("datetime64[s]").astype("datetime64[D]").tolist()
+    equity = series.values
+
+    bench = get_daily_closes(benchmark, dates[0], adjusted=True) if dates else {}
+    bench_levels = np.array([bench.get(d, np.nan) for d in dates], dtype=float)
+    # carry the last benchmark close over gaps (holidays, missing rows)
+    if bench_levels.size:
+        idx = np.where(~np.isnan(bench_levels), np.arange(bench_levels.size), 0)
+        np.maximum.accumulate(idx, out=idx)
+        bench_levels = bench_levels[idx]
+
+    levels = np.column_stack([equity, bench_levels]) if dates else np.empty((0, 2))
+    rf = _risk_free_daily()
+
+    if levels.shape[0] < 3:
+        result = {"range": rng, "benchmark": benchmark, "points": int(levels.shape[0]),
+                  "portfolio": None, "benchmark_stats": None, "beta": None}
+    else:
+        st = _stats(levels, rf)
+        cols = [
+            {k: _f(st[k][i]) for k in ("total_return", "volatility", "sharpe", "sortino", "max_drawdown")}
+            for i in range(2)
+        ]
+        result = {
+            "range": rng,
+            "benchmark": benchmark,
+            "points": int(levels.shape[0]),
+            "portfolio": cols[0],
+            "benchmark_stats": cols[1] if st["n"][1] >= 2 else None,
+            "beta": _beta(st["returns"]),
+        }
+
+    cache.set(key, result, ANALYTICS_CACHE_TTL)
+    return result
+
+
+# ───────────────────── holdings covariance / contribution ─────────────────────
+COVARIANCE_CACHE_TTL = 60 * 60 * 24
+
+
+def _price_matrix(tickers: List[str], start: Optional[date]) -> tuple[List[date], np.ndarray, np.ndarray]:
+    """
+    One query → (dates, T × N total-return levels, close × return_factor) with
+    gaps forward-filled per column (leading gaps stay NaN), plus each ticker's
+    newest unadjusted close (NaN if none).
+    """
+    rows = [(d, t, c, rf) for d, t, c, _, rf in stored_closes(tickers, start)]
+    if not rows:
+        return [], np.empty((0, len(tickers))), np.full(len(tickers), np.nan)
+
+    dates = sorted({d for d, _, _, _ in rows})
+    d_idx = {d: i for i, d in enumerate(dates)}
+    t_idx = {t: j for j, t in enumerate(tickers)}
+    m = np.full((len(dates), len(tickers)), np.nan)
+    ii = np.fromiter((d_idx[d] for d, _, _, _ in rows), dtype=np.intp, count=len(rows))
+    jj = np.fromiter((t_idx[t] for _, t, _, _ in rows), dtype=np.intp, count=len(rows))
+    m[ii, jj] = np.fromiter((float(c) * f for _, _, c, f in rows), dtype=float, count=len(rows))
+
+    newest: Dict[str, tuple] = {}
+    for d, t, c, _ in rows:
+        if t not in newest or d > newest[t][0]:
+            newest[t] = (d, float(c))
+    last_close = np.array([newest[t][1] if t in newest else np.nan for t in tickers])
+
+    # column-wise forward fill without Python loops over dates
+    idx = np.where(~np.isnan(m), np.arange(m.shape[0])[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return dates, m[idx, np.arange(m.shape[1])], last_close
+
+
+def _shrunk_covariance(r: np.ndarray) -> tuple[np.ndarray, float]:
+    """
+    Ledoit–Wolf shrinkage of the sample covariance toward a scaled identity.
+    Returns (Σ, shrinkage intensity in [0, 1]); short histories shrink harder.
+    """
+    t, n = r.shape
+    x = r - r.mean(axis=0)
+    s = x.T @ x / t
+    mu = np.trace(s) / n
+    target = mu * np.eye(n)
+    d2 = np.sum((s - target) ** 2)
+    if d2 <= 0:
+        return s, 0.0
+    # Σ_t ‖x_t x_tᵀ − s‖² expanded so no t × n × n tensor is materialized
+    sq = np.sum(x * x, axis=1)
+    b2 = (np.sum(sq ** 2) - 2.0 * np.sum((x @ s) * x) + t * np.sum(s ** 2)) / t ** 2
+    delta = float(min(max(b2 / d2, 0.0), 1.0))
+    return delta * target + (1.0 - delta) * s, delta
+
+
+def _covariance_block(tickers: List[str], rng: str) -> Optional[dict]:
+    """
+    Return-statistics block for a ticker set and range, cached per
+    (ticker set, range, last price date) so it is built once per day no matter
+    how many portfolios or requests share it.
+
+    The covariance uses only days on which every holding has a return (their
+    common history); total_return covers each holding's own history in the
+    range, from its first stored level to its last.
+    """
+    start = _range_start(rng, date.today())
+    last = PriceSnapshot.objects.filter(ticker__in=tickers).aggregate(d=Max("date"))["d"]
+    digest = hashlib.sha1(",".join(tickers).encode()).hexdigest()
+    key = f"covmat2:{digest}:{rng}:{last or '-'}"
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
+
+    dates, levels, last_close = _price_matrix(tickers, start)
+    block = None
+    if levels.shape[0] >= 3:
+        first = levels[np.argmax(~np.isnan(levels), axis=0), np.arange(levels.shape[1])]
+        r = _returns(levels)
+        r = r[~np.isnan(r).any(axis=1)]  # only days where every holding has a return
+        if r.shape[0] >= 2:
+            cov, delta = _shrunk_covariance(r)
+            block = {
+                "tickers": tickers,
+                "start": dates[0].isoformat(),
+                "end": dates[-1].isoformat(),
+                "observations": int(r.shape[0]),
+                "shrinkage": delta,
+                "cov": cov,
+                "total_return": levels[-1] / first - 1.0,
+                "last_close": last_close,  # unadjusted: weights are market values
+            }
+    cache.set(key, block, COVARIANCE_CACHE_TTL)
+    return block
+
+
+def compute_holdings_risk(p: Portfolio, rng: str = "1y") -> dict:
+    """
+    Correlation/covariance of holding returns plus per-holding contribution to
+    return and to risk. The heavy part (price matrix, shrunk covariance) comes
+    from _covariance_block(); only the weight vector is per-portfolio. Weights
+    are current market values (quantity × newest unadjusted close), not
+    total-return levels.
+    """
+    qty = {t: float(q) for t, q in p.holdings.values_list("ticker", "quantity")}
+    tickers = sorted(qty)
+    empty = {"range": rng, "tickers": tickers, "correlation": None, "covariance": None, "holdings": []}
+    if len(tickers) < 1:
+        return empty
+
+    block = _covariance_block(tickers, rng)
+    if block is None:
+        return empty
+
+    cov = block["cov"]
+    values = np.array([qty[t] for t in tickers]) * np.nan_to_num(block["last_close"])
+    gross = np.sum(np.abs(values))
+    w = values / gross if gross else np.zeros_like(values)
+
+    vol = np.sqrt(np.diag(cov))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = cov / np.outer(vol, vol)
+    port_var = float(w @ cov @ w)
+    port_vol = np.sqrt(port_var) if port_var > 0 else 0.0
+    marginal = cov @ w
+    risk_contrib = w * marginal / port_vol if port_vol else np.zeros_like(w)
+    ret_contrib = w * block["total_return"]
+
+    ann = np.sqrt(TRADING_DAYS)
+    return {
+        "range": rng,
+        "start": block["start"],
+        "end": block["end"],
+        "observations": block["observations"],
+        "shrinkage": block["shrinkage"],
+        "tickers": tickers,
+        "correlation": np.round(np.nan_to_num(corr), 6).tolist(),
+        "covariance": np.round(cov * TRADING_DAYS, 8).tolist(),  # annualized
+        "portfolio_volatility": _f(port_vol * ann),
+        "holdings": [
+            {
+                "ticker": t,
+                "weight": _f(w[i]),
+                "volatility": _f(vol[i] * ann),
+                "return": _f(block["total_return"][i]),
+                "contribution_to_return": _f(ret_contrib[i]),
+                "contribution_to_risk": _f(risk_contrib[i] * ann),
+                "risk_share": _f(risk_contrib[i] / port_vol) if port_vol else None,
+            }
+            for i, t in enumerate(tickers)
+        ],
+    }
@@ -0,0 +1,124 @@
+# portfolios/exports.py
+from __future__ import annotations
+
+import csv
+import json
+from itertools import islice
+from typing import AsyncIterator, Iterator
+
+from asgiref.sync import sync_to_async
+from rest_framework.renderers import BaseRenderer
+
+from .models import Portfolio
+
+EXPORT_FIELDS = ["id", "type", "ticker", "quantity", "price", "cash_delta", "executed_at"]
+EXPORT_CHUNK_SIZE = 2000
+
+
+# ───────────────────────────── renderers ───────────────────────────
+# Only used for ?format= / Accept negotiation – the export view streams its
+# own bytes, so these just have to render the occasional error dict.
+class _PassthroughRenderer(BaseRenderer):
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, (str, bytes)):
+            return data
+        return json.dumps(data, default=str)
+
+
+class CSVRenderer(_PassthroughRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class NDJSONRenderer(_PassthroughRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+
+# ───────────────────────────── row source ──────────────────────────
+class _Echo:
+    """File-like object whose write() just hands the line back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def _ledger_rows(portfolio: Portfolio) -> Iterator[tuple]:
+    """
+    Chronological ledger as plain tuples, fetched through a server-side cursor
+    so memory stays flat no matter how many trades the portfolio has.
+    """
+    return (
+        portfolio.trades
+        .order_by("executed_at", "id")
+        .values_list(*EXPORT_FIELDS)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+async def _aledger_rows(portfolio: Portfolio) -> AsyncIterator[tuple]:
+    """
+    _ledger_rows() for ASGI: each chunk is fetched in the sync thread, rows
+    stream from the event loop. (values_list().aiterator() would run the query
+    on the loop itself – ValuesListIterable.__iter__ isn't a generator.)
+    """
+    rows = _ledger_rows(portfolio)  # a generator: no query until the first chunk
+    next_chunk = sync_to_async(lambda: list(islice(rows, EXPORT_CHUNK_SIZE)))
+    while chunk := await next_chunk():
+        for row in chunk:
+            yield row
+
+
+def _csv_line(writer, row: tuple) -> str:
+    tid, ttype, ticker, qty, price, cash_delta, executed_at = row
+    return writer.writerow([
+        tid, ttype, ticker, qty, price, cash_delta,
+        executed_at.isoformat() if executed_at else "",
+    ])
+
+
+def _ndjson_line(row: tuple) -> str:
+    tid, ttype, ticker, qty, price, cash_delta, executed_at = row
+    return json.dumps({
+        "id": tid,
+        "type": ttype,
+        "ticker": ticker,
+        "quantity": str(qty),
+        "price": str(price),
+        "cash_delta": str(cash_delta),
+        "executed_at": executed_at.isoformat() if executed_at else None,
+    }) + "\n"
+
+
+def iter_trades_csv(portfolio: Portfolio) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    # header goes out before the query runs → first byte is immediate
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in _ledger_rows(portfolio):
+        yield _csv_line(writer, row)
+
+
+def iter_trades_ndjson(portfolio: Portfolio) -> Iterator[str]:
+    for row in _ledger_rows(portfolio):
+        yield _ndjson_line(row)
+
+
+async def aiter_trades_csv(portfolio: Portfolio) -> AsyncIterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    async for row in _aledger_rows(portfolio):
+        yield _csv_line(writer, row)
+
+
+async def aiter_trades_ndjson(portfolio: Portfolio) -> AsyncIterator[str]:
+    async for row in _aledger_rows(portfolio):
+        yield _ndjson_line(row)
+
+
+# format → (sync rows, async rows for ASGI, content type)
+EXPORTERS = {
+    "csv": (iter_trades_csv, aiter_trades_csv, "text/csv; charset=utf-8"),
+    "ndjson": (iter_trades_ndjson, aiter_trades_ndjson, "application/x-ndjson; charset=utf-8"),
+}
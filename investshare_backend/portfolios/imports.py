@@ -0,0 +1,133 @@
+# portfolios/imports.py
+from __future__ import annotations
+
+import csv
+import io
+import re
+from datetime import datetime, time, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+from typing import Iterable, List
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Portfolio, Trade
+from .lots import rebuild_lots
+from .outbox import emit
+from .performance import invalidate_performance
+from .services import rebuild_holdings
+from investshare.routers import pin_to_primary
+
+SYMBOL_RE = re.compile(r"^[A-Z0-9.\-]{1,20}$")
+IMPORT_BATCH_SIZE = 1000
+CENT = Decimal("0.01")
+
+# header aliases seen in broker exports → our column names
+_ALIASES = {
+    "date": "date", "executed_at": "date", "trade_date": "date", "datetime": "date",
+    "type": "type", "side": "type", "action": "type",
+    "ticker": "ticker", "symbol": "ticker",
+    "quantity": "quantity", "qty": "quantity", "shares": "quantity",
+    "price": "price", "fill_price": "price",
+    "amount": "amount", "cash": "amount",
+}
+
+
+def _parse_when(raw: str, lineno: int) -> datetime:
+    raw = (raw or "").strip()
+    dt = parse_datetime(raw)
+    if dt is None:
+        d = parse_date(raw)
+        if d is None:
+            raise ValueError(f"line {lineno}: bad date {raw!r}")
+        dt = datetime.combine(d, time(0, 0))
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt, dt_timezone.utc)
+    return dt
+
+
+def _parse_positive(raw: str, field: str, lineno: int) -> Decimal:
+    try:
+        d = Decimal((raw or "").replace(",", "").strip())
+    except InvalidOperation:
+        raise ValueError(f"line {lineno}: invalid {field} {raw!r}")
+    if not d.is_finite() or d <= 0:
+        raise ValueError(f"line {lineno}: {field} must be greater than 0")
+    return d
+
+
+def parse_fills_csv(text: str | Iterable[str]) -> List[Trade]:
+    """
+    Parse a broker CSV of dated fills into unsaved Trade objects.
+
+    Required columns: date, type (BUY/SELL/CASH_IN/CASH_OUT), plus
+    ticker/quantity/price for BUY/SELL or amount for cash rows.
+    Raises ValueError naming the first bad line.
+    """
+    src = io.StringIO(text) if isinstance(text, str) else text
+    reader = csv.DictReader(src)
+    if not reader.fieldnames:
+        raise ValueError("empty file")
+    header = {name: _ALIASES.get((name or "").strip().lower()) for name in reader.fieldnames}
+
+    trades: List[Trade] = []
+    for lineno, raw in enumerate(reader, start=2):
+        row = {header[k]: (v or "") for k, v in raw.items() if header.get(k)}
+        ttype = row.get("type", "").strip().upper()
+        when = _parse_when(row.get("date", ""), lineno)
+
+        if ttype in ("BUY", "SELL"):
+            ticker = row.get("ticker", "").upper().strip()
+            if not SYMBOL_RE.match(ticker):
+                raise ValueError(f"line {lineno}: invalid ticker {ticker!r}")
+            qty = _parse_positive(row.get("quantity"), "quantity", lineno)
+            px = _parse_positive(row.get("price"), "price", lineno)
+            gross = (qty * px).quantize(CENT)
+            trades.append(Trade(
+                type=ttype, ticker=ticker, quantity=qty, price=px,
+                cash_delta=-gross if ttype == "BUY" else gross,
+                executed_at=when,
+            ))
+        elif ttype in ("CASH_IN", "CASH_OUT"):
+            amt = _parse_positive(row.get("amount"), "amount", lineno).quantize(CENT)
+            trades.append(Trade(
+                type=ttype, cash_delta=amt if ttype == "CASH_IN" else -amt, executed_at=when,
+            ))
+        else:
+            raise ValueError(f"line {lineno}: unsupported type {ttype!r}")
+    return trades
+
+
+@transaction.atomic
+def import_trades(portfolio: Portfolio, trades: List[Trade]) -> int:
+    """
+    Bulk-insert historical fills and bring holdings/cash in line with them.
+
+    Fills keep their own price and timestamp (no live quote, no per-row
+    locking). Cash moves by the net cash_delta of the batch; holdings are
+    rebuilt from the whole ledger so back-dated fills land in order.
+    Tax lots are rebuilt the same way; stored daily returns from the
+    earliest imported day on are dropped and re-synced through the outbox.
+    """
+    if not trades:
+        return 0
+
+    portfolio = Portfolio.objects.select_for_update().get(pk=portfolio.pk)
+    transaction.on_commit(lambda: pin_to_primary(portfolio.owner_id))
+    for t in trades:
+        t.portfolio = portfolio
+    created = Trade.objects.bulk_create(trades, batch_size=IMPORT_BATCH_SIZE)
+
+    net = sum((t.cash_delta for t in created), Decimal("0"))
+    portfolio.cash = Decimal(str(portfolio.cash)) + net
+    if portfolio.cash < 0:
+        raise ValueError("Not enough cash: import would leave a negative balance (add CASH_IN rows)")
+    portfolio.version += 1
+    portfolio.save(update_fields=["cash", "version"])
+
+    rebuild_holdings(portfolio)
+    rebuild_lots(portfolio)
+    invalidate_performance(portfolio, min(t.executed_at for t in created).date())
+    emit("performance.sync", portfolio_id=portfolio.pk)
+    return len(created)
@@ -0,0 +1,179 @@
+# portfolios/lots.py
+from __future__ import annotations
+
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from django.db.models import Count, Sum
+
+from .models import Lot, LotClosure, Portfolio, Trade
+
+CENT = Decimal("0.01")
+PRICE_Q = Decimal("0.0001")  # Trade.price precision
+FILL_TYPES = ("BUY", "SELL", "SHORT_COVER")  # trades that move positions (and lots)
+
+
+# ───────────────────────────── matching core ─────────────────────────────
+def _match(
+    portfolio: Portfolio,
+    open_lots: List[Lot],
+    trade: Trade,
+) -> Tuple[List[Lot], List[LotClosure], Optional[Lot]]:
+    """
+    Consume *open_lots* (already filtered to the opposite side and ordered by
+    the portfolio's lot method) with *trade*. SELL closes long lots; BUY and
+    SHORT_COVER close short ones.
+
+    Returns (touched lots, closures, newly opened lot or None). Works purely
+    in memory so the same code serves execute_trade and ledger rebuilds.
+    """
+    qty = Decimal(str(trade.quantity))
+    px = Decimal(str(trade.price)).quantize(PRICE_Q)
+    closing_long = trade.type == "SELL"
+
+    touched: List[Lot] = []
+    closures: List[LotClosure] = []
+    for lot in open_lots:
+        if qty <= 0:
+            break
+        take = min(qty, lot.remaining)
+        if take <= 0:
+            continue
+        lot.remaining -= take
+        qty -= take
+        pnl = (px - lot.open_price) * take if closing_long else (lot.open_price - px) * take
+        touched.append(lot)
+        closures.append(LotClosure(
+            portfolio=portfolio, lot=lot, trade=trade, ticker=trade.ticker,
+            quantity=take, open_price=lot.open_price, close_price=px,
+            realized_pnl=pnl.quantize(CENT), closed_at=trade.executed_at,
+        ))
+
+    new_lot = None
+    if qty > 0:
+        new_lot = Lot(
+            portfolio=portfolio, ticker=trade.ticker,
+            side=Lot.Side.SHORT if closing_long else Lot.Side.LONG,
+            open_trade=trade, opened_at=trade.executed_at,
+            open_price=px, quantity=qty, remaining=qty,
+        )
+    return touched, closures, new_lot
+
+
+def _ordering(portfolio: Portfolio) -> Tuple[str, str]:
+    return ("-opened_at", "-id") if portfolio.lot_method == "LIFO" else ("opened_at", "id")
+
+
+# ───────────────────────────── write paths ─────────────────────────────
+def apply_trade_to_lots(portfolio: Portfolio, trade: Trade) -> Decimal:
+    """
+    Incrementally update lots for one fill (FILL_TYPES); returns its realized P&L.
+    Must run inside execute_trade's transaction (portfolio row already locked).
+    """
+    opposite = Lot.Side.LONG if trade.type == "SELL" else Lot.Side.SHORT
+    open_lots = list(
+        Lot.objects
+        .filter(portfolio=portfolio, ticker=trade.ticker, side=opposite, remaining__gt=0)
+        .order_by(*_ordering(portfolio))
+    )
+    touched, closures, new_lot = _match(portfolio, open_lots, trade)
+
+    if touched:
+        Lot.objects.bulk_update(touched, ["remaining"])
+    if closures:
+        LotClosure.objects.bulk_create(closures)
+    if new_lot is not None:
+        new_lot.save()
+    return sum((c.realized_pnl for c in closures), Decimal("0"))
+
+
+def rebuild_lots(portfolio: Portfolio) -> None:
+    """
+    Recreate all lots/closures of *portfolio* from its trade ledger (the same
+    FILL_TYPES services.rebuild_holdings replays) in memory and write them back
+    with two bulk_creates. Call inside a transaction.
+    """
+    LotClosure.objects.filter(portfolio=portfolio).delete()
+    Lot.objects.filter(portfolio=portfolio).delete()
+
+    lifo = portfolio.lot_method == "LIFO"
+    books: Dict[Tuple[str, str], List[Lot]] = {}
+    all_lots: List[Lot] = []
+    all_closures: List[LotClosure] = []
+
+    ledger = (
+        Trade.objects
+        .filter(portfolio=portfolio, type__in=FILL_TYPES)
+        .order_by("executed_at", "id")
+    )
+    for trade in ledger.iterator(chunk_size=2000):
+        opposite = Lot.Side.LONG if trade.type == "SELL" else Lot.Side.SHORT
+        book = books.setdefault((trade.ticker, opposite), [])
+        # books are kept oldest-first; LIFO just walks them backwards
+        _, closures, new_lot = _match(portfolio, reversed(book) if lifo else book, trade)
+        books[(trade.ticker, opposite)] = [lot for lot in book if lot.remaining > 0]
+        all_closures.extend(closures)
+        if new_lot is not None:
+            books.setdefault((trade.ticker, new_lot.side), []).append(new_lot)
+            all_lots.append(new_lot)
+
+    Lot.objects.bulk_create(all_lots, batch_size=1000)
+    LotClosure.objects.bulk_create(all_closures, batch_size=1000)
+
+
+# ───────────────────────────── read paths ─────────────────────────────
+def open_lots(portfolio: Portfolio, prices: Dict[str, float]) -> List[dict]:
+    """Open lots with unrealized P&L at *prices* (ticker → last price)."""
+    rows = []
+    qs = (
+        Lot.objects
+        .filter(portfolio=portfolio, remaining__gt=0)
+        .order_by("ticker", "opened_at", "id")
+        .values_list("id", "ticker", "side", "opened_at", "open_price", "quantity", "remaining")
+    )
+    for lid, ticker, side, opened_at, open_price, quantity, remaining in qs:
+        px = prices.get(ticker)
+        unrealized = None
+        if px:
+            diff = Decimal(str(px)) - open_price
+            unrealized = float((diff if side == Lot.Side.LONG else -diff) * remaining)
+        rows.append({
+            "id": lid,
+            "ticker": ticker,
+            "side": side,
+            "opened_at": opened_at.isoformat(),
+            "open_price": float(open_price),
+            "quantity": float(quantity),
+            "remaining": float(remaining),
+            "price": px,
+            "unrealized_pnl": unrealized,
+        })
+    return rows
+
+
+def realized_pnl(
+    portfolio: Portfolio,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> dict:
+    """Realized P&L over [start, end) – total plus per-ticker breakdown."""
+    qs = LotClosure.objects.filter(portfolio=portfolio)
+    if start is not None:
+        qs = qs.filter(closed_at__gte=start)
+    if end is not None:
+        qs = qs.filter(closed_at__lt=end)
+
+    by_ticker = (
+        qs.values("ticker")
+        .annotate(realized=Sum("realized_pnl"), trades=Count("trade", distinct=True))
+        .order_by("ticker")
+    )
+    total = sum((r["realized"] for r in by_ticker), Decimal("0"))
+    return {
+        "total": float(total),
+        "by_ticker": [
+            {"ticker": r["ticker"], "realized": float(r["realized"]), "trades": r["trades"]}
+            for r in by_ticker
+        ],
+    }
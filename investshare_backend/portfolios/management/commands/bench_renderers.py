@@ -0,0 +1,105 @@
+import gzip
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from investshare.middleware import brotli
+from investshare.renderers import ORJSONRenderer, orjson
+
+
+def _portfolio(rnd: random.Random, pid: int, n_holdings: int) -> dict:
+    """Shape of PortfolioSerializer output (holdings table included)."""
+    holdings = []
+    for i in range(n_holdings):
+        px = rnd.uniform(5, 900)
+        holdings.append({
+            "id": pid * 1000 + i,
+            "ticker": f"T{i:03d}",
+            "quantity": str(Decimal(rnd.randint(1, 5000)).quantize(Decimal("0.0001"))),
+            "avg_cost": str(Decimal(str(round(px * 0.9, 4)))),
+            "price": px,
+            "value": px * 100,
+            "pl_abs": rnd.uniform(-5000, 5000),
+            "pl_pct": rnd.uniform(-50, 50),
+            "day_abs": rnd.uniform(-500, 500),
+            "day_pct": rnd.uniform(-5, 5),
+        })
+    return {
+        "id": pid,
+        "name": f"Portfolio {pid}",
+        "visibility": "public",
+        "cash": Decimal("10234.55"),
+        "owner_username": f"user{pid}",
+        "total_value": rnd.uniform(1e4, 1e6),
+        "todays_change": {"abs": rnd.uniform(-1e3, 1e3), "pct": rnd.uniform(-3, 3)},
+        "holdings": holdings,
+        "created_at": datetime(2024, 1, 2, 15, 30, tzinfo=timezone.utc),
+        "lot_method": "FIFO",
+        "returns": {"range": "all", "twr": 0.1234, "mwr": 0.0987, "as_of": date.today().isoformat()},
+    }
+
+
+def _payloads():
+    rnd = random.Random(37)
+    start = date.today() - timedelta(days=365 * 5)
+    chart = [
+        {"date": (start + timedelta(days=i)).isoformat(), "value": rnd.uniform(9e3, 2e4)}
+        for i in range(365 * 5)
+    ]
+    public = {
+        "count": 500, "next": "http://localhost:8000/api/public/portfolios/?page=2", "previous": None,
+        "results": [
+            {"id": i, "owner_username": f"user{i}", "total_value": rnd.uniform(1e4, 1e6),
+             "todays_change": {"abs": rnd.uniform(-1e3, 1e3), "pct": rnd.uniform(-3, 3)},
+             "twr": rnd.uniform(-0.5, 2.0)}
+            for i in range(20)
+        ],
+    }
+    return [
+        ("portfolio detail (40 holdings)", _portfolio(rnd, 1, 40)),
+        ("portfolio list (20 × 15 holdings)", [_portfolio(rnd, i, 15) for i in range(20)]),
+        ("chart, 5y daily", chart),
+        ("public list page", public),
+    ]
+
+
+def _time(fn, repeat: int) -> float:
+    """Best-of-5 mean per call, in milliseconds."""
+    best = float("inf")
+    for _ in range(5):
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.perf_counter() - t0) / repeat)
+    return best * 1000
+
+
+class Command(BaseCommand):
+    help = "Compare DRF JSONRenderer vs ORJSONRenderer render time and bytes on the wire (raw/gzip/brotli)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=50)
+
+    def handle(self, *args, **opts):
+        if orjson is None:
+            self.stderr.write("orjson is not installed – ORJSONRenderer falls back to JSONRenderer.")
+        repeat = opts["repeat"]
+        stock, fast = JSONRenderer(), ORJSONRenderer()
+
+        header = f"{'payload':36} {'drf ms':>8} {'orjson ms':>10} {'x':>6} {'raw B':>9} {'gzip B':>9} {'br B':>9}"
+        self.stdout.write(header)
+        self.stdout.write("─" * len(header))
+        for name, data in _payloads():
+            t_old = _time(lambda: stock.render(data), repeat)
+            t_new = _time(lambda: fast.render(data), repeat)
+            body = fast.render(data)
+            gz = len(gzip.compress(body, compresslevel=6))
+            br = len(brotli.compress(body, quality=5)) if brotli is not None else None
+            self.stdout.write(
+                f"{name:36} {t_old:8.3f} {t_new:10.3f} {t_old / t_new:6.1f} "
+                f"{len(body):9d} {gz:9d} {br if br is not None else '-':>9}"
+            )
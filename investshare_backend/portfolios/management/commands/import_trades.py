@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolios.imports import import_trades, parse_fills_csv
+from portfolios.models import Portfolio
+
+
+class Command(BaseCommand):
+    help = "Bulk-import dated broker fills (CSV) into a portfolio and recompute holdings/cash."
+
+    def add_arguments(self, parser):
+        parser.add_argument("portfolio", help="Portfolio id or owner username")
+        parser.add_argument("csv_path")
+
+    def handle(self, *args, **opts):
+        ref = opts["portfolio"]
+        qs = Portfolio.objects.filter(pk=ref) if ref.isdigit() else Portfolio.objects.filter(owner__username=ref)
+        portfolio = qs.first()
+        if portfolio is None:
+            raise CommandError(f"portfolio {ref!r} not found")
+
+        try:
+            with open(opts["csv_path"], newline="", encoding="utf-8-sig") as fh:
+                count = import_trades(portfolio, parse_fills_csv(fh))
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        portfolio.refresh_from_db()
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {count} trades into portfolio {portfolio.pk}; cash={portfolio.cash}, "
+            f"holdings={portfolio.holdings.count()}"
+        ))
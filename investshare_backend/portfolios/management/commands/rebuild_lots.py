@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from portfolios.lots import rebuild_lots
+from portfolios.models import Portfolio
+
+
+class Command(BaseCommand):
+    help = "Rebuild tax lots and realized P&L from the trade ledger (all portfolios or the given ids)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("portfolio_ids", nargs="*", type=int)
+
+    def handle(self, *args, **opts):
+        qs = Portfolio.objects.order_by("id")
+        if opts["portfolio_ids"]:
+            qs = qs.filter(pk__in=opts["portfolio_ids"])
+        for portfolio in qs:
+            with transaction.atomic():
+                portfolio = Portfolio.objects.select_for_update().get(pk=portfolio.pk)
+                rebuild_lots(portfolio)
+            self.stdout.write(f"portfolio {portfolio.pk}: {portfolio.lots.filter(remaining__gt=0).count()} open lots")
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from portfolios.outbox import run_outbox_batch
+
+
+class Command(BaseCommand):
+    help = "Outbox worker: run post-trade side effects (snapshot upsert, cache invalidation) for committed trades, then prune old events."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=100, help="Max events per pass")
+        parser.add_argument("--loop", action="store_true", help="Keep polling instead of a single pass")
+        parser.add_argument("--idle", type=float, default=1.0, help="Seconds to sleep when nothing is due")
+
+    def handle(self, *args, **opts):
+        while True:
+            n = run_outbox_batch(opts["batch"])
+            if opts["verbosity"] > 1 or not opts["loop"]:
+                self.stdout.write(f"processed {n} events")
+            if not opts["loop"]:
+                return
+            if n == 0:
+                time.sleep(opts["idle"])
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from investshare.routers import replica_reads
+from portfolios.models import Portfolio
+from portfolios.performance import sync_performance
+
+
+class Command(BaseCommand):
+    help = "Append stored daily TWR rows for every portfolio through yesterday (run nightly)."
+
+    def handle(self, *args, **opts):
+        n = 0
+        # the scan reads from a replica; each sync runs in a transaction on the primary
+        with replica_reads():
+            for portfolio in Portfolio.objects.order_by("id").iterator():
+                if sync_performance(portfolio) is not None:
+                    n += 1
+        self.stdout.write(self.style.SUCCESS(f"synced {n} portfolios"))
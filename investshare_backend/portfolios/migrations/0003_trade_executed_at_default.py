@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0002_alter_portfolio_options_alter_trade_quantity'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='trade',
+            name='executed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
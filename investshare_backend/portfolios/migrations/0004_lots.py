@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0003_trade_executed_at_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='portfolio',
+            name='lot_method',
+            field=models.CharField(choices=[('FIFO', 'First in, first out'), ('LIFO', 'Last in, first out')], default='FIFO', max_length=4),
+        ),
+        migrations.CreateModel(
+            name='Lot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=15)),
+                ('side', models.CharField(choices=[('long', 'Long'), ('short', 'Short')], max_length=5)),
+                ('opened_at', models.DateTimeField()),
+                ('open_price', models.DecimalField(decimal_places=4, max_digits=18)),
+                ('quantity', models.DecimalField(decimal_places=6, max_digits=20)),
+                ('remaining', models.DecimalField(decimal_places=6, max_digits=20)),
+                ('open_trade', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='opened_lots', to='portfolios.trade')),
+                ('portfolio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lots', to='portfolios.portfolio')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LotClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=15)),
+                ('quantity', models.DecimalField(decimal_places=6, max_digits=20)),
+                ('open_price', models.DecimalField(decimal_places=4, max_digits=18)),
+                ('close_price', models.DecimalField(decimal_places=4, max_digits=18)),
+                ('realized_pnl', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('closed_at', models.DateTimeField()),
+                ('lot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='closures', to='portfolios.lot')),
+                ('portfolio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lot_closures', to='portfolios.portfolio')),
+                ('trade', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lot_closures', to='portfolios.trade')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='lot',
+            index=models.Index(fields=['portfolio', 'ticker', 'side', 'opened_at'], name='portfolios__portfol_5f4fd0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lotclosure',
+            index=models.Index(fields=['portfolio', 'closed_at'], name='portfolios__portfol_d64f72_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0004_lots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='portfolio',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
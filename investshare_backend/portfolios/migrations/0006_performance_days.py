@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0005_portfolio_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerformanceDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('equity', models.DecimalField(decimal_places=2, max_digits=18)),
+                ('net_flow', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('period_return', models.FloatField(default=0.0)),
+                ('growth', models.FloatField(default=1.0)),
+                ('portfolio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='performance_days', to='portfolios.portfolio')),
+            ],
+            options={
+                'ordering': ['portfolio', 'date'],
+                'unique_together': {('portfolio', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,78 @@
+from decimal import Decimal
+
+from django.db import migrations
+
+CENT = Decimal("0.01")
+PRICE_Q = Decimal("0.0001")
+FILLS = ("BUY", "SELL", "SHORT_COVER")
+
+
+def backfill_lots(apps, schema_editor):
+    """
+    Replay every portfolio's BUY/SELL/SHORT_COVER ledger into lots and
+    closures, as portfolios.lots.rebuild_lots does – trades booked before
+    0004 have none, so the first SELL after upgrading would otherwise open a
+    short lot.
+    A frozen copy of the matching, so later model changes can't break it.
+    """
+    Portfolio = apps.get_model("portfolios", "Portfolio")
+    Trade = apps.get_model("portfolios", "Trade")
+    Lot = apps.get_model("portfolios", "Lot")
+    LotClosure = apps.get_model("portfolios", "LotClosure")
+
+    for portfolio in Portfolio.objects.filter(trades__type__in=FILLS).distinct().iterator():
+        LotClosure.objects.filter(portfolio=portfolio).delete()
+        Lot.objects.filter(portfolio=portfolio).delete()
+
+        lifo = portfolio.lot_method == "LIFO"
+        books = {}
+        lots, closures = [], []
+        ledger = (
+            Trade.objects
+            .filter(portfolio=portfolio, type__in=FILLS)
+            .order_by("executed_at", "id")
+        )
+        for trade in ledger.iterator(chunk_size=2000):
+            closing_long = trade.type == "SELL"
+            opposite = "long" if closing_long else "short"
+            book = books.get((trade.ticker, opposite), [])
+            qty = Decimal(str(trade.quantity))
+            px = Decimal(str(trade.price)).quantize(PRICE_Q)
+            for lot in (reversed(book) if lifo else book):
+                if qty <= 0:
+                    break
+                take = min(qty, lot.remaining)
+                if take <= 0:
+                    continue
+                lot.remaining -= take
+                qty -= take
+                pnl = (px - lot.open_price) * take if closing_long else (lot.open_price - px) * take
+                closures.append(LotClosure(
+                    portfolio=portfolio, lot=lot, trade=trade, ticker=trade.ticker,
+                    quantity=take, open_price=lot.open_price, close_price=px,
+                    realized_pnl=pnl.quantize(CENT), closed_at=trade.executed_at,
+                ))
+            books[(trade.ticker, opposite)] = [lot for lot in book if lot.remaining > 0]
+            if qty > 0:
+                side = "short" if closing_long else "long"
+                lot = Lot(
+                    portfolio=portfolio, ticker=trade.ticker, side=side,
+                    open_trade=trade, opened_at=trade.executed_at,
+                    open_price=px, quantity=qty, remaining=qty,
+                )
+                books.setdefault((trade.ticker, side), []).append(lot)
+                lots.append(lot)
+
+        Lot.objects.bulk_create(lots, batch_size=1000)
+        LotClosure.objects.bulk_create(closures, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolios', '0007_outbox'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_lots, migrations.RunPython.noop),
+    ]
@@ -2,10 +2,12 @@
 from django.db import models
 from django.conf import settings
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from decimal import Decimal
 
 class Portfolio(models.Model):
     VISIBILITY_CHOICES = [("public","Public"), ("private","Private")]
+    LOT_METHOD_CHOICES = [("FIFO","First in, first out"), ("LIFO","Last in, first out")]
     owner = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="portfolio")
     name = models.CharField(max_length=100, default="My Portfolio")
     visibility = models.CharField(max_length=7, choices=VISIBILITY_CHOICES, default="public")
@@ -14,6 +16,9 @@ class Portfolio(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     performance_cache = models.JSONField(blank=True, null=True)
     last_calc_at = models.DateTimeField(blank=True, null=True)
+    lot_method = models.CharField(max_length=4, choices=LOT_METHOD_CHOICES, default="FIFO")
+    # bumped on every cash/holdings change; part of computed-payload cache keys
+    version = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"{self.owner.username}'s portfolio"
@@ -46,7 +51,90 @@ class Trade(models.Model):
     quantity = models.DecimalField(max_digits=20, decimal_places=6, default=0, validators=[MinValueValidator(0)])
     price = models.DecimalField(max_digits=18, decimal_places=4, default=0)
     cash_delta = models.DecimalField(max_digits=18, decimal_places=2, default=0)
-    executed_at = models.DateTimeField(auto_now_add=True)
+    # plain default (not auto_now_add) so imported fills keep their historical timestamp
+    executed_at = models.DateTimeField(default=timezone.now)
 
     def __str__(self):
         return f"{self.type} {self.ticker} {self.quantity} @ {self.price}"
+
+
+class Lot(models.Model):
+    """An open (or fully consumed) tax lot created by one BUY/SELL fill."""
+    class Side(models.TextChoices):
+        LONG = "long", "Long"
+        SHORT = "short", "Short"
+
+    portfolio = models.ForeignKey(Portfolio, on_delete=models.CASCADE, related_name="lots")
+    ticker = models.CharField(max_length=15)
+    side = models.CharField(max_length=5, choices=Side.choices)
+    open_trade = models.ForeignKey(Trade, on_delete=models.CASCADE, related_name="opened_lots")
+    opened_at = models.DateTimeField()
+    open_price = models.DecimalField(max_digits=18, decimal_places=4)
+    quantity = models.DecimalField(max_digits=20, decimal_places=6)
+    remaining = models.DecimalField(max_digits=20, decimal_places=6)
+
+    class Meta:
+        indexes = [models.Index(fields=["portfolio", "ticker", "side", "opened_at"])]
+
+    def __str__(self):
+        return f"{self.side} {self.ticker} {self.remaining}/{self.quantity} @ {self.open_price}"
+
+
+class LotClosure(models.Model):
+    """Part of a lot consumed by a later opposite fill – one row of realized P&L."""
+    portfolio = models.ForeignKey(Portfolio, on_delete=models.CASCADE, related_name="lot_closures")
+    lot = models.ForeignKey(Lot, on_delete=models.CASCADE, related_name="closures")
+    trade = models.ForeignKey(Trade, on_delete=models.CASCADE, related_name="lot_closures")
+    ticker = models.CharField(max_length=15)
+    quantity = models.DecimalField(max_digits=20, decimal_places=6)
+    open_price = models.DecimalField(max_digits=18, decimal_places=4)
+    close_price = models.DecimalField(max_digits=18, decimal_places=4)
+    realized_pnl = models.DecimalField(max_digits=18, decimal_places=2)
+    closed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=["portfolio", "closed_at"])]
+
+    def __str__(self):
+        return f"{self.ticker} {self.quantity} closed @ {self.close_price} ({self.realized_pnl})"
+
+
+class PerformanceDay(models.Model):
+    """
+    End-of-day equity and external cash flow for one completed day, plus the
+    chained time-weighted growth index – appended one row per day.
+    """
+    portfolio = models.ForeignKey(Portfolio, on_delete=models.CASCADE, related_name="performance_days")
+    date = models.DateField()
+    equity = models.DecimalField(max_digits=18, decimal_places=2)
+    net_flow = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    period_return = models.FloatField(default=0.0)
+    growth = models.FloatField(default=1.0)
+
+    class Meta:
+        unique_together = ("portfolio", "date")
+        ordering = ["portfolio", "date"]
+
+    def __str__(self):
+        return f"{self.portfolio_id} {self.date} {self.equity} ({self.period_return:+.4%})"
+
+
+class OutboxEvent(models.Model):
+    """
+    Follow-on work for a committed change (portfolios/outbox.py), written in
+    the same transaction and carried out by `manage.py run_outbox`.
+    """
+    topic = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now)  # pushed back on retry
+    started_at = models.DateTimeField(null=True, blank=True)   # worker lease
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["processed_at", "available_at"])]
+
+    def __str__(self):
+        return f"{self.topic} #{self.pk} ({'done' if self.processed_at else f'{self.attempts} attempts'})"
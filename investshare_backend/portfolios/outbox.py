@@ -0,0 +1,159 @@
+# portfolios/outbox.py
+"""
+Transactional outbox for post-trade side effects.
+
+emit() writes an OutboxEvent inside the caller's transaction, so an event
+exists if and only if the change it describes was committed. A worker
+(`manage.py run_outbox`) claims due events and runs every handler
+registered for the topic:
+
+    @handler("trade.executed")
+    def _upsert_snapshot(payload: dict) -> None: ...
+
+Handlers must be idempotent – an event whose handler raises is retried as a
+whole with exponential backoff, up to MAX_ATTEMPTS. A crashed worker's
+claim lapses after OUTBOX_LEASE. Processed events are deleted once they are
+older than OUTBOX_RETENTION.
+
+Events are left to the worker by default. OUTBOX_RUN_INLINE = True is a
+development/test opt-in that processes them right after the commit in the
+request thread (the worker then only picks up retries).
+
+Topics: "trade.executed" (snapshot upsert, performance sync),
+"performance.sync" (after imports) and "payloads.invalidate". Cached payloads
+carry their own invalidation (portfolio version, price generations) and ETags
+are computed from the response body, so neither needs a handler. There is no
+leaderboard, position index or push notification feature yet; those become
+further "trade.executed" handlers when they exist.
+"""
+from __future__ import annotations
+
+import logging
+import traceback
+from datetime import date, timedelta
+from typing import Callable, Dict, List
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils.timezone import now
+
+from .models import OutboxEvent, Portfolio
+from .payloads import invalidate
+from .performance import sync_performance
+from market.actions import history_changed
+from market.models import PriceSnapshot
+from market.upstream import BACKGROUND, priority
+
+log = logging.getLogger(__name__)
+
+OUTBOX_LEASE = timedelta(minutes=5)
+MAX_ATTEMPTS = 8
+MAX_BACKOFF = timedelta(minutes=30)
+
+Handler = Callable[[dict], None]
+HANDLERS: Dict[str, List[Handler]] = {}
+
+
+def handler(topic: str) -> Callable[[Handler], Handler]:
+    """Register a function to run for every *topic* event (in registration order)."""
+    def register(fn: Handler) -> Handler:
+        HANDLERS.setdefault(topic, []).append(fn)
+        return fn
+    return register
+
+
+# Explicit payload-cache invalidation, for changes execute_trade's version bump
+# and the price generations don't see: emit("payloads.invalidate",
+# portfolio_id=..., tickers=[...]).
+handler("payloads.invalidate")(invalidate)
+
+
+def emit(topic: str, **payload) -> OutboxEvent:
+    """Queue *topic* work; call inside the transaction that makes the change."""
+    event = OutboxEvent.objects.create(topic=topic, payload=payload)
+    if getattr(settings, "OUTBOX_RUN_INLINE", False):
+        transaction.on_commit(lambda: process_event(event.pk))
+    return event
+
+
+# ───────────────────────────── worker ─────────────────────────────
+def _free_q(t):
+    return Q(started_at__isnull=True) | Q(started_at__lt=t - OUTBOX_LEASE)
+
+
+def due_events(limit: int) -> List[int]:
+    """Oldest unprocessed events that are due and not leased, FIFO."""
+    t = now()
+    return list(
+        OutboxEvent.objects
+        .filter(_free_q(t), processed_at__isnull=True, available_at__lte=t, attempts__lt=MAX_ATTEMPTS)
+        .order_by("id").values_list("id", flat=True)[:limit]
+    )
+
+
+def _claim(event_id: int) -> bool:
+    t = now()
+    return OutboxEvent.objects.filter(_free_q(t), pk=event_id, processed_at__isnull=True) \
+        .update(started_at=t, attempts=F("attempts") + 1) > 0
+
+
+def process_event(event_id: int) -> bool:
+    """Run the handlers of one event. True when it is done (now or already)."""
+    if not _claim(event_id):
+        return False
+    event = OutboxEvent.objects.get(pk=event_id)
+    try:
+        for fn in HANDLERS.get(event.topic, ()):
+            fn(event.payload)
+    except Exception as e:
+        backoff = min(timedelta(seconds=2 ** event.attempts), MAX_BACKOFF)
+        OutboxEvent.objects.filter(pk=event_id).update(
+            started_at=None,
+            available_at=now() + backoff,
+            last_error="".join(traceback.format_exception_only(type(e), e)).strip()[:2000],
+        )
+        log.warning("outbox event %s (%s) failed, attempt %s", event_id, event.topic, event.attempts, exc_info=True)
+        return False
+    OutboxEvent.objects.filter(pk=event_id).update(processed_at=now(), started_at=None, last_error="")
+    return True
+
+
+def prune_events() -> int:
+    """Delete events processed more than OUTBOX_RETENTION ago. Returns rows deleted."""
+    retention = getattr(settings, "OUTBOX_RETENTION", timedelta(days=7))
+    deleted, _ = OutboxEvent.objects.filter(processed_at__lt=now() - retention).delete()
+    return deleted
+
+
+def run_outbox_batch(limit: int = 100) -> int:
+    """Process up to *limit* due events at background upstream priority. Returns events done."""
+    done = 0
+    with priority(BACKGROUND):
+        for event_id in due_events(limit):
+            done += process_event(event_id)
+    if done < limit:  # caught up
+        prune_events()
+    return done
+
+
+# ─────────────────────────── trade handlers ───────────────────────────
+@handler("trade.executed")
+def _upsert_snapshot(payload: dict) -> None:
+    """A close for the trade day at the fill price, so charts/allocations get a fresh point."""
+    ticker, price = payload.get("ticker"), payload.get("price")
+    if not ticker or not price:
+        return
+    day = date.fromisoformat(payload["date"])
+    with transaction.atomic():
+        PriceSnapshot.objects.update_or_create(ticker=ticker, date=day, defaults={"close": price})
+        history_changed([ticker], day)
+
+
+@handler("trade.executed")
+@handler("performance.sync")
+def _sync_performance(payload: dict) -> None:
+    """Append the portfolio's stored daily returns through yesterday (portfolio_returns only reads them)."""
+    portfolio = Portfolio.objects.filter(pk=payload["portfolio_id"]).first()
+    if portfolio is not None:
+        sync_performance(portfolio)
@@ -0,0 +1,169 @@
+# portfolios/payloads.py
+"""
+Cache for computed portfolio payloads (chart series, allocation treemap).
+
+A payload depends only on the portfolio's state and the prices of what it
+holds, so it is stored under
+
+    payload:{kind}:{pk}:v{version}.{epoch}:{digest of params, today, price generations}
+
+version is bumped by execute_trade/import_trades and portfolio edits,
+epoch by invalidate_portfolio(), and each held ticker's price generation
+(market/generation.py) whenever its history or live quote changes. Epochs
+and generations live in the default cache, so changes made by other
+processes are only seen when that cache is shared (settings.CACHES). Nothing
+is deleted on a change: superseded entries are simply never read again and
+age out of PAYLOAD_CACHE, a cache bounded by MAX_ENTRIES (settings.CACHES).
+Payloads pickling to more than PAYLOAD_CACHE_MAX_BYTES are not stored, so
+the cache holds at most MAX_ENTRIES × that.
+
+Entries expire with the shortest quote TTL among the holdings – a live
+price is never reused longer than that anyway – capped at PAYLOAD_CACHE_TTL.
+Payloads valued partly at carried-forward prices (a non-empty `stale`) are
+kept for at most QUOTE_MISS_TTL, like the quote fallbacks they are built on.
+Concurrent misses on one key compute once: the first request takes a lease,
+the others wait for its result, so a public portfolio viewed by many users
+costs one computation per price change.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import pickle
+import time
+from datetime import date
+from typing import Any, Awaitable, Callable, Iterable, Optional, Tuple, TypeVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache, caches
+
+from .models import Portfolio
+from market.calendar import quote_ttl
+from market.prices import QUOTE_MISS_TTL
+from market.generation import bump_price_generation, price_generations
+
+T = TypeVar("T")
+
+LEASE_SECONDS = 10  # a computing request's claim on a key; waiters stop waiting after this
+MAX_POLL = 0.2
+
+
+def _cache():
+    return caches[getattr(settings, "PAYLOAD_CACHE", "default")]
+
+
+def _epoch(pk: int) -> int:
+    key = f"payload:epoch:{pk}"
+    epoch = cache.get(key)
+    if epoch is None:
+        cache.add(key, int(time.time() * 1000), None)
+        epoch = cache.get(key, 0)
+    return epoch
+
+
+def payload_key(p: Portfolio, kind: str, *params) -> str:
+    """Key of *kind*(*params*) for *p* as it is now. Reads p.holdings (prefetch it)."""
+    gens = sorted(price_generations(h.ticker for h in p.holdings.all()).items())
+    digest = hashlib.blake2b(
+        repr((params, date.today().isoformat(), gens)).encode(), digest_size=12
+    ).hexdigest()
+    return f"payload:{kind}:{p.pk}:v{p.version}.{_epoch(p.pk)}:{digest}"
+
+
+def payload_ttl(p: Portfolio) -> int:
+    cap = getattr(settings, "PAYLOAD_CACHE_TTL", 60 * 60)
+    return max(1, min([cap] + [quote_ttl(h.ticker) for h in p.holdings.all()]))
+
+
+# ───────────────────────────── invalidation ─────────────────────────────
+def invalidate_portfolio(portfolio_id: int) -> None:
+    """Make every cached payload of the portfolio unreachable."""
+    key = f"payload:epoch:{portfolio_id}"
+    cache.add(key, int(time.time() * 1000), None)
+    try:
+        cache.incr(key)
+    except ValueError:  # evicted between add and incr
+        cache.set(key, int(time.time() * 1000), None)
+
+
+def invalidate_tickers(tickers: Iterable[str]) -> None:
+    """Make every cached payload that reads these tickers' prices unreachable."""
+    bump_price_generation(tickers)
+
+
+def invalidate(payload: dict) -> None:
+    """Outbox handler: {"portfolio_id": ...} and/or {"tickers": [...]}."""
+    if payload.get("portfolio_id"):
+        invalidate_portfolio(payload["portfolio_id"])
+    if payload.get("tickers"):
+        invalidate_tickers(payload["tickers"])
+
+
+# ───────────────────────────── read-through ─────────────────────────────
+def _lookup(p: Portfolio, kind: str, params: tuple) -> Tuple[str, Optional[tuple], bool]:
+    """(key, hit, leased) – *leased* when this caller should compute."""
+    c = _cache()
+    key = payload_key(p, kind, *params)
+    hit = c.get(key)
+    if hit is not None:
+        return key, hit, False
+    return key, None, c.add(f"{key}:lease", 1, LEASE_SECONDS)
+
+
+def _store(p: Portfolio, kind: str, params: tuple, key: str, value: Any, leased: bool) -> None:
+    c = _cache()
+    try:
+        limit = getattr(settings, "PAYLOAD_CACHE_MAX_BYTES", 128 * 1024)
+        if not limit or len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)) <= limit:
+            ttl = payload_ttl(p)
+            if getattr(value, "stale", None):
+                ttl = min(ttl, QUOTE_MISS_TTL)
+            # computing may itself have fetched quotes and moved generations;
+            # keep it under the key it was looked up by and the current one
+            c.set_many(dict.fromkeys({key, payload_key(p, kind, *params)}, (value,)), ttl)
+    finally:
+        if leased:
+            c.delete(f"{key}:lease")
+
+
+def _release(key: str) -> None:
+    _cache().delete(f"{key}:lease")
+
+
+async def _wait(key: str) -> Optional[tuple]:
+    """Poll for another request's result until it lands or its lease goes."""
+    c = _cache()
+    deadline = time.monotonic() + LEASE_SECONDS
+    delay = 0.01
+    while time.monotonic() < deadline:
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, MAX_POLL)
+        hit = await c.aget(key)
+        if hit is not None:
+            return hit
+        if await c.aget(f"{key}:lease") is None:
+            return await c.aget(key)
+    return None
+
+
+async def cached_payload(p: Portfolio, kind: str, params: tuple, compute: Callable[[], Awaitable[T]]) -> T:
+    """
+    compute() for *p*'s current state and prices, through the payload cache.
+    Exceptions from compute() propagate and nothing is stored.
+    """
+    key, hit, leased = await sync_to_async(_lookup)(p, kind, params)
+    if hit is not None:
+        return hit[0]
+    if not leased:
+        hit = await _wait(key)
+        if hit is not None:
+            return hit[0]
+    try:
+        value = await compute()
+    except BaseException:
+        if leased:
+            await sync_to_async(_release)(key)
+        raise
+    await sync_to_async(_store)(p, kind, params, key, value, leased)
+    return value
@@ -0,0 +1,291 @@
+# portfolios/performance.py
+from __future__ import annotations
+
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Min, OuterRef, Subquery, Sum
+
+from .models import PerformanceDay, Portfolio, Trade
+from market.prices import get_latest_price
+from market.rollups import stored_closes
+
+RETURN_RANGES = ("1w", "1m", "ytd", "1y", "all")
+_FLOW_TYPES = ("CASH_IN", "CASH_OUT")
+_PRICE_LOOKBACK = timedelta(days=35)  # how far back to look for a close to carry forward (compacted history is monthly)
+
+
+def _signed_qty(t: Trade) -> Decimal:
+    return t.quantity if t.type in ("BUY", "SHORT_COVER") else -t.quantity
+
+
+def _is_flow(t: Trade) -> bool:
+    return t.type in _FLOW_TYPES
+
+
+def _twr_step(prev_equity: float, equity: float, flow: float) -> float:
+    """One sub-period return with the external flow assumed at the start of the day."""
+    base = prev_equity + flow
+    return equity / base - 1.0 if base > 0 else 0.0
+
+
+# ───────────────────────────── incremental store ─────────────────────────────
+@transaction.atomic
+def sync_performance(p: Portfolio, upto: Optional[date] = None) -> Optional[PerformanceDay]:
+    """
+    Append PerformanceDay rows for every completed day after the last stored one
+    (default: through yesterday). Only trades after that day are read, so keeping
+    the series current costs O(new days + new trades), not a ledger replay.
+
+    Positions as of the last stored day are recovered by undoing newer trades
+    from the current holdings/cash, then walked forward day by day.
+    """
+    upto = upto or date.today() - timedelta(days=1)
+    last = p.performance_days.order_by("-date").first()
+
+    trades = p.trades.order_by("executed_at", "id")
+    if last is not None:
+        if last.date >= upto:
+            return last
+        trades = trades.filter(executed_at__date__gt=last.date)
+    trades = list(trades)
+    if last is None and not trades:
+        return None
+
+    # state at the end of the last stored day (or before the first trade)
+    positions: Dict[str, Decimal] = dict(p.holdings.values_list("ticker", "quantity"))
+    cash = Decimal(str(p.cash))
+    for t in trades:
+        if t.ticker and not _is_flow(t):
+            positions[t.ticker] = positions.get(t.ticker, Decimal("0")) - _signed_qty(t)
+        cash -= t.cash_delta
+
+    start = last.date + timedelta(days=1) if last else trades[0].executed_at.date()
+    if start > upto:
+        return last
+
+    tickers = sorted({tk for tk in positions} | {t.ticker for t in trades if t.ticker})
+    closes: Dict[date, Dict[str, float]] = {}
+    for d, tk, px, _, _ in stored_closes(tickers, start - _PRICE_LOOKBACK, upto):
+        closes.setdefault(d, {})[tk] = float(px)
+
+    by_day: Dict[date, List[Trade]] = {}
+    for t in trades:
+        by_day.setdefault(t.executed_at.date(), []).append(t)
+
+    # evaluate on trading days and on any day something happened
+    days = sorted({d for d in closes if d >= start} | {d for d in by_day if d <= upto})
+
+    last_px: Dict[str, float] = {}
+    for d in sorted(closes):
+        if d < start:
+            last_px.update(closes[d])
+
+    prev_equity = float(last.equity) if last else float(cash)
+    growth = last.growth if last else 1.0
+    rows: List[PerformanceDay] = []
+    for d in days:
+        flow = Decimal("0")
+        for t in by_day.get(d, ()):
+            if _is_flow(t):
+                flow += t.cash_delta
+            elif t.ticker:
+                positions[t.ticker] = positions.get(t.ticker, Decimal("0")) + _signed_qty(t)
+                last_px.setdefault(t.ticker, float(t.price))
+            cash += t.cash_delta
+        last_px.update(closes.get(d, {}))
+
+        equity = float(cash) + sum(float(q) * last_px.get(tk, 0.0) for tk, q in positions.items() if q)
+        r = _twr_step(prev_equity, equity, float(flow))
+        growth *= 1.0 + r
+        rows.append(PerformanceDay(
+            portfolio=p, date=d, equity=Decimal(str(round(equity, 2))),
+            net_flow=flow, period_return=r, growth=growth,
+        ))
+        prev_equity = equity
+
+    # the nightly command and the outbox may sync the same days; the first writer wins
+    PerformanceDay.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+    return rows[-1] if rows else last
+
+
+def invalidate_performance(p: Portfolio, since: date) -> None:
+    """Drop stored days from *since* on (e.g. after back-dated imports)."""
+    p.performance_days.filter(date__gte=since).delete()
+
+
+# ───────────────────────────── money-weighted ─────────────────────────────
+def _xirr(amounts: np.ndarray, years: np.ndarray) -> Optional[float]:
+    """
+    Annualized IRR solving Σ a_i (1+r)^-t_i = 0. Newton on the whole cash-flow
+    vector, bisection fallback when Newton leaves the domain.
+    """
+    if amounts.size < 2 or not (np.any(amounts > 0) and np.any(amounts < 0)):
+        return None
+
+    def npv(r):
+        return float(np.sum(amounts * (1.0 + r) ** -years))
+
+    r = 0.1
+    for _ in range(50):
+        disc = (1.0 + r) ** -years
+        f = float(np.sum(amounts * disc))
+        df = float(np.sum(-years * amounts * disc / (1.0 + r)))
+        if df == 0:
+            break
+        nr = r - f / df
+        if not np.isfinite(nr) or nr <= -0.9999:
+            break
+        if abs(nr - r) < 1e-10:
+            return nr
+        r = nr
+
+    lo, hi = -0.9999, 10.0
+    f_lo, f_hi = npv(lo), npv(hi)
+    if not (np.isfinite(f_lo) and np.isfinite(f_hi)) or f_lo * f_hi > 0:
+        return None
+    for _ in range(200):
+        mid = (lo + hi) / 2
+        f_mid = npv(mid)
+        if f_lo * f_mid <= 0:
+            hi = mid
+        else:
+            lo, f_lo = mid, f_mid
+    return (lo + hi) / 2
+
+
+# ───────────────────────────── public API ─────────────────────────────
+def _range_start(rng: str, today: date) -> Optional[date]:
+    if rng == "1w":
+        return today - timedelta(days=7)
+    if rng == "1m":
+        return today - timedelta(days=30)
+    if rng == "ytd":
+        return date(today.year, 1, 1)
+    if rng == "1y":
+        return today - timedelta(days=365)
+    return None
+
+
+def _live_equity(p: Portfolio) -> float:
+    total = float(p.cash or 0)
+    for h in p.holdings.all():
+        total += float(h.quantity) * float(get_latest_price(h.ticker) or 0.0)
+    return total
+
+
+def _inception(p: Portfolio, first=None, net=None) -> Optional[PerformanceDay]:
+    """
+    Unsaved pseudo-row for the state just before the first trade (growth 1.0).
+    *first*/*net* (first execution time, summed cash_delta) skip the query
+    when the caller already aggregated them.
+    """
+    if first is None:
+        agg = p.trades.aggregate(first=Min("executed_at"), net=Sum("cash_delta"))
+        first, net = agg["first"], agg["net"]
+    if first is None:
+        return None
+    return PerformanceDay(
+        portfolio=p, date=first.date() - timedelta(days=1),
+        equity=Decimal(str(p.cash)) - (net or Decimal("0")), growth=1.0,
+    )
+
+
+def _returns(rng: str, today: date, last: PerformanceDay, base: PerformanceDay,
+             flows: List[Tuple[date, float]], eq_now: float) -> dict:
+    """The TWR/MWR math of portfolio_returns; *flows* are the cash flows after base.date, oldest first."""
+    # flows after the last stored row belong to the live step
+    pending_flow = sum(a for d, a in flows if d > last.date)
+    growth_now = last.growth * (1.0 + _twr_step(float(last.equity), eq_now, pending_flow))
+    twr = growth_now / base.growth - 1.0 if base.growth else None
+
+    pts: List[Tuple[date, float]] = []
+    if float(base.equity) != 0:
+        pts.append((base.date, -float(base.equity)))
+    pts.extend((d, -a) for d, a in flows)
+    pts.append((today, eq_now))
+
+    t0 = pts[0][0]
+    amounts = np.array([a for _, a in pts], dtype=float)
+    years = np.array([(d - t0).days / 365.0 for d, _ in pts], dtype=float)
+    mwr = _xirr(amounts, years) if years[-1] > 0 else None
+    if mwr is not None and years[-1] < 1.0:
+        # GIPS convention: don't annualize periods shorter than a year
+        mwr = float((1.0 + mwr) ** years[-1] - 1.0)
+
+    return {
+        "range": rng,
+        "twr": twr,
+        "mwr": mwr,
+        "as_of": today.isoformat(),
+    }
+
+
+def portfolio_returns(p: Portfolio, rng: str = "all", equity_now: Optional[float] = None) -> dict:
+    """
+    Time-weighted (TWR) and money-weighted (MWR, annualized IRR) return over *rng*.
+    Read-only: it uses the PerformanceDay rows as stored, which sync_performance
+    keeps current (the nightly command and the outbox after trades/imports).
+
+    TWR chains the stored growth index: growth(now) / growth(day before start),
+    where "now" is one extra step from the last stored row using *equity_now*
+    (live equity; fetched if not given). MWR treats the starting equity and
+    every CASH_IN/CASH_OUT as investments and today's equity as terminal value;
+    it is annualized only when the range spans at least a year.
+    """
+    today = date.today()
+    inception = _inception(p)
+    if inception is None:
+        return {"range": rng, "twr": None, "mwr": None, "as_of": today.isoformat()}
+    last = p.performance_days.order_by("-date").first() or inception
+
+    start = _range_start(rng, today)
+    base = None
+    if start is not None:
+        base = p.performance_days.filter(date__lt=start).order_by("-date").first()
+    base = base or inception
+
+    flows = (
+        p.trades.filter(type__in=_FLOW_TYPES, executed_at__date__gt=base.date)
+        .order_by("executed_at", "id").values_list("executed_at", "cash_delta")
+    )
+    eq_now = _live_equity(p) if equity_now is None else float(equity_now)
+    return _returns(rng, today, last, base, [(ts.date(), float(a)) for ts, a in flows], eq_now)
+
+
+def returns_since_inception(portfolios: Sequence[Portfolio], equity_now: Dict[int, float]) -> Dict[int, dict]:
+    """
+    portfolio_returns(p, "all", equity_now[p.pk]) for a page of portfolios,
+    keyed by pk, in three queries (trade aggregates, latest stored rows, cash
+    flows) however many portfolios there are.
+    """
+    today = date.today()
+    ids = [p.pk for p in portfolios]
+    aggs = {
+        row["portfolio"]: row
+        for row in Trade.objects.filter(portfolio__in=ids).values("portfolio")
+        .annotate(first=Min("executed_at"), net=Sum("cash_delta"))
+    }
+    newest = PerformanceDay.objects.filter(portfolio=OuterRef("portfolio")).order_by("-date").values("date")[:1]
+    lasts = {d.portfolio_id: d for d in PerformanceDay.objects.filter(portfolio__in=ids, date=Subquery(newest))}
+    flows: Dict[int, List[Tuple[date, float]]] = {}
+    rows = (
+        Trade.objects.filter(portfolio__in=ids, type__in=_FLOW_TYPES)
+        .order_by("executed_at", "id").values_list("portfolio", "executed_at", "cash_delta")
+    )
+    for pid, ts, a in rows:
+        flows.setdefault(pid, []).append((ts.date(), float(a)))
+
+    out: Dict[int, dict] = {}
+    for p in portfolios:
+        agg = aggs.get(p.pk)
+        if agg is None:
+            out[p.pk] = {"range": "all", "twr": None, "mwr": None, "as_of": today.isoformat()}
+            continue
+        inception = _inception(p, agg["first"], agg["net"])
+        last = lasts.get(p.pk, inception)
+        out[p.pk] = _returns("all", today, last, inception, flows.get(p.pk, []), float(equity_now[p.pk]))
+    return out
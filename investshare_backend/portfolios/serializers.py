@@ -1,87 +1,78 @@
 # investshare_backend/portfolios/serializers.py
 from __future__ import annotations
-from market.prices import _latest_trade
-import math
-from decimal import Decimal
-from typing import Optional, Tuple
+from typing import Dict, Optional
 
-import yfinance as yf
+from django.db.models import Sum
 from rest_framework import serializers
 
+from .lots import FILL_TYPES
 from .models import Portfolio, Trade
-from market.prices import _latest_trade, get_latest_price 
+from .performance import portfolio_returns, returns_since_inception
+from .valuation import PortfolioValuation, QuoteBook
 
 # ───────────────────────────── helpers ──────────────────────────────
-def _dec(x) -> Optional[Decimal]:
+def _render_state(serializer: serializers.Serializer) -> tuple[QuoteBook, Dict[int, PortfolioValuation]]:
     """
-    Convert *x* to Decimal – return None on NaN / ±Inf / bad input.
-    This keeps any math/JSON serialisation safe.
+    Quote book + valuations shared by the whole render, kept on the root
+    serializer. A view that already fetched the quotes passes its book as
+    context["quote_book"].
     """
-    try:
-        if x is None:
-            return None
-        if isinstance(x, float) and (math.isnan(x) or math.isinf(x)):
-            return None
-        return Decimal(str(x))
-    except Exception:
-        return None
-
-
-def _live_prev_open(symbol: str) -> Tuple[Optional[Decimal],
-                                          Optional[Decimal],
-                                          Optional[Decimal]]:
-    """
-    Return (latest_price, prev_close, today_open) as Decimals or None.
+    root = serializer.root
+    if not hasattr(root, "_quote_book"):
+        root._quote_book = root.context.get("quote_book") or QuoteBook()
+        root._valuations = {}
+    return root._quote_book, root._valuations
+
+
+def _valuation(serializer: serializers.Serializer, obj: Portfolio) -> PortfolioValuation:
+    """Valued once per portfolio per render, however many fields read it."""
+    quotes, valuations = _render_state(serializer)
+    if obj.pk not in valuations:
+        valuations[obj.pk] = PortfolioValuation(obj, quotes)
+    return valuations[obj.pk]
+
+
+def _returns(serializer: serializers.Serializer, obj: Portfolio) -> dict:
+    """Since-inception returns: batched per page by ValuationListSerializer, else this portfolio's own queries."""
+    batched = getattr(serializer.root, "_returns", {})
+    if obj.pk in batched:
+        return batched[obj.pk]
+    return portfolio_returns(obj, "all", equity_now=_valuation(serializer, obj).total_value)
 
-    • latest_price comes from the most-recent trade **including
-      pre-/post-market**, then fast_info, then daily close cache.
+
+class ValuationListSerializer(serializers.ListSerializer):
+    """
+    Quotes every ticker on the page in one batch before any row renders, and
+    computes the page's returns in a fixed number of queries.
     """
-    price = prev_cls = today_open = None
-
-    # ── ❶ after-hours aware: 1-min bar (same as trade execution) ──
-    lt = _latest_trade(symbol)          # (ts, price) or None
-    if lt:
-        price = lt[1]
-
-    # ── ❷ cheap fast_info -------------------------------------------------
-    try:
-        fi = (yf.Ticker(symbol).fast_info) or {}
-        price = price or fi.get("postMarketPrice") or fi.get("last_price") \
-                or fi.get("regularMarketPrice")
-
-        prev_cls   = fi.get("previous_close") or fi.get("regularMarketPreviousClose")
-        today_open = fi.get("open")           or fi.get("regularMarketOpen")
-    except Exception:
-        pass
-
-    # ── ❸ tiny history fall-backs -----------------------------------------
-    try:
-        if price is None or today_open is None:
-            hist_1d = yf.Ticker(symbol).history(period="1d", interval="1m",
-                                                actions=False, auto_adjust=False)
-            if not hist_1d.empty:
-                today_open = today_open or hist_1d["Open"].iloc[0]
-                price      = price      or hist_1d["Close"].iloc[-1]
-
-        if prev_cls is None:
-            hist_5d = yf.Ticker(symbol).history(period="5d", interval="1d",
-                                                actions=False, auto_adjust=False)
-            if not hist_5d.empty:
-                prev_cls = hist_5d["Close"].iloc[-2 if len(hist_5d) >= 2 else -1]
-    except Exception:
-        pass
-
-    # ── ❹ last-resort cached close ----------------------------------------
-    if price is None:
-        price = get_latest_price(symbol)
-
-    return _dec(price), _dec(prev_cls), _dec(today_open)
+
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, "all") else data)
+        quotes, _ = _render_state(self)
+        quotes.prefetch(h.ticker for p in items for h in p.holdings.all())
+        self.root._returns = returns_since_inception(
+            items, {p.pk: _valuation(self, p).total_value for p in items},
+        )
+        return super().to_representation(items)
 
 # ───────────────────────────── serializers ─────────────────────────
 class TradeSerializer(serializers.ModelSerializer):
+    realized_pnl = serializers.SerializerMethodField()
+
     class Meta:
         model  = Trade
-        fields = ["id", "type", "ticker", "quantity", "price", "cash_delta", "executed_at"]
+        fields = ["id", "type", "ticker", "quantity", "price", "cash_delta", "executed_at",
+                  "realized_pnl"]
+
+    def get_realized_pnl(self, obj: Trade) -> Optional[float]:
+        # annotated by TradeViewSet; a freshly executed trade falls back to one query
+        if hasattr(obj, "realized_pnl"):
+            pnl = obj.realized_pnl
+        elif obj.type in FILL_TYPES:
+            pnl = obj.lot_closures.aggregate(s=Sum("realized_pnl"))["s"]
+        else:
+            pnl = None
+        return float(pnl) if pnl is not None else None
 
 
 class PortfolioSerializer(serializers.ModelSerializer):
@@ -89,122 +80,50 @@ class PortfolioSerializer(serializers.ModelSerializer):
     total_value    = serializers.SerializerMethodField()
     todays_change  = serializers.SerializerMethodField()
     holdings       = serializers.SerializerMethodField()
+    returns        = serializers.SerializerMethodField()
 
     class Meta:
         model  = Portfolio
         fields = [
             "id", "name", "visibility", "cash", "owner_username",
-            "total_value", "todays_change", "holdings", "created_at",
+            "total_value", "todays_change", "holdings", "created_at", "lot_method",
+            "returns",
         ]
+        list_serializer_class = ValuationListSerializer
 
     # ── live positions table ───────────────────────────────────────
     def get_holdings(self, obj: Portfolio):
-        rows = []
-        for h in obj.holdings.all():
-            q     = _dec(h.quantity) or Decimal("0")
-            avg   = _dec(h.avg_cost) or Decimal("0")
-            price, _prev, openp = _live_prev_open(h.ticker)   # ← already live/after-hours aware
-
-            value = pl_abs = pl_pct = day_abs = day_pct = None
-            if price is not None:
-                value = q * price
-                if avg:
-                    pl_abs = q * (price - avg)
-                    pl_pct = (price - avg) / avg * Decimal("100")
-                if openp:
-                    day_abs = q * (price - openp)
-                    day_pct = (price - openp) / openp * Decimal("100")
-
-            rows.append(
-                {
-                    "id":        h.id,
-                    "ticker":    h.ticker,
-                    "quantity":  str(h.quantity),
-                    "avg_cost":  str(h.avg_cost),
-                    "price":     float(price) if price is not None else None,   # ← NEW
-                    "value":     float(value)   if value   is not None else None,
-                    "pl_abs":    float(pl_abs)  if pl_abs  is not None else None,
-                    "pl_pct":    float(pl_pct)  if pl_pct  is not None else None,
-                    "day_abs":   float(day_abs) if day_abs is not None else None,
-                    "day_pct":   float(day_pct) if day_pct is not None else None,
-                }
-            )
-        return rows
+        return _valuation(self, obj).holdings
 
     # ── live total equity ───────────────────────────────────────────
     def get_total_value(self, obj: Portfolio) -> float:
-        total = _dec(obj.cash) or Decimal("0")
-        for h in obj.holdings.all():
-            qty = _dec(h.quantity) or Decimal("0")
-            px, _, _ = _live_prev_open(h.ticker)
-            if px:
-                total += qty * px
-        return float(total)
+        return _valuation(self, obj).total_value
+
+    # ── flow-adjusted performance (TWR / MWR since inception) ─────
+    def get_returns(self, obj: Portfolio):
+        return _returns(self, obj)
 
     # ── intraday portfolio change (open → now) ──────────────────────
     def get_todays_change(self, obj: Portfolio):
-        now_val  = _dec(obj.cash) or Decimal("0")
-        open_val = _dec(obj.cash) or Decimal("0")
-
-        for h in obj.holdings.all():
-            qty = _dec(h.quantity) or Decimal("0")
-            price, _prev, openp = _live_prev_open(h.ticker)
-            if price:
-                now_val += qty * price
-            if openp:
-                open_val += qty * openp
-
-        if open_val == 0:
-            return {"abs": 0.0, "pct": 0.0}
-
-        diff = now_val - open_val
-        pct  = diff / open_val * Decimal("100")
-        return {"abs": float(diff), "pct": float(pct)}
+        return _valuation(self, obj).todays_change
 
 class PublicPortfolioSerializer(serializers.ModelSerializer):
     owner_username = serializers.CharField(source="owner.username", read_only=True)
     total_value    = serializers.SerializerMethodField()
     todays_change  = serializers.SerializerMethodField()
+    twr            = serializers.SerializerMethodField()
 
     class Meta:
         model  = Portfolio
-        fields = ["id", "owner_username", "total_value", "todays_change"]
-
-    # simple per-request cache to avoid duplicate yfinance calls per ticker
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._quote_cache: Dict[str, Tuple[Optional[Decimal], Optional[Decimal], Optional[Decimal]]] = {}
-
-    def _quote(self, symbol: str) -> Tuple[Optional[Decimal], Optional[Decimal], Optional[Decimal]]:
-        if symbol not in self._quote_cache:
-            self._quote_cache[symbol] = _live_prev_open(symbol)
-        return self._quote_cache[symbol]
+        fields = ["id", "owner_username", "total_value", "todays_change", "twr"]
+        list_serializer_class = ValuationListSerializer
 
     def get_total_value(self, obj: Portfolio) -> float:
-        tot = _dec(obj.cash) or Decimal("0")
-        # use the same live price source as todays_change for consistency
-        for h in obj.holdings.all():
-            qty = _dec(h.quantity) or Decimal("0")
-            price, _, _ = self._quote(h.ticker)
-            if price:
-                tot += qty * price
-        return float(tot)
+        return _valuation(self, obj).total_value
 
     def get_todays_change(self, obj: Portfolio):
-        now_val  = _dec(obj.cash) or Decimal("0")
-        open_val = _dec(obj.cash) or Decimal("0")
-
-        for h in obj.holdings.all():
-            qty = _dec(h.quantity) or Decimal("0")
-            price, _prev, openp = self._quote(h.ticker)
-            if price:
-                now_val += qty * price
-            if openp:
-                open_val += qty * openp
-
-        if open_val == 0:
-            return {"abs": 0.0, "pct": 0.0}
-
-        diff = now_val - open_val
-        pct  = (diff / open_val) * Decimal("100")
-        return {"abs": float(diff), "pct": float(pct)}
+        return _valuation(self, obj).todays_change
+
+    def get_twr(self, obj: Portfolio) -> Optional[float]:
+        """Since-inception time-weighted return (cash flows don't count as gains)."""
+        return _returns(self, obj)["twr"]
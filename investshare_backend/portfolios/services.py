@@ -3,11 +3,15 @@ from __future__ import annotations
 
 from decimal import Decimal
 from datetime import date
+from typing import Dict, List
 from django.db import transaction
 from django.utils import timezone
 
 from .models import Portfolio, Holding, Trade
-from market.models import PriceSnapshot
+from .lots import FILL_TYPES, apply_trade_to_lots
+from .outbox import emit
+from investshare.routers import pin_to_primary
+from market.money import micros, mul, to_decimal
 from market.prices import get_trade_price, get_latest_price
 
 
@@ -44,6 +48,8 @@ def execute_trade(
     """
     # lock the portfolio row
     portfolio = Portfolio.objects.select_for_update().get(pk=portfolio.pk)
+    # the owner's next reads must see this trade, not a lagging replica
+    transaction.on_commit(lambda: pin_to_primary(portfolio.owner_id))
 
     if trade_type in ("BUY", "SELL"):
         if not ticker:
@@ -130,6 +136,9 @@ def execute_trade(
                 executed_at=timezone.now(),
             )
 
+        # consume/open tax lots for this fill (realized P&L lives on LotClosure)
+        apply_trade_to_lots(portfolio, trade)
+
         # finalize qty
         holding.quantity = q
 
@@ -140,19 +149,11 @@ def execute_trade(
             holding.save()
 
         # Save portfolio cash
-        portfolio.save(update_fields=["cash"])
-
-        # Upsert a snapshot for TODAY so downstream charts/allocations have a fresh point
-        try:
-            PriceSnapshot.objects.update_or_create(
-                ticker=ticker,
-                date=date.today(),
-                defaults={"close": float(px)},
-            )
-        except Exception:
-            # non-fatal
-            pass
+        portfolio.version += 1
+        portfolio.save(update_fields=["cash", "version"])
 
+        # snapshot upsert runs after commit (portfolios/outbox.py)
+        _emit_trade(trade, px)
         return trade
 
     elif trade_type in ("CASH_IN", "CASH_OUT"):
@@ -170,20 +171,91 @@ def execute_trade(
             cash_delta=delta,
             executed_at=timezone.now(),
         )
-        portfolio.save(update_fields=["cash"])
+        portfolio.version += 1
+        portfolio.save(update_fields=["cash", "version"])
+        _emit_trade(trade, None)
         return trade
 
     else:
         raise ValueError("Unsupported trade type")
 
 
+def _emit_trade(trade: Trade, px: Decimal | None) -> None:
+    emit(
+        "trade.executed",
+        portfolio_id=trade.portfolio_id,
+        trade_id=trade.pk,
+        ticker=trade.ticker or None,
+        price=str(px) if px is not None else None,
+        date=date.today().isoformat(),
+    )
+
+
 def portfolio_equity(portfolio: Portfolio) -> Decimal:
     """
     Current equity = cash + Σ(quantity * latest_price).
     (Uses latest price; charts/allocations can use snapshots + intraday as needed.)
     """
-    total = _D(portfolio.cash)
+    total = micros(portfolio.cash) or 0
     for h in Holding.objects.filter(portfolio=portfolio):
-        price = _D(get_latest_price(h.ticker))
-        total += _D(h.quantity) * price
-    return total
+        total += mul(micros(h.quantity) or 0, micros(get_latest_price(h.ticker)) or 0)
+    return to_decimal(total)
+
+
+# ───────────────────────── ledger replay (bulk paths) ─────────────────────────
+def _apply_fill(q: Decimal, avg: Decimal, side: str, qty: Decimal, px: Decimal) -> tuple[Decimal, Decimal]:
+    """
+    Pure position update for one fill – same long/short/cross-through-zero rules
+    as execute_trade(), without cash checks or DB access.
+    """
+    if side in ("BUY", "SHORT_COVER"):
+        if q < 0:
+            cover_qty = min(qty, -q)
+            q = q + cover_qty
+            remaining_buy = qty - cover_qty
+            if remaining_buy > 0:
+                q = remaining_buy
+                avg = px
+        else:
+            avg = _weighted_avg(abs(q), avg, qty, px)
+            q = q + qty
+    else:  # SELL
+        if q > 0:
+            sell_from_long = min(qty, q)
+            q = q - sell_from_long
+            remaining_sell = qty - sell_from_long
+        else:
+            remaining_sell = qty
+        if remaining_sell > 0:
+            old_abs = abs(q)
+            q = q - remaining_sell
+            avg = px if old_abs == 0 else _weighted_avg(old_abs, avg, remaining_sell, px)
+    return q, avg
+
+
+def rebuild_holdings(portfolio: Portfolio) -> List[Holding]:
+    """
+    Recompute every Holding of *portfolio* from its full trade ledger.
+
+    One query pulls the ledger as tuples, positions are folded in memory per
+    ticker, and the holdings table is rewritten with a single bulk_create.
+    Call inside a transaction.
+    """
+    state: Dict[str, tuple[Decimal, Decimal]] = {}
+    ledger = (
+        Trade.objects
+        .filter(portfolio=portfolio, type__in=FILL_TYPES)
+        .order_by("executed_at", "id")
+        .values_list("ticker", "type", "quantity", "price")
+    )
+    zero = Decimal("0")
+    for ticker, side, qty, px in ledger:
+        q, avg = state.get(ticker, (zero, zero))
+        state[ticker] = _apply_fill(q, avg, side, qty, px)
+
+    Holding.objects.filter(portfolio=portfolio).delete()
+    return Holding.objects.bulk_create([
+        Holding(portfolio=portfolio, ticker=t, quantity=q, avg_cost=avg)
+        for t, (q, avg) in state.items()
+        if q != 0
+    ])
@@ -1,3 +1,634 @@
-from django.test import TestCase
+import asyncio
+import json
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from . import analytics, exports, imports, outbox, payloads, performance
+from .lots import apply_trade_to_lots, open_lots, rebuild_lots, realized_pnl
+from .models import Holding, Lot, LotClosure, OutboxEvent, PerformanceDay, Portfolio, Trade
+from .valuation import PortfolioValuation, QuoteBook
+from market.latency import QuoteTimeout
+from market.models import PriceSnapshot
+from market.provider import pd
+from investshare import routers
+
+User = get_user_model()
+
+
+def _at(d: date) -> datetime:
+    return datetime.combine(d, time(15, 0), tzinfo=dt_timezone.utc)
+
+
+def _portfolio(name: str, cash="0", **kwargs) -> Portfolio:
+    user = User.objects.create_user(username=name, email=f"{name}@example.com", password="pw")
+    return Portfolio.objects.create(owner=user, cash=Decimal(cash), **kwargs)
+
+
+def _trade(p: Portfolio, type: str, when: date, cash_delta="0", ticker="", quantity="0", price="0") -> Trade:
+    return Trade.objects.create(
+        portfolio=p, type=type, ticker=ticker, quantity=Decimal(quantity),
+        price=Decimal(price), cash_delta=Decimal(cash_delta), executed_at=_at(when),
+    )
+
+
+class ReturnsTests(TestCase):
+    def setUp(self):
+        self.today = date.today()
+        self.p = _portfolio("alice", cash="1000")
+        _trade(self.p, "CASH_IN", self.today - timedelta(days=400), cash_delta="1000")
+        PerformanceDay.objects.create(
+            portfolio=self.p, date=self.today - timedelta(days=1),
+            equity=Decimal("1100"), growth=1.1,
+        )
+
+    def test_twr_chains_stored_growth_with_the_live_step(self):
+        r = performance.portfolio_returns(self.p, "all", equity_now=1210)
+        self.assertAlmostEqual(r["twr"], 0.21)
+        # one deposit 400 days ago, 1210 today: annualized IRR
+        self.assertAlmostEqual(r["mwr"], 1.21 ** (365 / 400) - 1, places=8)
+
+    def test_pending_deposit_is_not_a_gain(self):
+        _trade(self.p, "CASH_IN", self.today, cash_delta="500")
+        r = performance.portfolio_returns(self.p, "all", equity_now=1600)
+        self.assertAlmostEqual(r["twr"], 0.1)
+
+    def test_no_trades_means_no_returns(self):
+        r = performance.portfolio_returns(_portfolio("bob"), "all", equity_now=0)
+        self.assertIsNone(r["twr"])
+        self.assertIsNone(r["mwr"])
+
+    def test_xirr(self):
+        self.assertAlmostEqual(performance._xirr(np.array([-100.0, 110.0]), np.array([0.0, 1.0])), 0.1)
+        self.assertAlmostEqual(
+            performance._xirr(np.array([-100.0, -100.0, 231.0]), np.array([0.0, 1.0, 2.0])), 0.1, places=6,
+        )
+        self.assertIsNone(performance._xirr(np.array([-100.0, -5.0]), np.array([0.0, 1.0])))
+
+    def test_page_batch_matches_single_portfolio(self):
+        other = _portfolio("carol", cash="300")
+        _trade(other, "CASH_IN", self.today - timedelta(days=30), cash_delta="500")
+        _trade(other, "CASH_OUT", self.today - timedelta(days=10), cash_delta="-200")
+        empty = _portfolio("dave")
+        equity = {self.p.pk: 1210.0, other.pk: 320.0, empty.pk: 0.0}
+        batch = performance.returns_since_inception([self.p, other, empty], equity)
+        for p in (self.p, other, empty):
+            self.assertEqual(batch[p.pk], performance.portfolio_returns(p, "all", equity_now=equity[p.pk]))
+
+
+class PortfolioListQueryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(_portfolio("viewer").owner)
+
+    def _add(self, n: int) -> None:
+        for i in range(n):
+            p = _portfolio(f"user{Portfolio.objects.count()}-{i}", cash="100")
+            _trade(p, "CASH_IN", date.today() - timedelta(days=5), cash_delta="100")
+
+    def _list_queries(self, url: str) -> int:
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_returns_cost_a_fixed_number_of_queries_per_page(self):
+        # count, page, holdings prefetch, then the page's returns in three
+        self._add(2)
+        with self.assertNumQueries(6):
+            self.client.get("/api/portfolios/")
+        self._add(8)
+        with self.assertNumQueries(6):
+            body = self.client.get("/api/portfolios/").json()
+        self.assertEqual(len(body["results"]), 11)
+        self.assertTrue(all(row["returns"]["twr"] is not None for row in body["results"] if row["cash"] == "100.00"))
+
+    def test_public_list_does_not_grow_with_the_page(self):
+        self._add(2)
+        small = self._list_queries("/api/public-portfolios/")
+        self._add(8)
+        self.assertEqual(self._list_queries("/api/public-portfolios/"), small)
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.seen = []
+        outbox.HANDLERS["test.record"] = [lambda payload: self.seen.append(payload["n"])]
+
+    def tearDown(self):
+        outbox.HANDLERS.pop("test.record", None)
+
+    def test_worker_runs_due_events_in_emit_order(self):
+        for n in range(3):
+            outbox.emit("test.record", n=n)
+        later = outbox.emit("test.record", n=99)
+        OutboxEvent.objects.filter(pk=later.pk).update(available_at=now() + timedelta(hours=1))
+        self.assertEqual(outbox.run_outbox_batch(), 3)
+        self.assertEqual(self.seen, [0, 1, 2])
+        self.assertEqual(outbox.due_events(10), [])
+
+    def test_leased_events_are_skipped_until_the_lease_lapses(self):
+        event = outbox.emit("test.record", n=1)
+        OutboxEvent.objects.filter(pk=event.pk).update(started_at=now())
+        self.assertEqual(outbox.due_events(10), [])
+        OutboxEvent.objects.filter(pk=event.pk).update(started_at=now() - outbox.OUTBOX_LEASE - timedelta(seconds=1))
+        self.assertEqual(outbox.due_events(10), [event.pk])
+
+    def test_failed_event_backs_off_and_keeps_the_error(self):
+        outbox.HANDLERS["test.record"].append(lambda payload: 1 / 0)
+        event = outbox.emit("test.record", n=1)
+        with self.assertLogs("portfolios.outbox", "WARNING"):
+            self.assertFalse(outbox.process_event(event.pk))
+        event.refresh_from_db()
+        self.assertIsNone(event.processed_at)
+        self.assertEqual(event.attempts, 1)
+        self.assertIn("ZeroDivisionError", event.last_error)
+        self.assertGreater(event.available_at, now())
+        self.assertEqual(outbox.due_events(10), [])
+
+    def test_processed_events_are_pruned_after_retention(self):
+        old, recent, pending = (outbox.emit("test.record", n=n) for n in range(3))
+        OutboxEvent.objects.filter(pk=old.pk).update(processed_at=now() - timedelta(days=8))
+        OutboxEvent.objects.filter(pk=recent.pk).update(processed_at=now() - timedelta(days=1))
+        self.assertEqual(outbox.prune_events(), 1)
+        self.assertEqual(set(OutboxEvent.objects.values_list("pk", flat=True)), {recent.pk, pending.pk})
+
+    def test_events_wait_for_the_worker_by_default(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            outbox.emit("test.record", n=1)
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.seen, [])
+
+    @override_settings(OUTBOX_RUN_INLINE=True)
+    def test_inline_mode_runs_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            event = outbox.emit("test.record", n=1)
+            self.assertEqual(self.seen, [])
+        self.assertEqual(self.seen, [1])
+        event.refresh_from_db()
+        self.assertIsNotNone(event.processed_at)
+
+
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.p = _portfolio("erin", cash="100")
+        Holding.objects.create(portfolio=self.p, ticker="AAPL", quantity=Decimal("2"), avg_cost=Decimal("5"))
+        Holding.objects.create(portfolio=self.p, ticker="MSFT", quantity=Decimal("1"), avg_cost=Decimal("5"))
+        PriceSnapshot.objects.create(ticker="MSFT", date=date.today() - timedelta(days=1), close=Decimal("400"))
+
+    def _bars(self, ticker, start_dt, end_dt):
+        if ticker != "AAPL":
+            return None  # throttled / timed out
+        idx = pd.date_range(end_dt - timedelta(minutes=2), periods=3, freq="1min")
+        return pd.DataFrame({"Close": [10.0, 11.0, 12.0]}, index=idx)
+
+    def test_intraday_chart_carries_missing_bars_and_flags_them(self):
+        with mock.patch("portfolios.views.intraday_closes", side_effect=self._bars):
+            r = self.client.get(f"/api/portfolios/{self.p.pk}/chart/?range=1d&format=columnar")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r["X-Stale-Tickers"], "MSFT")
+        body = r.json()
+        self.assertEqual(body["v"], [520.0, 522.0, 524.0])
+        self.assertEqual(body["stale"], ["MSFT"])
+
+    def test_allocations_quote_every_holding(self):
+        quotes = {"AAPL": 10.0, "MSFT": 20.0}
+        with mock.patch("portfolios.views.get_latest_price", side_effect=quotes.get), \
+                mock.patch("portfolios.views.get_change_24h_pct", return_value=1.5):
+            r = self.client.get(f"/api/portfolios/{self.p.pk}/allocations/")
+        self.assertEqual(r.status_code, 200)
+        body = r.json()
+        self.assertEqual(body["total"], 140.0)
+        self.assertEqual({row["ticker"] for row in body["data"]}, {"AAPL", "MSFT", "CASH"})
+
+    def test_private_portfolio_is_hidden_from_guests(self):
+        Portfolio.objects.filter(pk=self.p.pk).update(visibility="private")
+        self.assertEqual(self.client.get(f"/api/portfolios/{self.p.pk}/chart/").status_code, 404)
+
+
+class HoldingsRiskTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.p = _portfolio("frank")
+        self.days = [date.today() - timedelta(days=n) for n in range(6, 0, -1)]
+        # AAA: dividends folded into return_factor, so its level is twice the close
+        self._closes("AAA", [10, 11, 12, 11, 12, 13], return_factor=2.0)
+        self._closes("BBB", [20, 20, 21, 22, 21, 22])
+        for t in ("AAA", "BBB"):
+            Holding.objects.create(portfolio=self.p, ticker=t, quantity=Decimal("1"), avg_cost=Decimal("1"))
+
+    def _closes(self, ticker, closes, return_factor=1.0, days=None):
+        for d, c in zip(days or self.days, closes):
+            PriceSnapshot.objects.create(ticker=ticker, date=d, close=Decimal(c), return_factor=return_factor)
+
+    def _rows(self):
+        return {h["ticker"]: h for h in analytics.compute_holdings_risk(self.p, "all")["holdings"]}
+
+    def test_weights_are_market_values(self):
+        rows = self._rows()
+        self.assertAlmostEqual(rows["AAA"]["weight"], 13 / 35)
+        self.assertAlmostEqual(rows["BBB"]["weight"], 22 / 35)
+
+    def test_contributions(self):
+        risk = analytics.compute_holdings_risk(self.p, "all")
+        rows = {h["ticker"]: h for h in risk["holdings"]}
+        self.assertAlmostEqual(rows["AAA"]["return"], 0.3)
+        self.assertAlmostEqual(rows["BBB"]["return"], 0.1)
+        for h in rows.values():
+            self.assertAlmostEqual(h["contribution_to_return"], h["weight"] * h["return"])
+        self.assertAlmostEqual(sum(h["risk_share"] for h in rows.values()), 1.0)
+        self.assertAlmostEqual(sum(h["contribution_to_risk"] for h in rows.values()), risk["portfolio_volatility"])
+
+    def test_return_covers_each_holdings_own_history(self):
+        # CCC only has the last three days: the covariance uses those, its return all of them
+        self._closes("CCC", [50, 55, 60], days=self.days[-3:])
+        Holding.objects.create(portfolio=self.p, ticker="CCC", quantity=Decimal("1"), avg_cost=Decimal("1"))
+        risk = analytics.compute_holdings_risk(self.p, "all")
+        rows = {h["ticker"]: h for h in risk["holdings"]}
+        self.assertEqual(risk["observations"], 2)
+        self.assertAlmostEqual(rows["AAA"]["return"], 0.3)
+        self.assertAlmostEqual(rows["CCC"]["return"], 0.2)
+
+    def test_shrunk_covariance(self):
+        r = np.random.default_rng(20261019).normal(0, 0.01, size=(30, 4))
+        cov, delta = analytics._shrunk_covariance(r)
+        self.assertTrue(0.0 <= delta <= 1.0)
+        np.testing.assert_allclose(cov, cov.T)
+        self.assertTrue(np.all(np.linalg.eigvalsh(cov) > 0))
+        self.assertAlmostEqual(np.trace(cov), np.trace(np.cov(r, rowvar=False, bias=True)))
+
+
+class QuoteBookTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        today = date.today()
+        PriceSnapshot.objects.create(ticker="AAPL", date=today - timedelta(days=2), close=Decimal("90"))
+        PriceSnapshot.objects.create(ticker="AAPL", date=today - timedelta(days=1), close=Decimal("100"))
+
+    def test_timeout_falls_back_to_stored_closes(self):
+        with mock.patch("portfolios.valuation.hedged", side_effect=QuoteTimeout("batch_sessions")):
+            book = QuoteBook()
+            self.assertEqual(book.get("AAPL"), (100_000_000, 90_000_000, None))
+            self.assertEqual(book.get("ZZZZ"), (None, None, None))
+        self.assertEqual(book.stale, {"AAPL", "ZZZZ"})
+
+    def test_spent_budget_skips_the_fetch(self):
+        with mock.patch("portfolios.valuation.hedged") as fetch:
+            book = QuoteBook(budget=0)
+            book.prefetch(["AAPL"])
+        fetch.assert_not_called()
+        self.assertEqual(book.stale, {"AAPL"})
+
+
+class LotMatchingTests(TestCase):
+    def setUp(self):
+        self.p = _portfolio("gina", cash="100000")
+        self.day = date.today() - timedelta(days=30)
+
+    def _fill(self, type, quantity, price, ticker="AAPL"):
+        self.day += timedelta(days=1)
+        t = _trade(self.p, type, self.day, ticker=ticker, quantity=quantity, price=price)
+        apply_trade_to_lots(self.p, t)
+        return t
+
+    def _book(self):
+        return sorted(
+            (lot.side, float(lot.open_price), float(lot.remaining))
+            for lot in Lot.objects.filter(portfolio=self.p, remaining__gt=0)
+        )
+
+    def _closures(self):
+        return sorted(LotClosure.objects.filter(portfolio=self.p).values_list("open_price", "quantity", "realized_pnl"))
+
+    def test_fifo_closes_oldest_lots_first(self):
+        self._fill("BUY", "10", "100")
+        self._fill("BUY", "10", "120")
+        self._fill("SELL", "15", "130")
+        self.assertEqual(self._book(), [("long", 120.0, 5.0)])
+        self.assertEqual(realized_pnl(self.p)["total"], 10 * 30 + 5 * 10)
+
+    def test_lifo_closes_newest_lots_first(self):
+        self.p.lot_method = "LIFO"
+        self.p.save()
+        self._fill("BUY", "10", "100")
+        self._fill("BUY", "10", "120")
+        self._fill("SELL", "15", "130")
+        self.assertEqual(self._book(), [("long", 100.0, 5.0)])
+        self.assertEqual(realized_pnl(self.p)["total"], 10 * 10 + 5 * 30)
+
+    def test_selling_through_zero_opens_a_short_lot(self):
+        self._fill("BUY", "5", "100")
+        self._fill("SELL", "8", "90")
+        self.assertEqual(self._book(), [("short", 90.0, 3.0)])
+        self._fill("SHORT_COVER", "2", "80")
+        self._fill("BUY", "4", "85")
+        self.assertEqual(self._book(), [("long", 85.0, 3.0)])
+        self.assertEqual(realized_pnl(self.p)["total"], 5 * -10 + 2 * 10 + 1 * 5)
+        rows = open_lots(self.p, {"AAPL": 95.0})
+        self.assertEqual(rows[0]["unrealized_pnl"], 30.0)
+
+    def test_rebuild_replays_the_same_fills(self):
+        self._fill("BUY", "10", "100")
+        self._fill("SELL", "14", "110")
+        self._fill("SHORT_COVER", "3", "105")
+        self._fill("BUY", "6", "100", ticker="MSFT")
+        self._fill("SELL", "2", "120", ticker="MSFT")
+        _trade(self.p, "CASH_IN", self.day, cash_delta="50")
+        book, closures = self._book(), self._closures()
+        rebuild_lots(self.p)
+        self.assertEqual(self._book(), book)
+        self.assertEqual(self._closures(), closures)
+        self.assertIn(("short", 110.0, 1.0), book)
+
+    def test_backfill_migration_matches_rebuild(self):
+        from importlib import import_module
+        from django.apps import apps
+
+        backfill = import_module("portfolios.migrations.0008_backfill_lots").backfill_lots
+        self.p.lot_method = "LIFO"
+        self.p.save()
+        for type, qty, px in (("BUY", "10", "100"), ("BUY", "5", "90"), ("SELL", "18", "95"), ("SHORT_COVER", "2", "80")):
+            self._fill(type, qty, px)
+        book, closures = self._book(), self._closures()
+        backfill(apps, None)
+        self.assertEqual(self._book(), book)
+        self.assertEqual(self._closures(), closures)
+
+    def test_switching_lot_method_rematches(self):
+        self._fill("BUY", "10", "100")
+        self._fill("BUY", "10", "120")
+        self._fill("SELL", "15", "130")
+        client = APIClient()
+        client.force_authenticate(self.p.owner)
+        r = client.patch(f"/api/portfolios/{self.p.pk}/", {"lot_method": "LIFO"}, format="json")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(self._book(), [("long", 100.0, 5.0)])
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.p = _portfolio("frank", cash="500")
+        self.day = date(2026, 1, 5)
+        _trade(self.p, "CASH_IN", self.day, cash_delta="1000")
+        _trade(self.p, "BUY", self.day + timedelta(days=1), cash_delta="-500", ticker="AAPL", quantity="5", price="100")
+
+    def test_csv_header_then_ledger_in_order(self):
+        lines = list(exports.iter_trades_csv(self.p))
+        self.assertEqual(lines[0], ",".join(exports.EXPORT_FIELDS) + "\r\n")
+        self.assertEqual([line.split(",")[1] for line in lines[1:]], ["CASH_IN", "BUY"])
+
+    def test_async_rows_match_sync_rows(self):
+        async def collect(fmt):
+            return [line async for line in exports.EXPORTERS[fmt][1](self.p)]
+
+        for fmt, (rows, _, _) in exports.EXPORTERS.items():
+            self.assertEqual(async_to_sync(collect)(fmt), list(rows(self.p)))
+
+    def test_ndjson_endpoint_streams_one_object_per_trade(self):
+        r = self.client.get(f"/api/portfolios/{self.p.pk}/trades/export/?format=ndjson")
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r.streaming)
+        self.assertEqual(r["Content-Type"], "application/x-ndjson; charset=utf-8")
+        rows = [json.loads(line) for line in b"".join(r.streaming_content).decode().splitlines()]
+        self.assertEqual([row["type"] for row in rows], ["CASH_IN", "BUY"])
+        self.assertEqual(rows[1]["quantity"], "5.000000")
+
+    def test_csv_is_the_default_and_an_attachment(self):
+        r = self.client.get(f"/api/portfolios/{self.p.pk}/trades/export/")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r["Content-Disposition"], f'attachment; filename="portfolio-{self.p.pk}-trades.csv"')
+        self.assertEqual(len(b"".join(r.streaming_content).decode().splitlines()), 3)
+
+    def test_private_ledger_is_forbidden_to_others(self):
+        Portfolio.objects.filter(pk=self.p.pk).update(visibility="private")
+        self.assertEqual(self.client.get(f"/api/portfolios/{self.p.pk}/trades/export/").status_code, 403)
+
+
+class ImportTests(TestCase):
+    CSV = (
+        "Trade_Date,Side,Symbol,Qty,Fill_Price\n"
+        "2026-01-05,BUY,aapl,10,100\n"
+        "2026-01-02,buy,AAPL,2,90\n"
+        "2026-01-06,SELL,AAPL,4,110\n"
+    )
+
+    def setUp(self):
+        self.p = _portfolio("gina", cash="2000")
+
+    def test_parse_maps_broker_headers(self):
+        trades = imports.parse_fills_csv(self.CSV)
+        self.assertEqual([(t.type, t.ticker, t.quantity) for t in trades],
+                         [("BUY", "AAPL", 10), ("BUY", "AAPL", 2), ("SELL", "AAPL", 4)])
+        self.assertEqual([t.cash_delta for t in trades], [Decimal("-1000.00"), Decimal("-180.00"), Decimal("440.00")])
+
+    def test_parse_names_the_bad_line(self):
+        with self.assertRaisesMessage(ValueError, "line 3: quantity must be greater than 0"):
+            imports.parse_fills_csv("date,type,ticker,quantity,price\n2026-01-05,BUY,AAPL,1,1\n2026-01-05,BUY,AAPL,0,1\n")
+
+    def test_import_nets_fills_in_date_order(self):
+        self.assertEqual(imports.import_trades(self.p, imports.parse_fills_csv(self.CSV)), 3)
+        self.p.refresh_from_db()
+        self.assertEqual(self.p.cash, Decimal("1260.00"))
+        self.assertEqual(self.p.version, 1)
+        h = Holding.objects.get(portfolio=self.p)
+        self.assertEqual((h.ticker, h.quantity), ("AAPL", Decimal("8")))
+        self.assertEqual(Lot.objects.filter(portfolio=self.p).count(), 2)
+        self.assertTrue(OutboxEvent.objects.filter(topic="performance.sync").exists())
+
+    def test_overdrawn_import_rolls_back(self):
+        trades = imports.parse_fills_csv("date,type,ticker,quantity,price\n2026-01-05,BUY,AAPL,100,100\n")
+        with self.assertRaisesMessage(ValueError, "Not enough cash"):
+            imports.import_trades(self.p, trades)
+        self.p.refresh_from_db()
+        self.assertEqual(self.p.cash, Decimal("2000"))
+        self.assertFalse(Trade.objects.filter(portfolio=self.p).exists())
+        self.assertFalse(Holding.objects.filter(portfolio=self.p).exists())
+
+    def test_endpoint_rejects_a_bad_file_without_writing(self):
+        client = APIClient()
+        client.force_authenticate(self.p.owner)
+        upload = SimpleUploadedFile("fills.csv", b"date,type\n2026-01-05,TRANSFER\n", content_type="text/csv")
+        r = client.post(f"/api/portfolios/{self.p.pk}/trades/import/", {"file": upload}, format="multipart")
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.json()["error"]["code"], "import_failed")
+        self.assertFalse(Trade.objects.filter(portfolio=self.p).exists())
+
+    def test_endpoint_imports_for_the_owner_only(self):
+        upload = SimpleUploadedFile("fills.csv", self.CSV.encode(), content_type="text/csv")
+        client = APIClient()
+        client.force_authenticate(_portfolio("hank").owner)
+        r = client.post(f"/api/portfolios/{self.p.pk}/trades/import/", {"file": upload}, format="multipart")
+        self.assertEqual(r.status_code, 403)
+        client.force_authenticate(self.p.owner)
+        upload.seek(0)
+        with mock.patch("portfolios.valuation.get_batch_sessions", return_value={"AAPL": (110.0, 100.0, 105.0)}):
+            r = client.post(f"/api/portfolios/{self.p.pk}/trades/import/", {"file": upload}, format="multipart")
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual(r.json()["imported"], 3)
+        self.assertEqual(r.json()["portfolio"]["cash"], "1260.00")
+
+
+class ValuationTests(TestCase):
+    QUOTES = {"AAPL": (110.0, 100.0, 105.0), "MSFT": (400.0, 390.0, 380.0)}
+
+    def setUp(self):
+        cache.clear()
+        fetch = mock.patch("portfolios.valuation.get_batch_sessions",
+                           side_effect=lambda syms: {s: self.QUOTES[s] for s in syms})
+        self.fetch = fetch.start()
+        self.addCleanup(fetch.stop)
+
+    def _holding(self, p, ticker, qty, avg):
+        Holding.objects.create(portfolio=p, ticker=ticker, quantity=Decimal(qty), avg_cost=Decimal(avg))
+
+    def test_holding_rows_and_day_change(self):
+        p = _portfolio("ivan", cash="90")
+        self._holding(p, "AAPL", "2", "50")
+        v = PortfolioValuation(p, QuoteBook())
+        row = v.holdings[0]
+        self.assertEqual((row["value"], row["pl_abs"], row["pl_pct"]), (220.0, 120.0, 120.0))
+        self.assertEqual(row["day_abs"], 10.0)
+        self.assertAlmostEqual(row["day_pct"], 5 / 105 * 100)
+        self.assertFalse(row["stale"])
+        self.assertEqual(v.total_value, 310.0)
+        self.assertEqual(v.todays_change, {"abs": 10.0, "pct": 10 / 300 * 100})
+
+    def test_book_fetches_each_ticker_once(self):
+        book = QuoteBook()
+        book.prefetch(["AAPL", "MSFT", "AAPL"])
+        book.prefetch(["MSFT"])
+        self.assertEqual(book.get("AAPL"), (110_000_000, 100_000_000, 105_000_000))
+        self.assertEqual([c.args[0] for c in self.fetch.call_args_list], [["AAPL", "MSFT"]])
+
+    def test_list_page_quotes_in_one_batch(self):
+        for name, ticker in (("jan", "AAPL"), ("kim", "MSFT"), ("lee", "AAPL")):
+            self._holding(_portfolio(name, cash="10"), ticker, "1", "100")
+        body = self.client.get("/api/public-portfolios/").json()
+        self.assertEqual(self.fetch.call_count, 1)
+        self.assertEqual(sorted(self.fetch.call_args.args[0]), ["AAPL", "MSFT"])
+        values = sorted(row["total_value"] for row in body["results"])
+        self.assertEqual(values, [120.0, 120.0, 410.0])
+
+
+class _ProbeView(routers.ReplicaReadMixin, APIView):
+    permission_classes = []
+
+    def get(self, request):
+        return Response({"replica": routers._reads.get()})
+
+    def post(self, request):
+        return Response({"replica": routers._reads.get()}, status=201 if request.data.get("ok") else 400)
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = routers.ReplicaRouter()
+        self.user = mock.Mock(pk=7, is_authenticated=True)
+
+    def _call(self, method, **data):
+        request = getattr(APIRequestFactory(), method)("/probe/", data, format="json")
+        force_authenticate(request, self.user)
+        return _ProbeView.as_view()(request)
+
+    def test_reads_use_a_replica_only_when_asked(self):
+        self.assertEqual(self.router.db_for_read(Portfolio), "default")
+        with routers.replica_reads():
+            self.assertEqual(self.router.db_for_read(Portfolio), "replica")
+            self.assertEqual(self.router.db_for_write(Portfolio), "default")
+            with mock.patch.object(connections["default"], "in_atomic_block", True):
+                self.assertEqual(self.router.db_for_read(Portfolio), "default")
+        with override_settings(DATABASE_REPLICAS=[]), routers.replica_reads():
+            self.assertEqual(self.router.db_for_read(Portfolio), "default")
+
+    def test_pins_expire_and_need_replicas(self):
+        routers.pin_to_primary(7)
+        self.assertTrue(routers.is_pinned(7))
+        self.assertFalse(routers.is_pinned(None))
+        with override_settings(DATABASE_REPLICAS=[]):
+            routers.pin_to_primary(8)
+        self.assertFalse(routers.is_pinned(8))
+
+    def test_successful_write_pins_the_next_read_to_the_primary(self):
+        self.assertEqual(self._call("get").data, {"replica": True})
+        self.assertFalse(routers._reads.get())
+        self._call("post")  # failed write: no pin
+        self.assertEqual(self._call("get").data, {"replica": True})
+        self.assertEqual(self._call("post", ok=1).data, {"replica": False})
+        self.assertEqual(self._call("get").data, {"replica": False})
+
+
+class PayloadCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches["payloads"].clear()
+        p = _portfolio("mia", cash="10")
+        Holding.objects.create(portfolio=p, ticker="AAPL", quantity=Decimal("1"), avg_cost=Decimal("1"))
+        self.p = Portfolio.objects.prefetch_related("holdings").get(pk=p.pk)
+        self.calls = 0
+
+    async def _compute(self, value="v"):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return value
+
+    def _get(self, params=(), value="v"):
+        return async_to_sync(payloads.cached_payload)(self.p, "chart", params, lambda: self._compute(value))
+
+    def test_key_follows_state_prices_and_params(self):
+        key = payloads.payload_key(self.p, "chart", "1m")
+        self.assertEqual(payloads.payload_key(self.p, "chart", "1m"), key)
+        self.assertNotEqual(payloads.payload_key(self.p, "chart", "1y"), key)
+        payloads.invalidate_tickers(["MSFT"])
+        self.assertEqual(payloads.payload_key(self.p, "chart", "1m"), key)
+        for change in (lambda: payloads.invalidate_tickers(["AAPL"]),
+                       lambda: payloads.invalidate_portfolio(self.p.pk),
+                       lambda: setattr(self.p, "version", self.p.version + 1)):
+            change()
+            self.assertNotEqual(payloads.payload_key(self.p, "chart", "1m"), key)
+            key = payloads.payload_key(self.p, "chart", "1m")
+
+    def test_read_through_until_invalidated(self):
+        self.assertEqual(self._get(), "v")
+        self.assertEqual(self._get(value="w"), "v")
+        self.assertEqual(self.calls, 1)
+        payloads.invalidate({"portfolio_id": self.p.pk})
+        self.assertEqual(self._get(value="w"), "w")
+        payloads.invalidate({"tickers": ["AAPL"]})
+        self.assertEqual(self._get(value="x"), "x")
+        self.assertEqual(self.calls, 3)
+
+    def test_concurrent_misses_compute_once(self):
+        async def both():
+            return await asyncio.gather(*(
+                payloads.cached_payload(self.p, "chart", (), self._compute) for _ in range(2)
+            ))
+
+        self.assertEqual(async_to_sync(both)(), ["v", "v"])
+        self.assertEqual(self.calls, 1)
+
+    def test_errors_and_oversized_payloads_are_not_stored(self):
+        async def fail():
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            async_to_sync(payloads.cached_payload)(self.p, "chart", (), fail)
+        self.assertEqual(self._get(), "v")  # the lease was released
+        with override_settings(PAYLOAD_CACHE_MAX_BYTES=64):
+            self.assertEqual(self._get(("big",), "x" * 100), "x" * 100)
+            self.assertEqual(self._get(("big",), "x" * 100), "x" * 100)
+        self.assertEqual(self.calls, 3)
@@ -1,7 +1,7 @@
 from rest_framework.routers import DefaultRouter
 from django.urls import path, include
 from .views import PortfolioViewSet, TradeViewSet
-from .views import PublicPortfolioListView
+from .views import PortfolioAllocationsView, PortfolioChartView, PublicPortfolioListView
 
 router = DefaultRouter()
 router.register(r"portfolios", PortfolioViewSet, basename="portfolio")
@@ -9,8 +9,12 @@ router.register(r"portfolios", PortfolioViewSet, basename="portfolio")
 # Nested trades
 trade_list = TradeViewSet.as_view({"get":"list"})
 urlpatterns = [
+    path("portfolios/<int:pk>/chart/", PortfolioChartView.as_view(), name="portfolio-chart"),
+    path("portfolios/<int:pk>/allocations/", PortfolioAllocationsView.as_view(), name="portfolio-allocations"),
     path("", include(router.urls)),
     path("portfolios/<int:portfolio_pk>/trades/", trade_list, name="trade-list"),
+    path("portfolios/<int:portfolio_pk>/trades/export/", TradeViewSet.as_view({"get":"export"}), name="trade-export"),
+    path("portfolios/<int:portfolio_pk>/trades/import/", TradeViewSet.as_view({"post":"import_csv"}), name="trade-import"),
     path("portfolios/<int:portfolio_pk>/trades/buy/", TradeViewSet.as_view({"post":"buy"})),
     path("portfolios/<int:portfolio_pk>/trades/sell/", TradeViewSet.as_view({"post":"sell"})),
     path("portfolios/<int:portfolio_pk>/trades/cash-in/", TradeViewSet.as_view({"post":"cash_in"})),
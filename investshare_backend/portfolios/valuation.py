@@ -0,0 +1,118 @@
+# portfolios/valuation.py
+from __future__ import annotations
+
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+
+from .models import Portfolio
+from market.latency import hedged
+from market.money import micros, mul, ratio, to_float
+from market.prices import get_batch_sessions, last_known_sessions
+from market.upstream import available
+
+Quote = Tuple[Optional[int], Optional[int], Optional[int]]  # (price, prev_close, open) in micro-units
+
+
+class QuoteBook:
+    """
+    Live quotes for one render, fetched in batches and shared by every
+    portfolio the serializer touches. Tickers already in the book are never
+    fetched again.
+
+    The book has a latency budget (QUOTE_BUDGET_SECONDS from creation).
+    Batch fetches are hedged (see market.latency) while the upstream bucket
+    can pay for the second attempt without waiting, and cut off when the budget
+    runs out; tickers left without a live quote get the last known quote or
+    snapshot close and are listed in `stale`.
+    """
+
+    def __init__(self, budget: Optional[float] = None):
+        self._quotes: Dict[str, Quote] = {}
+        self.stale: Set[str] = set()
+        budget = getattr(settings, "QUOTE_BUDGET_SECONDS", 2.0) if budget is None else budget
+        self._deadline = time.monotonic() + budget
+
+    def prefetch(self, tickers: Iterable[str]) -> None:
+        missing = [t for t in dict.fromkeys(tickers) if t not in self._quotes]
+        if not missing:
+            return
+        fetched: dict = {}
+        remaining = self._deadline - time.monotonic()
+        if remaining > 0:
+            try:
+                # a hedge repeats both downloads (one upstream call per ticker each)
+                fetched = hedged("batch_sessions", get_batch_sessions, missing, timeout=remaining,
+                                 hedge_if=lambda: available(2 * len(missing)))
+            except Exception:
+                fetched = {}
+        late = [t for t in missing if fetched.get(t.strip(), (None,))[0] is None]
+        known = last_known_sessions(late) if late else {}
+        for t in missing:
+            if t in late:
+                self.stale.add(t)
+                px, prev, openp = known.get(t.strip(), (None, None, None))
+            else:
+                px, prev, openp = fetched[t.strip()]
+            self._quotes[t] = (micros(px), micros(prev), micros(openp))
+
+    def get(self, ticker: str) -> Quote:
+        if ticker not in self._quotes:
+            self.prefetch([ticker])
+        return self._quotes[ticker]
+
+
+class PortfolioValuation:
+    """
+    One pass over a portfolio's holdings at live quotes: per-holding rows
+    (value, P/L, day change) plus equity now and at the session open. All
+    math is in micro-units; floats only come out of the public attributes.
+    """
+
+    def __init__(self, portfolio: Portfolio, quotes: QuoteBook):
+        holdings = list(portfolio.holdings.all())
+        quotes.prefetch(h.ticker for h in holdings)
+
+        cash = micros(portfolio.cash) or 0
+        now_val = open_val = cash
+        self.holdings: List[dict] = []
+        for h in holdings:
+            q = micros(h.quantity) or 0
+            avg = micros(h.avg_cost) or 0
+            price, _prev, openp = quotes.get(h.ticker)
+
+            value = pl_abs = pl_pct = day_abs = day_pct = None
+            if price is not None:
+                value = mul(q, price)
+                if avg:
+                    pl_abs = mul(q, price - avg)
+                    pl_pct = ratio(price - avg, avg) * 100
+                if openp:
+                    day_abs = mul(q, price - openp)
+                    day_pct = ratio(price - openp, openp) * 100
+            if price:
+                now_val += value
+            if openp:
+                open_val += mul(q, openp)
+
+            self.holdings.append({
+                "id":        h.id,
+                "ticker":    h.ticker,
+                "quantity":  str(h.quantity),
+                "avg_cost":  str(h.avg_cost),
+                "price":     to_float(price),
+                "value":     to_float(value),
+                "pl_abs":    to_float(pl_abs),
+                "pl_pct":    pl_pct,
+                "day_abs":   to_float(day_abs),
+                "day_pct":   day_pct,
+                "stale":     h.ticker in quotes.stale,
+            })
+
+        self.total_value: float = to_float(now_val)
+        if open_val == 0:
+            self.todays_change = {"abs": 0.0, "pct": 0.0}
+        else:
+            diff = now_val - open_val
+            self.todays_change = {"abs": to_float(diff), "pct": ratio(diff, open_val) * 100}
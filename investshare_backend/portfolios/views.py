@@ -1,32 +1,66 @@
 # investshare_backend/portfolios/views.py
 from __future__ import annotations
 
+import asyncio
 import re
-from datetime import date
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
 from decimal import Decimal, InvalidOperation
 
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Sum
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from rest_framework import generics, permissions, status, viewsets
+from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
+from .analytics import ANALYTICS_RANGES, compute_holdings_risk, compute_portfolio_analytics
+from .exports import EXPORTERS, CSVRenderer, NDJSONRenderer
+from .imports import import_trades, parse_fills_csv
+from .lots import open_lots, realized_pnl, rebuild_lots
+from .performance import RETURN_RANGES, portfolio_returns
 from .models import Portfolio, Trade
+from .payloads import cached_payload
 from .serializers import (
     PortfolioSerializer,
     PublicPortfolioSerializer,
     TradeSerializer,
 )
 from .services import execute_trade
-from market.prices import get_allocations_treemap, get_portfolio_timeseries
+from .valuation import QuoteBook
+from investshare.asyncapi import AsyncAPIView, blocking
+from investshare.routers import ReplicaReadMixin
+from market.prices import (
+    get_allocations_treemap,
+    get_change_24h_pct,
+    get_latest_price,
+    get_portfolio_series,
+    intraday_closes,
+    intraday_window,
+)
+from market.series import SERIES_FORMATS, SERIES_RENDERERS, Series
 
 SYMBOL_RE = re.compile(r"^[A-Z0-9.\-]{1,20}$")
+MAX_CHART_POINTS = 5000
 
 def _clean_symbol(value) -> str | None:
     s = (value or "").upper().strip()
     return s if SYMBOL_RE.match(s) else None
 
+def _parse_day(value, field: str):
+    if not value:
+        return None
+    try:
+        return datetime.combine(date.fromisoformat(value), time(0, 0), tzinfo=dt_timezone.utc)
+    except ValueError:
+        raise ValidationError({field: "Expected YYYY-MM-DD."})
+
 def _as_positive_decimal(value, field: str) -> Decimal:
     try:
         d = Decimal(str(value))
@@ -36,6 +70,25 @@ def _as_positive_decimal(value, field: str) -> Decimal:
         raise ValidationError({field: "Must be greater than 0."})
     return d
 
+def _as_points(value) -> int | None:
+    """?points= for chart downsampling; clamped to [3, MAX_CHART_POINTS], None = full series."""
+    try:
+        n = int(value)
+    except (TypeError, ValueError):
+        return None
+    return max(3, min(n, MAX_CHART_POINTS))
+
+def _trade_result(trade: Trade) -> dict:
+    """
+    Trade response, built from what execute_trade already holds: no live
+    revaluation on the request path (clients refetch).
+    """
+    p = trade.portfolio
+    return {
+        "trade": TradeSerializer(trade).data,
+        "portfolio": {"id": p.pk, "cash": str(p.cash), "version": p.version},
+    }
+
 class IsOwnerOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj: Portfolio):
         if request.method in permissions.SAFE_METHODS:
@@ -47,7 +100,7 @@ class TenPerPage(PageNumberPagination):
     page_size_query_param = "page_size"
     max_page_size = 100
 
-class PortfolioViewSet(viewsets.ModelViewSet):
+class PortfolioViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     serializer_class = PortfolioSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
 
@@ -67,6 +120,17 @@ class PortfolioViewSet(viewsets.ModelViewSet):
             raise ValidationError({"detail": "User already has a portfolio."})
         serializer.save(owner=self.request.user)
 
+    def perform_update(self, serializer):
+        """
+        Bumps the version (cached payloads and analytics are keyed on it). Lots
+        are matched by lot_method, so switching it re-matches the whole ledger.
+        """
+        with transaction.atomic():
+            locked = Portfolio.objects.select_for_update().get(pk=serializer.instance.pk)
+            portfolio = serializer.save(version=locked.version + 1)
+            if portfolio.lot_method != locked.lot_method:
+                rebuild_lots(portfolio)
+
     @action(detail=False, methods=["get"], permission_classes=[permissions.IsAuthenticated])
     def mine(self, request):
         """Return the current user's portfolio (or 404)."""
@@ -82,34 +146,50 @@ class PortfolioViewSet(viewsets.ModelViewSet):
         return Response(PortfolioSerializer(p, context={"request": request}).data)
 
     @action(detail=True, methods=["get"])
-    def chart(self, request, pk=None):
+    def analytics(self, request, pk=None):
+        """Risk stats (?range=1w|ytd|1y|all, ?benchmark=SPY) from the daily equity series."""
+        portfolio = self.get_object()
+        range_param = request.query_params.get("range", "1y")
+        if range_param not in ANALYTICS_RANGES:
+            return Response({"error": {"code": "bad_range", "message": f"range must be one of {', '.join(ANALYTICS_RANGES)}"}}, status=400)
+        benchmark = _clean_symbol(request.query_params.get("benchmark"))
+        return Response(compute_portfolio_analytics(portfolio, range_param, benchmark))
+
+    @action(detail=True, methods=["get"])
+    def risk(self, request, pk=None):
+        """Holdings correlation/covariance and contribution to return/risk (?range=)."""
+        portfolio = self.get_object()
+        range_param = request.query_params.get("range", "1y")
+        if range_param not in ANALYTICS_RANGES:
+            return Response({"error": {"code": "bad_range", "message": f"range must be one of {', '.join(ANALYTICS_RANGES)}"}}, status=400)
+        return Response(compute_holdings_risk(portfolio, range_param))
+
+    @action(detail=True, methods=["get"])
+    def returns(self, request, pk=None):
+        """Flow-adjusted TWR and MWR (?range=1w|1m|ytd|1y|all)."""
         portfolio = self.get_object()
         range_param = request.query_params.get("range", "all")
-        try:
-            data = get_portfolio_timeseries(portfolio, range_param)
-            return Response(data)
-        except Exception:
-            return Response([{"date": date.today().isoformat(), "value": float(portfolio.cash or 0.0)}])
+        if range_param not in RETURN_RANGES:
+            return Response({"error": {"code": "bad_range", "message": f"range must be one of {', '.join(RETURN_RANGES)}"}}, status=400)
+        return Response(portfolio_returns(portfolio, range_param))
 
     @action(detail=True, methods=["get"])
-    def allocations(self, request, pk=None):
+    def lots(self, request, pk=None):
+        """Open tax lots with unrealized P&L at the latest price."""
         portfolio = self.get_object()
-        try:
-            data = get_allocations_treemap(portfolio)
-            return Response(data)
-        except Exception:
-            return Response({
-                "total": float(portfolio.cash or 0.0),
-                "data": [{
-                    "ticker": "CASH",
-                    "value": float(portfolio.cash or 0.0),
-                    "weight": 100.0,
-                    "change_pct": 0.0,
-                    "position": "cash",
-                }],
-            })
+        tickers = set(portfolio.lots.filter(remaining__gt=0).values_list("ticker", flat=True))
+        prices = {t: get_latest_price(t) or None for t in tickers}
+        return Response(open_lots(portfolio, prices))
+
+    @action(detail=True, methods=["get"])
+    def realized(self, request, pk=None):
+        """Realized P&L for ?start=YYYY-MM-DD&end=YYYY-MM-DD (end inclusive)."""
+        portfolio = self.get_object()
+        start = _parse_day(request.query_params.get("start"), "start")
+        end = _parse_day(request.query_params.get("end"), "end")
+        return Response(realized_pnl(portfolio, start, end + timedelta(days=1) if end else None))
 
-class TradeViewSet(viewsets.ReadOnlyModelViewSet):
+class TradeViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     throttle_scope = "trade"
     serializer_class = TradeSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
@@ -120,7 +200,55 @@ class TradeViewSet(viewsets.ReadOnlyModelViewSet):
         portfolio = get_object_or_404(Portfolio, pk=pid)
         if portfolio.visibility == "private" and portfolio.owner != self.request.user:
             return Trade.objects.none()
-        return portfolio.trades.all().order_by("-executed_at", "-id")
+        return (
+            portfolio.trades
+            .annotate(realized_pnl=Sum("lot_closures__realized_pnl"))
+            .order_by("-executed_at", "-id")
+        )
+
+    def get_renderers(self):
+        # routes are wired by hand in urls.py, so @action(renderer_classes=...) would be ignored
+        if self.action == "export":
+            return [CSVRenderer(), NDJSONRenderer()]
+        return super().get_renderers()
+
+    @action(detail=False, methods=["get"], url_path="export")
+    def export(self, request, portfolio_pk=None):
+        """Stream the full ledger as CSV (default) or NDJSON (?format=ndjson)."""
+        portfolio = get_object_or_404(Portfolio, pk=portfolio_pk)
+        if portfolio.visibility == "private" and portfolio.owner != request.user:
+            return Response(status=status.HTTP_403_FORBIDDEN)
+
+        fmt = request.accepted_renderer.format
+        rows, arows, content_type = EXPORTERS[fmt]
+        # under ASGI a sync iterator would be buffered whole (sync_to_async(list))
+        stream = arows(portfolio) if isinstance(request._request, ASGIRequest) else rows(portfolio)
+        resp = StreamingHttpResponse(stream, content_type=content_type)
+        resp["Content-Disposition"] = f'attachment; filename="portfolio-{portfolio.pk}-trades.{fmt}"'
+        return resp
+
+    @action(detail=False, methods=["post"], url_path="import")
+    def import_csv(self, request, portfolio_pk=None):
+        """Bulk-import dated broker fills from an uploaded CSV (field: file)."""
+        portfolio = get_object_or_404(Portfolio, pk=portfolio_pk)
+        if portfolio.owner != request.user:
+            return Response(status=status.HTTP_403_FORBIDDEN)
+
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"error": {"code": "bad_file", "message": "CSV file required."}}, status=400)
+
+        try:
+            text = upload.read().decode("utf-8-sig")
+            count = import_trades(portfolio, parse_fills_csv(text))
+        except (UnicodeDecodeError, ValueError) as e:
+            return Response({"error": {"code": "import_failed", "message": str(e)}}, status=400)
+
+        portfolio.refresh_from_db()
+        return Response({
+            "imported": count,
+            "portfolio": PortfolioSerializer(portfolio, context={"request": request}).data,
+        }, status=201)
 
     @action(detail=False, methods=["post"], url_path="buy")
     def buy(self, request, portfolio_pk=None):
@@ -160,11 +288,7 @@ class TradeViewSet(viewsets.ReadOnlyModelViewSet):
 
         try:
             trade = execute_trade(portfolio, trade_type=ttype, ticker=ticker, quantity=qty_dec, price=None)
-            portfolio.refresh_from_db()
-            return Response({
-                "trade": TradeSerializer(trade).data,
-                "portfolio": PortfolioSerializer(portfolio, context={"request": request}).data
-            }, status=201)
+            return Response(_trade_result(trade), status=201)
         except Exception as e:
             return Response({"error": {"code": "trade_failed", "message": str(e)}}, status=400)
 
@@ -180,17 +304,93 @@ class TradeViewSet(viewsets.ReadOnlyModelViewSet):
 
         try:
             trade = execute_trade(portfolio, trade_type=ttype, ticker=None, cash_amount=amt_dec)
-            portfolio.refresh_from_db()
-            return Response({
-                "trade": TradeSerializer(trade).data,
-                "portfolio": PortfolioSerializer(portfolio, context={"request": request}).data
-            }, status=201)
+            return Response(_trade_result(trade), status=201)
         except Exception as e:
             return Response({"error": {"code": "trade_failed", "message": str(e)}}, status=400)
 
-class PublicPortfolioListView(generics.ListAPIView):
+class PortfolioReadView(ReplicaReadMixin, AsyncAPIView):
+    """Async read endpoints on one portfolio, with PortfolioViewSet's visibility rules."""
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
+
+    async def aget_object(self, pk) -> Portfolio:
+        qs = Portfolio.objects.select_related("owner").prefetch_related("holdings")
+        if not self.request.user.is_authenticated:
+            qs = qs.filter(visibility="public")
+        portfolio = await qs.filter(pk=pk).afirst()
+        if portfolio is None:
+            raise Http404
+        self.check_object_permissions(self.request, portfolio)
+        return portfolio
+
+class PortfolioChartView(PortfolioReadView):
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + SERIES_RENDERERS
+
+    async def get(self, request, pk=None):
+        """
+        Equity series. Default: [{"date", "value"}]. ?format=columnar|f32 (or the
+        matching Accept type) returns parallel arrays built straight from NumPy.
+        Range 1d downloads every holding's intraday bars concurrently; holdings
+        carried at their last known price are listed in X-Stale-Tickers (and in
+        the columnar "stale"). Computed series are shared through the payload
+        cache (portfolios/payloads.py).
+        """
+        portfolio = await self.aget_object(pk)
+        range_param = request.query_params.get("range", "all")
+        points = _as_points(request.query_params.get("points"))
+        try:
+            series = await cached_payload(
+                portfolio, "chart", (range_param, points), lambda: self._series(portfolio, range_param, points)
+            )
+        except Exception:
+            today = np.datetime64(date.today(), "s").astype(np.int64)
+            series = Series(np.array([today]), np.array([float(portfolio.cash or 0.0)]))
+        response = Response(series if request.accepted_renderer.format in SERIES_FORMATS else series.to_points())
+        if series.stale:
+            response["X-Stale-Tickers"] = ",".join(series.stale)
+        return response
+
+    async def _series(self, portfolio: Portfolio, range_param: str, points: int | None) -> Series:
+        intraday = None
+        if range_param == "1d":
+            window = intraday_window()
+            tickers = [h.ticker for h in portfolio.holdings.all()]
+            bars = await asyncio.gather(*(blocking(intraday_closes, t, *window) for t in tickers))
+            intraday = (window, dict(zip(tickers, bars)))
+        return await sync_to_async(get_portfolio_series)(portfolio, range_param, points, intraday)
+
+class PortfolioAllocationsView(PortfolioReadView):
+    async def get(self, request, pk=None):
+        """
+        Treemap of holdings + cash; every holding's quote and 24h change fetched
+        concurrently on a payload-cache miss.
+        """
+        portfolio = await self.aget_object(pk)
+        try:
+            return Response(await cached_payload(portfolio, "allocations", (), lambda: self._treemap(portfolio)))
+        except Exception:
+            return Response({
+                "total": float(portfolio.cash or 0.0),
+                "data": [{
+                    "ticker": "CASH",
+                    "value": float(portfolio.cash or 0.0),
+                    "weight": 100.0,
+                    "change_pct": 0.0,
+                    "position": "cash",
+                }],
+            })
+
+    async def _treemap(self, portfolio: Portfolio) -> dict:
+        tickers = [h.ticker for h in portfolio.holdings.all()]
+        prices, changes = await asyncio.gather(
+            asyncio.gather(*(blocking(get_latest_price, t) for t in tickers)),
+            asyncio.gather(*(blocking(get_change_24h_pct, t) for t in tickers)),
+        )
+        return get_allocations_treemap(portfolio, dict(zip(tickers, zip(prices, changes))))
+
+class PublicPortfolioListView(ReplicaReadMixin, AsyncAPIView):
     serializer_class = PublicPortfolioSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
 
     def get_queryset(self):
         return (
@@ -200,3 +400,15 @@ class PublicPortfolioListView(generics.ListAPIView):
             .prefetch_related("holdings")
             .order_by("-id")
         )
+
+    async def get(self, request):
+        paginator = self.pagination_class()
+        page = await sync_to_async(paginator.paginate_queryset)(self.get_queryset(), request, view=self)
+        # every ticker on the page in one hedged batch, off the ORM thread
+        quotes = QuoteBook()
+        await blocking(quotes.prefetch, [h.ticker for p in page for h in p.holdings.all()])
+        serializer = self.serializer_class(
+            page, many=True, context={"request": request, "view": self, "quote_book": quotes}
+        )
+        data = await sync_to_async(lambda: serializer.data)()
+        return paginator.get_paginated_response(data)
@@ -4,11 +4,14 @@ import type {// src/hooks/usePortfolios.ts
 import { useMutation, useQuery, useQueryClient, keepPreviousData } from "@tanstack/react-query";
 import { apiFetch, post, API_URL, authHeaders, del } from "@/lib/api";
 import type {
-  Portfolio, PublicPortfolioRow, AllocationResponse, Paginated, Trade, PortfolioChartPoint
+  Portfolio, PublicPortfolioRow, AllocationResponse, Paginated, Trade, TradeResult, PortfolioChartPoint
 } from "@/types";
 
 type QOpts = { enabled?: boolean };
 
+// LineChart is a few hundred px wide; the server LTTB-downsamples to this many points.
+const CHART_POINTS = 400;
+
 export function usePublicPortfolios(page = 1, pageSize = 10) {
   return useQuery({
     queryKey: ["public-portfolios", page, pageSize],
@@ -49,7 +52,7 @@ export function useAllocations(id: number, opts: QOpts = {}) {
 export function useChart(id: number, range: string, opts: QOpts = {}) {
   return useQuery({
     queryKey: ["chart", id, range],
-    queryFn: () => apiFetch<PortfolioChartPoint[]>(`/api/portfolios/${id}/chart/?range=${range}`),
+    queryFn: () => apiFetch<PortfolioChartPoint[]>(`/api/portfolios/${id}/chart/?range=${range}&points=${CHART_POINTS}`),
     enabled: opts.enabled !== false,
     refetchInterval: 30_000, 
   });
@@ -101,7 +104,7 @@ export function useCashIn(id: number) {
   const qc = useQueryClient();
   return useMutation({
     mutationFn: (amount: number) =>
-      post<{ trade: Trade; portfolio: Portfolio }>(`/api/portfolios/${id}/trades/cash-in/`, { amount }),
+      post<TradeResult>(`/api/portfolios/${id}/trades/cash-in/`, { amount }),
     onSuccess: () => {
       qc.invalidateQueries({ queryKey: ["portfolio", id] });
       qc.invalidateQueries({ queryKey: ["allocations", id] });
@@ -115,7 +118,7 @@ export function useCashOut(id: number) {
   const qc = useQueryClient();
   return useMutation({
     mutationFn: (amount: number) =>
-      post<{ trade: Trade; portfolio: Portfolio }>(`/api/portfolios/${id}/trades/cash-out/`, { amount }),
+      post<TradeResult>(`/api/portfolios/${id}/trades/cash-out/`, { amount }),
     onSuccess: () => {
       qc.invalidateQueries({ queryKey: ["portfolio", id] });
       qc.invalidateQueries({ queryKey: ["allocations", id] });
@@ -129,7 +132,7 @@ export function useBuy(id: number) {
   const qc = useQueryClient();
   return useMutation({
     mutationFn: (payload: { ticker: string; quantity: number }) =>
-      post<{ trade: Trade; portfolio: Portfolio }>(`/api/portfolios/${id}/trades/buy/`, payload),
+      post<TradeResult>(`/api/portfolios/${id}/trades/buy/`, payload),
     onSuccess: () => {
       qc.invalidateQueries({ queryKey: ["portfolio", id] });
       qc.invalidateQueries({ queryKey: ["allocations", id] });
@@ -143,7 +146,7 @@ export function useSell(id: number) {
   const qc = useQueryClient();
   return useMutation({
     mutationFn: (payload: { ticker: string; quantity: number }) =>
-      post<{ trade: Trade; portfolio: Portfolio }>(`/api/portfolios/${id}/trades/sell/`, payload),
+      post<TradeResult>(`/api/portfolios/${id}/trades/sell/`, payload),
     onSuccess: () => {
       qc.invalidateQueries({ queryKey: ["portfolio", id] });
       qc.invalidateQueries({ queryKey: ["allocations", id] });
@@ -153,7 +156,7 @@ export function useSell(id: number) {
   });
 }
 
-  Portfolio, PublicPortfolioRow, AllocationResponse, Paginated, Trade, PortfolioChartPoint
+  Portfolio, PublicPortfolioRow, AllocationResponse, Paginated, Trade, TradeResult, PortfolioChartPoint
 } from "@/types";
 
 type QOpts = { enabled?: boolean };
@@ -199,7 +202,7 @@ export function useAllocations(id: number, opts: QOpts = {}) {
 export function useChart(id: number, range: string, opts: QOpts = {}) {
   return useQuery({
     queryKey: ["chart", id, range],
-    queryFn: () => apiFetch<PortfolioChartPoint[]>(`/api/portfolios/${id}/chart/?range=${range}`),
+    queryFn: () => apiFetch<PortfolioChartPoint[]>(`/api/portfolios/${id}/chart/?range=${range}&points=${CHART_POINTS}`),
     enabled: opts.enabled !== false,
   });
 }
@@ -243,7 +246,7 @@ export function useCashIn(id: number) {
   const qc = useQueryClient();
   return useMutation({
     mutationFn: (amount: number) =>
-      post<{ trade: Trade; portfolio: Portfolio }>(`/api/portfolios/${id}/trades/cash-in/`, { amount }),
+      post<TradeResult>(`/api/portfolios/${id}/trades/cash-in/`, { amount }),
     onSuccess: () => {
       qc.invalidateQueries({ queryKey: ["portfolio", id] });
       qc.invalidateQueries({ queryKey: ["allocations", id] });
@@ -256,7 +259,7 @@ export function useCashOut(id: number) {
   const qc = useQueryClient();
   return useMutation({
     mutationFn: (amount: number) =>
-      post<{ trade: Trade; portfolio: Portfolio }>(`/api/portfolios/${id}/trades/cash-out/`, { amount }),
+      post<TradeResult>(`/api/portfolios/${id}/trades/cash-out/`, { amount }),
     onSuccess: () => {
       qc.invalidateQueries({ queryKey: ["portfolio", id] });
       qc.invalidateQueries({ queryKey: ["allocations", id] });
@@ -269,7 +272,7 @@ export function useBuy(id: number) {
   const qc = useQueryClient();
   return useMutation({
     mutationFn: (payload: { ticker: string; quantity: number }) =>
-      post<{ trade: Trade; portfolio: Portfolio }>(`/api/portfolios/${id}/trades/buy/`, payload),
+      post<TradeResult>(`/api/portfolios/${id}/trades/buy/`, payload),
     onSuccess: () => {
       qc.invalidateQueries({ queryKey: ["portfolio", id] });
       qc.invalidateQueries({ queryKey: ["allocations", id] });
@@ -282,7 +285,7 @@ export function useSell(id: number) {
   const qc = useQueryClient();
   return useMutation({
     mutationFn: (payload: { ticker: string; quantity: number }) =>
-      post<{ trade: Trade; portfolio: Portfolio }>(`/api/portfolios/${id}/trades/sell/`, payload),
+      post<TradeResult>(`/api/portfolios/${id}/trades/sell/`, payload),
     onSuccess: () => {
       qc.invalidateQueries({ queryKey: ["portfolio", id] });
       qc.invalidateQueries({ queryKey: ["allocations", id] });
@@ -10,6 +10,16 @@ export function useTicker(symbol?: string) {
   });
 }
 
+// One request for a whole watchlist / holdings table instead of one per symbol.
+export function useTickers(symbols: string[]) {
+  const list = Array.from(new Set(symbols.map((s) => s.toUpperCase()))).sort();
+  return useQuery({
+    queryKey: ["tickers", list.join(",")],
+    enabled: list.length > 0,
+    queryFn: () => apiFetch<TickerDetail[]>(`/api/tickers/?symbols=${encodeURIComponent(list.join(","))}`),
+  });
+}
+
 export function useTickerSearch(q: string) {
   return useQuery({
     queryKey: ["ticker-search", q],
@@ -10,6 +10,7 @@ export interface Holding {
   pl_pct?: number | string | null;
   day_abs?: number | string | null;
   day_pct?: number | string | null;
+  stale?: boolean;             // priced from the last known quote (live fetch ran out of time)
 }
 
 
@@ -40,6 +41,14 @@ export interface Trade {
   executed_at: string;
 }
 
+// POST .../trades/{buy,sell,cash-in,cash-out}/ – the executed trade and the
+// portfolio's new cash and version only. Nothing is revalued on the request
+// path; refetch the portfolio for live values.
+export interface TradeResult {
+  trade: Trade;
+  portfolio: { id: number; cash: string; version: number };
+}
+
 
 export interface PublicPortfolioRow {
   id: number;